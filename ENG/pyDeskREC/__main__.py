@@ -0,0 +1,13 @@
+import os
+import sys
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Allows "python3 -m pyDeskREC ..." from the installation directory; the
+# modules import each other by their plain names.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GUI_MODULES = ('PySimpleGUI', 'tkinter', 'pyautogui')
+# Imported by the GUI only after its first window is shown
+RECORDING_MODULES = ('metrics', 'postprocess', 'replay_buffer', 'scheduler', 'screen_recorder', 'webcam')
+
+# Time-to-first-window budget for the GUI; bench-startup fails above it
+FIRST_WINDOW_BUDGET_MS = 1500
+
+# Code run in a fresh interpreter for each start-up path
+STARTUP_PATHS = {
+    'cli': "import cli, config_manager, screen_recorder",
+    'gui': "import main",
+}
+
+def time_cold_start(code, runs):
+    """Runs code in fresh interpreters and returns the wall-clock times in ms"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=HERE,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings.append(elapsed)
+    return timings
+
+def loaded_modules(code, modules=GUI_MODULES):
+    """Returns which of modules (default: the GUI modules) end up in sys.modules after running code"""
+    probe = f"{code}\nimport sys\nprint(','.join(m for m in {modules!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', probe], cwd=HERE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return [m for m in result.stdout.strip().split(',') if m]
+
+def bench_startup(runs=5):
+    """Prints cold start times of the headless and GUI import paths"""
+    print(f"Cold start over {runs} runs (median / min, ms):")
+    for name, code in STARTUP_PATHS.items():
+        try:
+            timings = time_cold_start(code, runs)
+        except RuntimeError as e:
+            print(f"  {name:4s} unavailable: {e}")
+            continue
+        gui = loaded_modules(code)
+        print(f"  {name:4s} {median(timings):8.1f} / {min(timings):8.1f}   GUI modules: {', '.join(gui) or 'none'}")
+    early = loaded_modules(STARTUP_PATHS['gui'], RECORDING_MODULES)
+    if early:
+        print(f"  gui imports before its first window: {', '.join(early)}")
+    return 1 if loaded_modules(STARTUP_PATHS['cli']) or early else 0
+
+def import_time_report(code, top=15):
+    """Returns the slowest imports of code as (cumulative us, self us, module), like -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=HERE,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def print_import_time_report(name, top=15):
+    print(f"Slowest imports on the {name} path (cumulative / self, ms):")
+    for cumulative_us, self_us, module in import_time_report(STARTUP_PATHS[name], top):
+        print(f"  {cumulative_us / 1000:8.1f} / {self_us / 1000:8.1f}  {module}")
+
+# The GUI start-up up to its main window, closed again at once
+FIRST_WINDOW_CODE = """
+import main
+from config_manager import load_config
+window = main.create_main_window(load_config()[0])
+print('first-window', flush=True)
+window.close()
+"""
+
+def time_first_window(timeout=30):
+    """Starts the GUI and returns the ms until its main window exists"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', FIRST_WINDOW_CODE], cwd=HERE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise RuntimeError(f"no window within {timeout} s")
+    if 'first-window' not in stdout:
+        raise RuntimeError((stderr.strip().splitlines() or ["GUI did not start"])[-1])
+    return (time.perf_counter() - start) * 1000
+
+def check_first_window_budget(runs=5, budget_ms=FIRST_WINDOW_BUDGET_MS):
+    """Returns 0 if the median time-to-first-window is within budget, 1 otherwise"""
+    try:
+        timings = [time_first_window() for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"Time to first window unavailable: {e}")
+        return 1
+    elapsed = median(timings)
+    verdict = "OK" if elapsed <= budget_ms else "OVER BUDGET"
+    print(f"Time to first window: {elapsed:.1f} ms (budget {budget_ms} ms) {verdict}")
+    return 0 if elapsed <= budget_ms else 1
+
+# Idle GUI: wakeups of the main loop allowed per second of doing nothing
+IDLE_WAKEUPS_PER_SECOND = 0.1
+IDLE_SETTLE = 2  # Seconds for start-up events before counting
+
+# Runs the real GUI with its window and widget updater wrapped in counters.
+# Nothing in main.py knows about the measurement: the counters are reset
+# after the settle time and a closing event ends the main loop.
+IDLE_CODE = """
+import sys, threading
+import PySimpleGUI as sg
+import main
+settle, seconds = float(sys.argv[1]), float(sys.argv[2])
+reads, updaters, windows, errors = [0], [], [], []
+
+class CountingWindow(sg.Window):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        windows.append(self)
+    def read(self, *args, **kwargs):
+        if self is windows[0]:
+            reads[0] += 1
+        return super().read(*args, **kwargs)
+
+class CountingUpdater(main.WidgetUpdater):
+    def __init__(self, window):
+        super().__init__(window)
+        updaters.append(self)
+
+def start():
+    reads[0] = 0
+    for updater in updaters:
+        updater.updates = 0
+
+sg.Window = CountingWindow
+sg.popup = lambda *args, **kwargs: None
+sg.popup_error = lambda *args, **kwargs: errors.append(' '.join(map(str, args)))
+main.WidgetUpdater = CountingUpdater
+threading.Timer(settle, start).start()
+threading.Timer(settle + seconds, lambda: windows[0].write_event_value(sg.WIN_CLOSED, None)).start()
+main.main()
+if errors:
+    sys.exit(errors[-1])
+# The closing event itself is not counted
+print(f"idle wakeups={reads[0] - 1} updates={sum(u.updates for u in updaters)}", flush=True)
+"""
+
+def measure_idle(seconds=10, settle=IDLE_SETTLE):
+    """Runs the GUI idle for `seconds`; returns (main-loop wakeups, widget updates)"""
+    try:
+        result = subprocess.run([sys.executable, '-c', IDLE_CODE, str(settle), str(seconds)], cwd=HERE,
+                                timeout=settle + seconds + 60, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError("the GUI did not finish")
+    report = [line for line in result.stdout.splitlines() if line.startswith('idle ')]
+    if not report:
+        raise RuntimeError((result.stderr.strip().splitlines() or ['GUI did not start'])[-1])
+    counts = dict(item.split('=') for item in report[-1].split()[1:])
+    return int(counts['wakeups']), int(counts['updates'])
+
+def bench_idle(seconds=10, wakeups_per_second=IDLE_WAKEUPS_PER_SECOND):
+    """Starts the GUI, counts main-loop wakeups and widget updates while idle; 1 if over budget"""
+    try:
+        wakeups, updates = measure_idle(seconds)
+    except RuntimeError as e:
+        print(f"Idle measurement unavailable: {e}")
+        return 1
+    budget = wakeups_per_second * seconds
+    verdict = "OK" if wakeups <= budget else "OVER BUDGET"
+    print(f"Idle GUI over {seconds} s: {wakeups} wakeups ({wakeups / seconds:.2f}/s, budget {budget:g}), "
+          f"{updates} widget updates  {verdict}")
+    return 0 if wakeups <= budget else 1
+
+# Scheduled start/stop: lateness allowed for 99% of the timed calls
+SCHEDULER_JITTER_MS = 5
+
+def measure_scheduler_lateness(calls=200, spread=5.0):
+    """Schedules `calls` calls over `spread` seconds on one scheduler; returns their lateness in ms, sorted"""
+    import random
+    import tempfile
+    import threading
+    from datetime import datetime, timedelta
+    from scheduler import Scheduler
+
+    scheduler = Scheduler(os.path.join(tempfile.gettempdir(), 'pyDeskREC-bench-schedule.json')).start()
+    done = threading.Semaphore(0)
+    now = datetime.now()
+    for _ in range(calls):
+        scheduler.call_at(now + timedelta(seconds=random.uniform(0.1, spread)), done.release)
+    for _ in range(calls):
+        done.acquire()
+    return sorted(seconds * 1000 for seconds in scheduler.lateness)
+
+def percentile(values, fraction):
+    """The value below which `fraction` of the sorted values lie"""
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+def bench_scheduler(calls=200, spread=5.0, budget_ms=SCHEDULER_JITTER_MS):
+    """Schedules `calls` calls over `spread` seconds on one scheduler and reports their lateness"""
+    lateness = measure_scheduler_lateness(calls, spread)
+    p99 = percentile(lateness, 0.99)
+    verdict = "OK" if p99 <= budget_ms else "OVER BUDGET"
+    print(f"{calls} scheduled calls over {spread:g} s: lateness median {median(lateness):.3f} ms, "
+          f"p99 {p99:.3f} ms (budget {budget_ms} ms), max {lateness[-1]:.3f} ms  {verdict}")
+    return 0 if p99 <= budget_ms else 1
+
+def bench_start(recorder, runs=5, seconds=2, folder=None):
+    """Median click-to-first-frame latency of cold starts and of hot standby takes"""
+    import shutil
+    import tempfile
+    from engine import STOP_TIMEOUT
+
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found")
+        return 1
+    recorder.prepare()
+    recorder.countdown_seconds = 0
+    recorder.duration_minutes = 0
+    folder = tempfile.mkdtemp(prefix='pyDeskREC-bench-', dir=folder)
+    results = {}
+    try:
+        for mode in ('cold', 'standby'):
+            recorder.standby = mode == 'standby'
+            if recorder.standby:
+                recorder.engine.arm().result()
+                time.sleep(seconds)  # Settle, so the pre-roll holds a keyframe
+            samples = []
+            for run in range(runs):
+                recorder.output_file = os.path.join(folder, f"start_{mode}_{run}.{recorder.video_format}")
+                if not recorder.start_recording().result(STOP_TIMEOUT):
+                    print(f"{mode}: the recording did not start")
+                    return 1
+                time.sleep(seconds)
+                recorder.engine.stop()
+                recorder.engine.wait_idle(STOP_TIMEOUT + 5)
+                if recorder.start_latency is not None:
+                    samples.append(recorder.start_latency * 1000)
+            recorder.engine.disarm().result()
+            results[mode] = samples
+    finally:
+        recorder.engine.shutdown()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"Click to first frame over {runs} starts (ms, negative = pre-roll before the click):")
+    for mode, samples in results.items():
+        if samples:
+            print(f"  {mode:8s} median {median(samples):+8.1f}   min {min(samples):+8.1f}   max {max(samples):+8.1f}")
+        else:
+            print(f"  {mode:8s} not measured")
+    return 0 if all(results.values()) else 1
+
+# Synthetic stand-in for x11grab, so finalize timings do not need a display
+FINALIZE_SOURCE = ['-f', 'lavfi', '-i', 'testsrc2=size=1280x720:rate=30',
+                   '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100']
+FINALIZE_MODES = {
+    'faststart (inline)': ['-movflags', '+faststart'],
+    'fragmented': ['-g', '60', '-movflags', '+frag_keyframe+empty_moov+default_base_moof'],
+}
+
+def time_finalize(movflags_args, seconds, output_file):
+    """Encodes `seconds` of media, stops ffmpeg like stop_recording() does and times the exit"""
+    import signal
+    cmd = (['ffmpeg', '-y', '-nostats', '-progress', 'pipe:1'] + FINALIZE_SOURCE +
+           ['-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac'] + movflags_args + [output_file])
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in process.stdout:
+        if line.startswith('out_time_us=') and line.strip() != 'out_time_us=N/A':
+            if int(line.split('=', 1)[1]) >= seconds * 1000000:
+                break
+    stop_requested = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    process.stdout.close()
+    process.wait()
+    return (time.perf_counter() - stop_requested) * 1000
+
+def remux_faststart(path):
+    """Rewrites an MP4 with the moov atom in front (stream copy), as the post-processing does"""
+    from postprocess import faststart_command
+    cmd, temp_file = faststart_command(path)
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise RuntimeError(f"Faststart remux failed: {result.stderr.strip()}")
+    os.replace(temp_file, path)
+
+def bench_finalize(lengths=(10, 60, 300), folder=None):
+    """Prints stop-to-exit time against recording length for both MP4 modes"""
+    import shutil
+    import tempfile
+
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found")
+        return 1
+    folder = tempfile.mkdtemp(prefix='pyDeskREC-bench-', dir=folder)
+    print("Finalize time after stop (ms), 1280x720@30 ultrafast:")
+    print(f"  {'length':>8s}  " + "  ".join(f"{name:>20s}" for name in FINALIZE_MODES) +
+          f"  {'deferred remux':>20s}")
+    try:
+        for seconds in lengths:
+            row = []
+            for index, args in enumerate(FINALIZE_MODES.values()):
+                output_file = os.path.join(folder, f"finalize_{seconds}_{index}.mp4")
+                row.append(time_finalize(args, seconds, output_file))
+            # Cost of the optional background faststart pass on the fragmented file
+            start = time.perf_counter()
+            remux_faststart(output_file)
+            row.append((time.perf_counter() - start) * 1000)
+            print(f"  {seconds:>7d}s  " + "  ".join(f"{value:>20.1f}" for value in row))
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return 0
+
+def bench_contact_sheet(seconds=300, folder=None):
+    """Compares the single-pass contact sheet with one seek and decode per tile"""
+    import shutil
+    import tempfile
+    from postprocess import CONTACT_SHEET, THUMBNAIL_WIDTH, contact_sheet_command
+
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found")
+        return 1
+    folder = tempfile.mkdtemp(prefix='pyDeskREC-bench-', dir=folder)
+    recording = os.path.join(folder, 'recording.mp4')
+    count = CONTACT_SHEET[0] * CONTACT_SHEET[1]
+    try:
+        run_timed(['ffmpeg', '-y', '-v', 'error', '-t', str(seconds)] + RENDITION_SOURCE +
+                  ['-c:v', 'libx264', '-preset', 'ultrafast', '-g', '60', recording])
+        single = run_timed(contact_sheet_command(recording, seconds))
+        seeks = [0.0, 0.0]
+        for index in range(count):
+            wall, cpu = run_timed(['ffmpeg', '-y', '-v', 'error', '-ss', f"{(index + 0.5) * seconds / count:.3f}",
+                                   '-i', recording, '-frames:v', '1', '-vf', f"scale={THUMBNAIL_WIDTH}:-2",
+                                   os.path.join(folder, f"seek_{index}.jpg")])
+            seeks[0] += wall
+            seeks[1] += cpu
+    except RuntimeError as e:
+        print(f"Benchmark failed: {e}")
+        return 1
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"Contact sheet of {count} tiles from {seconds} s of 1920x1080@30:")
+    print(f"  {'single pass (keyframes)':28s} wall {single[0]:7.2f} s   cpu {single[1]:7.2f} s")
+    print(f"  {f'{count} seeks':28s} wall {seeks[0]:7.2f} s   cpu {seeks[1]:7.2f} s")
+    return 0
+
+RENDITION_SOURCE = ['-f', 'lavfi', '-i', 'testsrc2=size=1920x1080:rate=30']
+
+def run_timed(cmd):
+    """Runs a command; returns (wall seconds, child CPU seconds)"""
+    import resource
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return wall, (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+def rendition_codec_args(rendition):
+    width, height, codec, bitrate = rendition
+    args = ['-c:v', codec, '-preset', 'veryfast'] if codec.startswith('libx26') else ['-c:v', codec]
+    return args + (['-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bitrate] if bitrate else [])
+
+def bench_renditions(seconds=20, renditions=((1280, 720, 'libx264', '2M'),), folder=None):
+    """Compares one capture split into several encodes with capture-then-transcode"""
+    import shutil
+    import tempfile
+    from screen_recorder import rendition_file
+
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found")
+        return 1
+    folder = tempfile.mkdtemp(prefix='pyDeskREC-bench-', dir=folder)
+    archive = os.path.join(folder, 'archive.mp4')
+    archive_args = ['-c:v', 'libx264', '-preset', 'ultrafast']
+    base = ['ffmpeg', '-y', '-v', 'error', '-t', str(seconds)] + RENDITION_SOURCE
+    try:
+        # One process: capture and convert once, split, encode every rendition
+        count = len(renditions) + 1
+        graph = [f"[0:v]format=yuv420p,split={count}" + ''.join(f"[v{i}]" for i in range(count))]
+        graph += [f"[v{i}]scale={w}:{h}[v{i}s]" for i, (w, h, c, b) in enumerate(renditions, start=1)]
+        cmd = base + ['-filter_complex', ';'.join(graph), '-map', '[v0]'] + archive_args + [archive]
+        for index, rendition in enumerate(renditions, start=1):
+            cmd += ['-map', f"[v{index}s]"] + rendition_codec_args(rendition) + [rendition_file(archive, rendition)]
+        single = run_timed(cmd)
+
+        # Capture to the archive, then read it again for every rendition
+        wall, cpu = run_timed(base + ['-pix_fmt', 'yuv420p'] + archive_args + [archive])
+        for rendition in renditions:
+            transcode = (['ffmpeg', '-y', '-v', 'error', '-i', archive, '-vf', f"scale={rendition[0]}:{rendition[1]}"]
+                         + rendition_codec_args(rendition) + [rendition_file(archive, rendition)])
+            extra_wall, extra_cpu = run_timed(transcode)
+            wall += extra_wall
+            cpu += extra_cpu
+    except RuntimeError as e:
+        print(f"Benchmark failed: {e}")
+        return 1
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"{seconds} s of 1920x1080@30 -> archive + {len(renditions)} rendition(s):")
+    print(f"  {'single capture, split':28s} wall {single[0]:7.2f} s   cpu {single[1]:7.2f} s")
+    print(f"  {'capture then transcode':28s} wall {wall:7.2f} s   cpu {cpu:7.2f} s")
+    return 0
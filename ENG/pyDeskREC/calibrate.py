@@ -0,0 +1,143 @@
+import os
+import resource
+import signal
+import time
+from screen_recorder import ScreenRecorder
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Short timed trials of the real recording command over presets, output
+# scales and encoder thread counts. A trial sustains real time when the
+# encoder keeps up with the capture rate after a warm-up; of those, the
+# largest scale and the slowest (best compressing) preset win, with the
+# thread count that used the least CPU.
+CALIBRATION_PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster']
+CALIBRATION_SCALES = [1.0, 0.75, 0.5]
+CALIBRATION_THREADS = [0, 2, 4]
+TRIAL_SECONDS = 6
+WARMUP_SECONDS = 2
+SUSTAIN_RATIO = 0.95         # Achieved fps / requested fps needed to count as real time
+LAVFI_SIZE = (1920, 1080)
+
+class CalibrationRecorder(ScreenRecorder):
+    """ScreenRecorder that can capture a lavfi test pattern instead of the display"""
+
+    def __init__(self, config, error_queue, interactive=False):
+        super().__init__(config, error_queue, interactive)
+        self.source = 'display'
+
+    def _capture_input_args(self):
+        if self.source == 'display':
+            return super()._capture_input_args()
+        width, height = self.area[2:] if self.area else LAVFI_SIZE
+        # -re paces the pattern like a real capture, so a slow encoder falls behind
+        return ['-re', '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={self.fps}"]
+
+    def prepare(self):
+        """Video only: calibration measures the capture and the video encoder"""
+        self.record_system_audio = False
+        self.record_microphone = False
+        self.record_webcam = False
+        self.renditions = []
+        self.segment_seconds = 0
+        self.frame_rate_mode = 'constant'
+        self.governor_enabled = False
+
+def child_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def run_trial(recorder, preset, scale, threads, output_file, seconds=TRIAL_SECONDS):
+    """Records `seconds` with the given settings; returns a dict of measurements"""
+    recorder.preset, recorder.scale, recorder.threads = preset, scale, threads
+    cpu_before = child_cpu_seconds()
+    recorder._launch(output_file)
+    process = recorder.process
+    started = time.perf_counter()
+    warm = None
+    try:
+        while time.perf_counter() - started < seconds and process.poll() is None:
+            time.sleep(0.1)
+            if warm is None and time.perf_counter() - started >= WARMUP_SECONDS:
+                warm = (time.perf_counter(), recorder.stats.snapshot()['frame'])
+        ended = (time.perf_counter(), recorder.stats.snapshot()['frame'])
+    finally:
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+        process.wait()
+        recorder.progress_reader.join()
+    wall = time.perf_counter() - started
+    cpu = child_cpu_seconds() - cpu_before
+    if process.returncode not in (0, 255, -signal.SIGTERM) or warm is None:
+        raise RuntimeError(recorder.progress_reader.tail(1)[-1] if recorder.progress_reader.tail(1)
+                           else f"ffmpeg exited with {process.returncode}")
+
+    achieved = (ended[1] - warm[1]) / max(ended[0] - warm[0], 0.001)
+    stats = recorder.stats.snapshot()
+    size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+    return {
+        'preset': preset, 'scale': scale, 'threads': threads,
+        'achieved_fps': achieved,
+        'speed': stats['speed'] or 0.0,
+        'cpu_percent': 100 * cpu / wall,
+        'kbps': size * 8 / 1000 / max(stats['out_time'] or 0.001, 0.001),
+        'sustained': achieved >= SUSTAIN_RATIO * recorder.fps,
+    }
+
+def choose_best(results, presets=CALIBRATION_PRESETS):
+    """Largest scale, then slowest preset, then least CPU, among trials that sustain real time
+
+    `presets` is ordered from fastest to slowest.
+    """
+    sustained = [r for r in results if r['sustained']]
+    if not sustained:
+        return None
+    return min(sustained, key=lambda r: (-r['scale'], -presets.index(r['preset']), r['cpu_percent']))
+
+def format_result(result):
+    threads = result['threads'] or 'auto'
+    verdict = "real time" if result['sustained'] else "too slow"
+    return (f"{result['preset']:>10s} {result['scale']:>5.2f} {threads!s:>5s} "
+            f"{result['achieved_fps']:>7.1f} {result['speed']:>6.2f}x {result['cpu_percent']:>6.0f}% "
+            f"{result['kbps']:>8.0f}  {verdict}")
+
+def calibrate(recorder, presets=None, scales=None, threads=None, seconds=TRIAL_SECONDS, folder=None):
+    """Runs every combination and returns (results, best result or None)"""
+    import shutil
+    import tempfile
+
+    presets = presets or CALIBRATION_PRESETS
+    scales = scales or CALIBRATION_SCALES
+    cpus = os.cpu_count() or 1
+    threads = threads or [t for t in CALIBRATION_THREADS if t <= cpus]
+    recorder.prepare()
+    folder = tempfile.mkdtemp(prefix='pyDeskREC-calibrate-', dir=folder)
+    source = recorder.display if recorder.source == 'display' else 'lavfi testsrc2'
+    print(f"Calibrating {recorder.video_format} at {recorder.fps} fps on {source}, "
+          f"{len(presets) * len(scales) * len(threads)} trials of {seconds} s:")
+    print(f"{'preset':>10s} {'scale':>5s} {'thr':>5s} {'fps':>7s} {'speed':>7s} {'cpu':>7s} {'kbit/s':>8s}")
+    results = []
+    try:
+        for scale in scales:
+            for preset in presets:
+                for count in threads:
+                    output_file = os.path.join(folder, f"trial.{recorder.video_format}")
+                    try:
+                        result = run_trial(recorder, preset, scale, count, output_file, seconds)
+                    except (OSError, RuntimeError) as e:
+                        print(f"{preset:>10s} {scale:>5.2f} {count or 'auto'!s:>5s}  failed: {e}")
+                        continue
+                    finally:
+                        if os.path.exists(output_file):
+                            os.remove(output_file)
+                    results.append(result)
+                    print(format_result(result))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results, choose_best(results, presets)
+
+def save_calibration(config, best):
+    """Stores the chosen settings for later recordings"""
+    from config_manager import save_config
+    config.update(preset=best['preset'], scale=best['scale'], threads=best['threads'])
+    save_config(config)
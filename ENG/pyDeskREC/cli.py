@@ -0,0 +1,557 @@
+import argparse
+import os
+import queue
+import signal
+import sys
+import time
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Headless entry point: only the capture path is imported here, never
+# PySimpleGUI, tkinter or pyautogui.
+
+# Options that stand in for a saved setting: (argument dest, setting, option name).
+# Their values are checked like the settings dialog does (Settings.validate).
+SETTING_OPTIONS = [
+    ('fps', 'fps', '--fps'),
+    ('video_format', 'video_format', '--format'),
+    ('webcam_corner', 'webcam_corner', '--webcam-corner'),
+    ('webcam_width', 'webcam_width', '--webcam-width'),
+    ('audio_mix', 'audio_mix', '--audio-mix'),
+    ('metrics_port', 'metrics_port', '--metrics-port'),
+    ('mp4_mode', 'mp4_mode', '--mp4-mode'),
+    ('segment_seconds', 'segment_seconds', '--segment-seconds'),
+    ('presets', 'preset', '--presets'),
+    ('scales', 'scale', '--scales'),
+    ('threads', 'threads', '--threads'),
+]
+
+def parse_area(value):
+    """Parses an X,Y,WIDTH,HEIGHT area string"""
+    try:
+        area = tuple(int(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("area must be X,Y,WIDTH,HEIGHT")
+    if len(area) != 4 or area[2] <= 0 or area[3] <= 0:
+        raise argparse.ArgumentTypeError("area must be X,Y,WIDTH,HEIGHT with positive size")
+    return area
+
+def capture_options():
+    """Options shared by every command that captures the screen"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--area', type=parse_area, help="X,Y,WIDTH,HEIGHT (default: saved area or full screen)")
+    parser.add_argument('--fps', type=int, help="Frames per second")
+    parser.add_argument('--format', choices=['mp4', 'mkv'], dest='video_format', help="Container format")
+    parser.add_argument('--display', help="X11 display, e.g. :0.0")
+    parser.add_argument('--vfr', action='store_true',
+                        help="Variable frame rate: drop duplicate frames of static screens")
+    parser.add_argument('--audio-device', help="Pulse source for system audio")
+    parser.add_argument('--no-system-audio', action='store_true', help="Do not record system audio")
+    parser.add_argument('--mic', action='store_true', help="Record the microphone")
+    parser.add_argument('--mic-device', help="Pulse source of the microphone")
+    parser.add_argument('--webcam', choices=['overlay', 'track'],
+                        help="Add the configured video_device as picture-in-picture or (MKV) as a second video track")
+    parser.add_argument('--webcam-corner', choices=['top-left', 'top-right', 'bottom-left', 'bottom-right'])
+    parser.add_argument('--webcam-width', type=int, help="Width of the picture-in-picture in pixels")
+    parser.add_argument('--audio-mix', choices=['mix', 'separate'],
+                        help="With system audio and microphone: mix them or keep separate tracks")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve live stats on http://127.0.0.1:PORT/metrics (Prometheus) and /stats.json")
+    parser.add_argument('--stats-file', help="Rewrite live stats as JSON to this file every second")
+    return parser
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pyDeskREC', description="pyDeskREC command line")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    capture = capture_options()
+
+    record = subparsers.add_parser('record', parents=[capture], help="Record the screen without the GUI")
+    record.add_argument('--mp4-mode', choices=['fragmented', 'faststart'],
+                        help="fragmented: instant stop; faststart: remux in the background after stop")
+    record.add_argument('--duration', type=float, default=0, help="Stop after this many seconds")
+    record.add_argument('--countdown', type=int, default=0, help="Seconds to wait before starting")
+    record.add_argument('--output', help="Output file, or folder for an automatically named file")
+    record.add_argument('--segment-seconds', type=int,
+                        help="Write rolling segments of this length (0 = one file)")
+    record.add_argument('--governor', action='store_true',
+                        help="Step fps/preset/scale down (in a new part file) when the encoder falls behind")
+    record.add_argument('--renditions',
+                        help="Extra outputs from the same capture, e.g. '1280x720:libx264:2M; 854x480'")
+    record.add_argument('--no-post-processing', action='store_true',
+                        help="No thumbnails, contact sheet and metadata after the recording")
+
+    replay = subparsers.add_parser('replay', parents=[capture],
+                                   help="Keep the last seconds in a tmpfs ring; SIGUSR1 saves them")
+    replay.add_argument('--seconds', type=int, help="Length of the replay buffer")
+    replay.add_argument('--output-folder', help="Where saved replays go")
+
+    bench = subparsers.add_parser('bench-startup', help="Compare start-up time of the CLI and GUI paths")
+    bench.add_argument('--runs', type=int, default=5, help="Number of cold starts per path")
+    bench.add_argument('--importtime', action='store_true', help="Show the slowest imports of each path")
+    bench.add_argument('--budget-ms', type=float,
+                       help="Also start the GUI and fail if time to first window exceeds this")
+
+    bench = subparsers.add_parser('bench-idle', help="Count GUI wakeups and widget updates while idle")
+    bench.add_argument('--seconds', type=int, default=10, help="Length of the idle period")
+
+    bench = subparsers.add_parser('bench-finalize', help="Measure MP4 finalize time against recording length")
+    bench.add_argument('--lengths', type=int, nargs='+', default=[10, 60, 300],
+                       help="Recording lengths in seconds")
+    bench.add_argument('--folder', help="Where to write the temporary recordings")
+
+    bench = subparsers.add_parser('bench-renditions',
+                                  help="Compare one capture with split outputs against capture-then-transcode")
+    bench.add_argument('--seconds', type=int, default=20, help="Length of the synthetic recording")
+    bench.add_argument('--renditions', default='1280x720:libx264:2M', help="Proxy renditions to produce")
+    bench.add_argument('--folder', help="Where to write the temporary recordings")
+
+    calibrate = subparsers.add_parser('calibrate', parents=[capture],
+                                      help="Time short trials of presets, scales and threads; save the best")
+    calibrate.add_argument('--source', choices=['display', 'lavfi'],
+                           help="Capture the display (default when configured) or a lavfi test pattern")
+    calibrate.add_argument('--seconds', type=int, default=6, help="Length of each trial")
+    calibrate.add_argument('--presets', nargs='+', help="libx264 presets to try, fastest first")
+    calibrate.add_argument('--scales', type=float, nargs='+', help="Output scales to try, e.g. 1 0.75")
+    calibrate.add_argument('--threads', type=int, nargs='+', help="Encoder thread counts to try (0 = auto)")
+    calibrate.add_argument('--no-save', action='store_true', help="Only report, do not change pyDeskREC.ini")
+
+    devices = subparsers.add_parser('devices', help="Check ffmpeg and list audio sources, video devices and screen size")
+    devices.add_argument('--display', help="X11 display, e.g. :0.0")
+
+    schedule = subparsers.add_parser('schedule', parents=[capture],
+                                     help="Add, list or remove scheduled recordings, or run them headless")
+    schedule.add_argument('action', choices=['list', 'add', 'remove', 'run'])
+    schedule.add_argument('id', type=int, nargs='?', help="Recording to remove (see 'schedule list')")
+    schedule.add_argument('--at', help="Start once at HH:MM (next occurrence) or 'YYYY-MM-DD HH:MM'")
+    schedule.add_argument('--cron', help="Start repeatedly, e.g. '0 9 * * 1-5' (minute hour day month weekday)")
+    schedule.add_argument('--duration', type=float, default=0, help="Minutes to record (0 = until stopped)")
+    schedule.add_argument('--output-folder', help="Where 'run' saves the recordings")
+    schedule.add_argument('--standby', action='store_true',
+                          help="Keep ffmpeg armed between recordings for an instant start (uses CPU while idle)")
+
+    bench = subparsers.add_parser('bench-scheduler', help="Measure the lateness of scheduled calls")
+    bench.add_argument('--calls', type=int, default=200, help="Number of scheduled calls")
+    bench.add_argument('--spread', type=float, default=5.0, help="Seconds over which the calls are spread")
+
+    bench = subparsers.add_parser('bench-start', parents=[capture],
+                                  help="Compare click-to-first-frame latency of cold and hot standby starts")
+    bench.add_argument('--source', choices=['display', 'lavfi'],
+                       help="Capture the display (default when configured) or a lavfi test pattern")
+    bench.add_argument('--runs', type=int, default=5, help="Starts per mode")
+    bench.add_argument('--seconds', type=int, default=2, help="Length of each recording")
+    bench.add_argument('--folder', help="Where to write the temporary recordings")
+
+    bench = subparsers.add_parser('bench-contact-sheet',
+                                  help="Compare the single-pass contact sheet with one seek per tile")
+    bench.add_argument('--seconds', type=int, default=300, help="Length of the synthetic recording")
+    bench.add_argument('--folder', help="Where to write the temporary recording")
+
+    library = subparsers.add_parser('library', help="Update the recordings index and list, search or sort it")
+    library.add_argument('--folder', help="Recordings folder (default: the output folder from the settings)")
+    library.add_argument('--search', default='', help="Only names containing this text")
+    library.add_argument('--sort', default='created',
+                         choices=['name', 'created', 'duration', 'width', 'video_codec', 'size'])
+    library.add_argument('--ascending', action='store_true', help="Oldest/smallest first")
+    library.add_argument('--workers', type=int, help="Parallel ffprobe processes (default: one per CPU)")
+
+    join = subparsers.add_parser('join', help="Join the segments of a recording with stream copy")
+    join.add_argument('recording', help="Base name of the recording, e.g. ~/Video/recording_2024-01-01_10-00-00.mkv")
+    join.add_argument('--output', help="Joined file (default: the base name)")
+
+    return parser
+
+def check_setting_options(parser, args):
+    """Exits with a usage error when an option has a value its setting does not accept"""
+    from config_manager import Settings
+    options = list(SETTING_OPTIONS)
+    if args.command == 'replay':
+        options.append(('seconds', 'replay_seconds', '--seconds'))
+    for dest, name, option in options:
+        value = getattr(args, dest, None)
+        for item in value if isinstance(value, list) else [value]:
+            if item is None:
+                continue
+            try:
+                Settings(**{name: item}).validate()
+            except ValueError as e:
+                parser.error(f"argument {option}: {e}")
+    if getattr(args, 'renditions', None) and args.command == 'record':
+        from screen_recorder import parse_renditions
+        try:
+            parse_renditions(args.renditions)
+        except ValueError as e:
+            parser.error(f"argument --renditions: {e}")
+
+def make_recorder(args, recorder_class=None):
+    """Creates a headless recorder configured from the ini file and the arguments"""
+    from config_manager import load_config
+    from screen_recorder import ScreenRecorder
+
+    config, area, display = load_config()
+    recorder = (recorder_class or ScreenRecorder)(config, queue.Queue(), interactive=False)
+
+    if args.fps:
+        recorder.fps = args.fps
+    if args.video_format:
+        recorder.video_format = args.video_format
+    if args.vfr:
+        recorder.frame_rate_mode = 'variable'
+    if args.display:
+        recorder.display = args.display
+    if args.audio_device:
+        recorder.manual_audio_source = args.audio_device
+    if args.area:
+        recorder.area = args.area
+    recorder.record_system_audio = not args.no_system_audio
+    recorder.record_microphone = args.mic
+    if args.mic_device:
+        recorder.microphone_device = args.mic_device
+    if args.audio_mix:
+        recorder.audio_mix = args.audio_mix
+    if args.webcam:
+        recorder.record_webcam = True
+        recorder.webcam_mode = args.webcam
+    if args.webcam_corner:
+        recorder.webcam_corner = args.webcam_corner
+    if args.webcam_width:
+        recorder.webcam_width = args.webcam_width
+
+    if args.command != 'record':
+        return recorder
+
+    if args.mp4_mode:
+        recorder.mp4_mode = args.mp4_mode
+    if args.segment_seconds is not None:
+        recorder.segment_seconds = args.segment_seconds
+    if args.governor:
+        recorder.governor_enabled = True
+    if args.no_post_processing:
+        recorder.post_processing = False
+    if args.renditions is not None:
+        from screen_recorder import parse_renditions
+        recorder.renditions = parse_renditions(args.renditions)
+    if args.output:
+        if os.path.isdir(args.output) or args.output.endswith(os.sep):
+            recorder.output_folder = args.output
+        else:
+            recorder.output_file = args.output
+            recorder.output_folder = os.path.dirname(os.path.abspath(args.output))
+            if args.output.endswith('.mkv'):
+                recorder.video_format = 'mkv'
+            elif args.output.endswith('.mp4'):
+                recorder.video_format = 'mp4'
+    recorder.duration_minutes = args.duration / 60
+    recorder.countdown_seconds = args.countdown
+    return recorder
+
+def cmd_record(args):
+    recorder = make_recorder(args)
+    if not recorder.display:
+        print("No display configured: pass --display or set it in pyDeskREC.ini", file=sys.stderr)
+        return 2
+
+    from postprocess import get_postprocessor
+
+    def handle_signal(signum, frame):
+        if recorder.state == 'idle':
+            print("Skipping post-processing...")
+            get_postprocessor().shutdown()
+            return
+        print("Stop requested...")
+        recorder.stop_recording()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    from metrics import publisher_from_config
+    # --metrics-port/--stats-file apply to this run only, the settings stay as saved
+    metrics_publisher = publisher_from_config(recorder.config, args.metrics_port, args.stats_file).start()
+    metrics_publisher.add(recorder)
+
+    started = recorder.start_recording()
+    last_update = None
+    # Until the session (countdown, recording, stop) is over
+    while not recorder.engine.wait_idle(0.2):
+        if recorder.stats.updated_at != last_update:
+            last_update = recorder.stats.updated_at
+            print(recorder.stats.summary(), file=sys.stderr)
+
+    metrics_publisher.publish()
+    metrics_publisher.stop()
+    if not get_postprocessor().wait(0):
+        print("Post-processing (faststart remux, thumbnails); Ctrl+C skips it", file=sys.stderr)
+        while not get_postprocessor().wait(0.2):
+            pass
+
+    exit_code = recorder.process.returncode if recorder.process and started.result() else 1
+    while not recorder.error_queue.empty():
+        print(recorder.error_queue.get(), file=sys.stderr)
+    return 0 if exit_code in (0, 255, -signal.SIGTERM) else 1
+
+def cmd_replay(args):
+    from replay_buffer import ReplayBuffer
+    replay_buffer = make_recorder(args, ReplayBuffer)
+    if not replay_buffer.display:
+        print("No display configured: pass --display or set it in pyDeskREC.ini", file=sys.stderr)
+        return 2
+    if args.seconds:
+        replay_buffer.replay_seconds = args.seconds
+    if args.output_folder:
+        replay_buffer.output_folder = args.output_folder
+
+    # Signal handlers only set flags; saving happens in the loop below
+    requests = {'save': False, 'stop': False}
+
+    def request_save(signum, frame):
+        requests['save'] = True
+
+    def request_stop(signum, frame):
+        requests['stop'] = True
+
+    signal.signal(signal.SIGUSR1, request_save)
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    from metrics import publisher_from_config
+    metrics_publisher = publisher_from_config(replay_buffer.config, args.metrics_port, args.stats_file).start()
+    metrics_publisher.add(replay_buffer)
+
+    if not replay_buffer.start_buffer().result():
+        while not replay_buffer.error_queue.empty():
+            print(replay_buffer.error_queue.get(), file=sys.stderr)
+        metrics_publisher.stop()
+        return 1
+    print(f"Replay buffer running ({replay_buffer.replay_seconds} s). "
+          f"Save with: kill -USR1 {os.getpid()}", file=sys.stderr)
+    while replay_buffer.recording and not requests['stop']:
+        time.sleep(0.1)
+        if requests['save']:
+            requests['save'] = False
+            try:
+                print(replay_buffer.save())
+            except Exception as e:
+                print(f"Error saving replay: {e}", file=sys.stderr)
+    replay_buffer.stop_buffer(wait=True)
+    metrics_publisher.stop()
+
+    while not replay_buffer.error_queue.empty():
+        print(replay_buffer.error_queue.get(), file=sys.stderr)
+    return 0 if requests['stop'] else 1
+
+def cmd_bench_startup(args):
+    import benchmarks
+    status = benchmarks.bench_startup(args.runs)
+    if args.importtime:
+        for name in benchmarks.STARTUP_PATHS:
+            benchmarks.print_import_time_report(name)
+    if args.budget_ms is not None:
+        status |= benchmarks.check_first_window_budget(args.runs, args.budget_ms)
+    return status
+
+def cmd_bench_idle(args):
+    from benchmarks import bench_idle
+    return bench_idle(args.seconds)
+
+def cmd_bench_finalize(args):
+    from benchmarks import bench_finalize
+    return bench_finalize(args.lengths, args.folder)
+
+def cmd_calibrate(args):
+    import shutil
+    from calibrate import CalibrationRecorder, calibrate, format_result, save_calibration
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found", file=sys.stderr)
+        return 1
+    recorder = make_recorder(args, CalibrationRecorder)
+    recorder.source = args.source or ('display' if recorder.display else 'lavfi')
+    if recorder.source == 'display' and not recorder.display:
+        print("No display configured: pass --display, set it in pyDeskREC.ini or use --source lavfi",
+              file=sys.stderr)
+        return 2
+    results, best = calibrate(recorder, args.presets, args.scales, args.threads, args.seconds)
+    if not best:
+        print("No configuration sustained real time; try a lower --fps or a smaller --area", file=sys.stderr)
+        return 1
+    print(f"Best: {format_result(best)}")
+    if not args.no_save:
+        from config_manager import CONFIG_FILE
+        save_calibration(recorder.config, best)
+        print(f"Saved preset, scale and threads to {CONFIG_FILE}")
+    return 0
+
+def cmd_devices(args):
+    from config_manager import load_config
+    from devices import probe_audio_sources, probe_display_size, probe_ffmpeg, probe_video_devices, run_probes
+    display = args.display or load_config()[2]
+    probes = {
+        'ffmpeg': probe_ffmpeg,
+        'audio': probe_audio_sources,
+        'video': probe_video_devices,
+        'display': lambda: probe_display_size(display),
+    }
+
+    # Probes run in parallel; each result is printed as soon as it arrives
+    def report(name, result, error):
+        if error:
+            print(f"{name}: {error}")
+        elif name == 'ffmpeg':
+            print(f"ffmpeg: {'ok' if result[0] else result[1]}")
+        elif name == 'display':
+            print(f"display {display}: {'%dx%d' % result if result else 'size unknown'}")
+        elif name == 'audio':
+            print("Audio sources (name, channels, sample rate, description):")
+            for source in result:
+                kind = "monitor" if source.monitor else "input"
+                print(f"  {source.name}  {source.channels}ch {source.sample_rate}Hz {kind}  {source.description}")
+        else:
+            print("Video devices:")
+            for device in result:
+                print(f"  {device.name}  {device.description}")
+
+    results = run_probes(probes, report)
+    return 0 if results.get('ffmpeg', (False,))[0] else 1
+
+def cmd_schedule(args):
+    from scheduler import Scheduler, get_scheduler, parse_when
+    if args.action != 'run':
+        scheduler = Scheduler().load()
+    if args.action == 'add':
+        try:
+            at = parse_when(args.at) if args.at else None
+            recording = scheduler.add_recording(at, args.cron, args.duration)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        print(f"Scheduled {recording.describe()}")
+        return 0
+    if args.action == 'remove':
+        if args.id is None or not scheduler.remove_recording(args.id):
+            print(f"No scheduled recording #{args.id}", file=sys.stderr)
+            return 1
+        return 0
+    if args.action == 'list':
+        for recording, when in scheduler.list_recordings():
+            print(f"{recording.describe()}  next: {when.strftime('%Y-%m-%d %H:%M') if when else '-'}")
+        return 0
+
+    # run: stay in the foreground and record each scheduled recording when due,
+    # on the scheduler that also times the recorder's automatic stops
+    scheduler = get_scheduler()
+    recorder = make_recorder(args)
+    if not recorder.display:
+        print("No display configured: pass --display or set it in pyDeskREC.ini", file=sys.stderr)
+        return 2
+    if args.output_folder:
+        recorder.output_folder = args.output_folder
+    if args.standby:
+        recorder.standby = True
+        recorder.engine.arm()
+    stop = {'requested': False}
+
+    def handle_signal(signum, frame):
+        stop['requested'] = True
+
+    def on_recording(recording, remaining):
+        if recorder.state != 'idle':
+            print(f"Skipping {recording.describe()}: already recording", file=sys.stderr)
+            return
+        print(f"Starting scheduled recording {recording.describe()}", file=sys.stderr)
+        recorder.duration_minutes = remaining or recording.duration_minutes
+        recorder.start_recording()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    scheduler.on_recording = on_recording
+    scheduler.load()
+    print(f"Waiting for {len(scheduler.list_recordings())} scheduled recording(s); Ctrl+C to quit",
+          file=sys.stderr)
+    while not stop['requested']:
+        time.sleep(0.2)
+    scheduler.on_recording = None
+    recorder.engine.shutdown()
+    from postprocess import get_postprocessor
+    get_postprocessor().shutdown()
+    return 0
+
+def cmd_bench_scheduler(args):
+    from benchmarks import bench_scheduler
+    return bench_scheduler(args.calls, args.spread)
+
+def cmd_bench_start(args):
+    from benchmarks import bench_start
+    from calibrate import CalibrationRecorder
+    recorder = make_recorder(args, CalibrationRecorder)
+    recorder.source = args.source or ('display' if recorder.display else 'lavfi')
+    if recorder.source == 'display' and not recorder.display:
+        print("No display configured: pass --display, set it in pyDeskREC.ini or use --source lavfi",
+              file=sys.stderr)
+        return 2
+    return bench_start(recorder, args.runs, args.seconds, args.folder)
+
+def cmd_bench_contact_sheet(args):
+    from benchmarks import bench_contact_sheet
+    return bench_contact_sheet(args.seconds, args.folder)
+
+def cmd_library(args):
+    from config_manager import load_config
+    from library import LibraryIndex, format_row
+    folder = args.folder or load_config()[0].output_folder
+    library = LibraryIndex()
+    probed, removed, unchanged, seconds = library.scan(folder, args.workers)
+    print(f"Rescan of {folder}: {probed} probed, {removed} removed, {unchanged} unchanged "
+          f"in {seconds * 1000:.1f} ms", file=sys.stderr)
+    for row in library.search(folder, args.search, args.sort, not args.ascending):
+        name, created, duration, resolution, codec, size = format_row(row)
+        print(f"{created:16s}  {duration:>8s}  {resolution:>9s}  {codec:14s}  {size:>10s}  {name}")
+    return 0
+
+def cmd_join(args):
+    from segments import join_segments
+    try:
+        print(join_segments(args.recording, args.output))
+    except (ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+def cmd_bench_renditions(args):
+    from benchmarks import bench_renditions
+    from screen_recorder import parse_renditions
+    return bench_renditions(args.seconds, parse_renditions(args.renditions), args.folder)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_setting_options(parser, args)
+    if args.command == 'record':
+        return cmd_record(args)
+    if args.command == 'bench-startup':
+        return cmd_bench_startup(args)
+    if args.command == 'replay':
+        return cmd_replay(args)
+    if args.command == 'bench-renditions':
+        return cmd_bench_renditions(args)
+    if args.command == 'calibrate':
+        return cmd_calibrate(args)
+    if args.command == 'devices':
+        return cmd_devices(args)
+    if args.command == 'join':
+        return cmd_join(args)
+    if args.command == 'library':
+        return cmd_library(args)
+    if args.command == 'schedule':
+        return cmd_schedule(args)
+    if args.command == 'bench-scheduler':
+        return cmd_bench_scheduler(args)
+    if args.command == 'bench-start':
+        return cmd_bench_start(args)
+    if args.command == 'bench-contact-sheet':
+        return cmd_bench_contact_sheet(args)
+    if args.command == 'bench-idle':
+        return cmd_bench_idle(args)
+    if args.command == 'bench-finalize':
+        return cmd_bench_finalize(args)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,241 @@
+import atexit
 import configparser
+import dataclasses
 import os
-import PySimpleGUI as sg
+import threading
 
 ## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
 
 # Configuration constants
-CONFIG_FILE = "pyDeskREC.ini"
+CONFIG_DIR = os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'), 'pyDeskREC')
+CONFIG_FILE = os.path.join(CONFIG_DIR, 'pyDeskREC.ini')
+# Where older versions kept the file (the working directory); migrated on first load
+LEGACY_CONFIG_FILE = "pyDeskREC.ini"
+# Saves are written behind, at most once per SAVE_DELAY seconds
+SAVE_DELAY = 1.0
 
-def load_config():
-    """Loads or creates initial configuration"""
-    config = configparser.ConfigParser()
-    default_settings = {
-        'audio_device': '',
-        'video_device': '',
-        'fps': '30',
-        'output_folder': os.path.expanduser("~/Video"),
-        'video_format': 'mp4',
-        'area': '',
-        'display': ''
-    }
+X264_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow')
+CHOICES = {
+    'audio_mix': ('mix', 'separate'),
+    'webcam_mode': ('window', 'overlay', 'track'),
+    'webcam_corner': ('top-left', 'top-right', 'bottom-left', 'bottom-right'),
+    'frame_rate_mode': ('constant', 'variable'),
+    'preset': ('',) + X264_PRESETS,
+    'video_format': ('mp4', 'mkv'),
+    'mp4_mode': ('fragmented', 'faststart'),
+}
+# Inclusive (minimum, maximum) of numeric settings; None = unbounded
+RANGES = {
+    'system_audio_gain': (0.0, 10.0),
+    'microphone_gain': (0.0, 10.0),
+    'webcam_width': (16, None),
+    'fps': (1, 240),
+    'scale': (0.1, 1.0),
+    'threads': (0, 256),
+    'vfr_hi': (0, None),
+    'vfr_lo': (0, None),
+    'vfr_frac': (0.0, 1.0),
+    'segment_seconds': (0, None),
+    'replay_seconds': (2, None),
+    'metrics_port': (0, 65535),
+}
+
+# slots=True needs Python 3.10, the minimum version (see README)
+@dataclasses.dataclass(slots=True)
+class Settings:
+    """All settings, typed; stored in the [SETTINGS] section of CONFIG_FILE"""
+    audio_device: str = ''
+    microphone_device: str = 'default'
+    audio_mix: str = 'mix'
+    system_audio_gain: float = 1.0
+    microphone_gain: float = 1.0
+    video_device: str = ''
+    webcam_mode: str = 'window'
+    webcam_corner: str = 'bottom-right'
+    webcam_width: int = 320
+    fps: int = 30
+    frame_rate_mode: str = 'constant'
+    governor: bool = False
+    standby: bool = False
+    post_processing: bool = True
+    preset: str = ''
+    scale: float = 1.0
+    threads: int = 0
+    vfr_hi: int = 768
+    vfr_lo: int = 320
+    vfr_frac: float = 0.33
+    output_folder: str = dataclasses.field(default_factory=lambda: os.path.expanduser("~/Video"))
+    video_format: str = 'mp4'
+    mp4_mode: str = 'fragmented'
+    segment_seconds: int = 0
+    renditions: str = ''
+    replay_seconds: int = 30
+    area: tuple = None  # (x, y, width, height), None = full screen
+    display: str = ''
+    metrics_port: int = 0
+    stats_file: str = ''
+
+    def validate(self):
+        """Raises ValueError naming the first invalid setting"""
+        for name, choices in CHOICES.items():
+            if getattr(self, name) not in choices:
+                raise ValueError(f"{name} must be one of: {', '.join(c or '(empty)' for c in choices)}")
+        for name, (minimum, maximum) in RANGES.items():
+            value = getattr(self, name)
+            if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                raise ValueError(f"{name} must be between {minimum} and {maximum if maximum is not None else 'any'}")
+        if self.area is not None and (len(self.area) != 4 or self.area[2] <= 0 or self.area[3] <= 0):
+            raise ValueError("area must be X,Y,WIDTH,HEIGHT with positive size")
+
+    def update(self, **values):
+        """Sets several settings from strings or typed values; nothing changes if one is invalid"""
+        updated = dataclasses.replace(self, **{name: parse_value(name, value) for name, value in values.items()})
+        updated.validate()
+        for name in values:
+            setattr(self, name, getattr(updated, name))
+
+    def format(self, name):
+        """The setting as shown in the ini file and the GUI"""
+        return format_value(getattr(self, name))
 
+    def to_strings(self):
+        return {field.name: format_value(getattr(self, field.name)) for field in dataclasses.fields(self)}
+
+FIELD_TYPES = {field.name: field.type for field in dataclasses.fields(Settings)}
+
+def parse_value(name, value):
+    """Converts an ini/GUI string (or an already typed value) to the type of setting `name`"""
+    if name not in FIELD_TYPES:
+        raise ValueError(f"Unknown setting: {name}")
+    field_type = FIELD_TYPES[name]
+    if not isinstance(value, str):
+        if field_type is tuple and value is not None:
+            return tuple(int(v) for v in value)
+        return value if value is None or field_type is bool else field_type(value)
+    text = value.strip()
+    try:
+        if field_type is bool:
+            return text.lower() in ('on', 'true', 'yes', '1')
+        if field_type is tuple:
+            return tuple(int(v) for v in text.split(',')) if text else None
+        if field_type in (int, float):
+            # An empty field means the default
+            return field_type(text) if text else getattr(Settings(), name)
+    except ValueError:
+        raise ValueError(f"Invalid value for {name}: '{value}'")
+    return value
+
+def format_value(value):
+    if isinstance(value, bool):
+        return 'on' if value else 'off'
+    if isinstance(value, tuple):
+        return ','.join(map(str, value))
+    if value is None:
+        return ''
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+def read_settings(path):
+    """Returns (settings, changed): invalid or missing values fall back to the defaults"""
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    stored = dict(parser['SETTINGS']) if parser.has_section('SETTINGS') else {}
+    settings = Settings()
+    changed = set(stored) != set(FIELD_TYPES)
+    for name, value in stored.items():
+        if name not in FIELD_TYPES:
+            continue
+        try:
+            settings.update(**{name: value})
+        except ValueError as e:
+            print(f"Ignoring setting from {path}: {e}")
+            changed = True
+    return settings, changed
+
+def load_config():
+    """Loads or creates initial configuration; returns (settings, area, display)"""
     if os.path.exists(CONFIG_FILE):
-        config.read(CONFIG_FILE)
-        if not config.has_section('SETTINGS'):
-            config['SETTINGS'] = default_settings
-        else:
-            # Update existing settings
-            current_settings = dict(config['SETTINGS'])
-            for key, value in default_settings.items():
-                if key not in current_settings:
-                    config['SETTINGS'][key] = value
-        save_config(config)
+        settings, changed = read_settings(CONFIG_FILE)
+    elif os.path.exists(LEGACY_CONFIG_FILE):
+        settings, changed = read_settings(LEGACY_CONFIG_FILE)
+        print(f"Copying configuration from {os.path.abspath(LEGACY_CONFIG_FILE)} to {CONFIG_FILE}")
+        changed = True
     else:
-        config['SETTINGS'] = default_settings
-        save_config(config)
+        settings, changed = Settings(), True
+    # Only write the file when something was added or repaired
+    if changed:
+        save_config(settings)
+    return settings, settings.area, settings.display
+
+class ConfigWriter:
+    """Write-behind of the settings: debounced, atomic, and skipped when nothing changed"""
+
+    def __init__(self, path=CONFIG_FILE, delay=SAVE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.timer = None
+        self.pending = None     # Copy of the settings to write
+        self.written = None
+
+    def save(self, settings):
+        """Schedules writing the settings as they are now; later changes need another save"""
+        # A copy, so the timer thread never reads the live object while the GUI changes it
+        snapshot = dataclasses.replace(settings)
+        with self.lock:
+            self.pending = snapshot
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Writes pending settings now (also called at exit)"""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            settings, self.pending = self.pending, None
+            if settings is None:
+                return
+            values = settings.to_strings()
+            if values == self.written:
+                return
+            try:
+                self.write(values)
+                self.written = values
+            except OSError as e:
+                print(f"Error saving configuration: {e}")
 
-    # Load area coordinates
-    area_string = config['SETTINGS']['area']
-    area = tuple(map(int, area_string.split(','))) if area_string else None
+    def write(self, values):
+        parser = configparser.ConfigParser()
+        parser['SETTINGS'] = values
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, 'w') as configfile:
+            parser.write(configfile)
+            configfile.flush()
+            os.fsync(configfile.fileno())
+        os.replace(temp_file, self.path)
 
-    # Load display
-    display_value = config['SETTINGS']['display']
-    
-    return config, area, display_value
+config_writer = ConfigWriter()
+atexit.register(config_writer.flush)
 
 def save_config(config):
-    """Saves configuration to file"""
-    with open(CONFIG_FILE, 'w') as configfile:
-        config.write(configfile)
+    """Schedules saving the configuration (written behind, see ConfigWriter)"""
+    config_writer.save(config)
 
 def validate_time(time_str):
-    """Validates and converts time string to datetime object"""
-    from datetime import datetime
+    """Validates and converts an HH:MM string to its next occurrence (today, or tomorrow if passed)"""
+    from datetime import datetime, timedelta
     try:
         if not time_str:
             return None
         time_obj = datetime.strptime(time_str, "%H:%M")
-        return datetime.now().replace(hour=time_obj.hour, 
-                                    minute=time_obj.minute, 
-                                    second=0, 
-                                    microsecond=0)
+        now = datetime.now()
+        when = now.replace(hour=time_obj.hour, 
+                           minute=time_obj.minute, 
+                           second=0, 
+                           microsecond=0)
+        return when if when > now else when + timedelta(days=1)
     except ValueError:
         return None
@@ -1,70 +1,234 @@
+import os
+import re
 import subprocess
-import PySimpleGUI as sg
+import threading
+import time
+from collections import namedtuple
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 ## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
 
-def get_video_devices():
-    """Retrieves list of available video devices"""
+# Device lists come from one DeviceRegistry: it probes pactl and v4l2-ctl in a
+# background thread, keeps the results for DEVICE_TTL seconds and re-probes
+# when `pactl subscribe` or `udevadm monitor` report a device change. Readers
+# always get the cached records at once and an expired entry is re-probed on
+# a worker thread, so the GUI never waits for (or polls) the tools.
+DEVICE_TTL = 300
+HOTPLUG_SETTLE = 0.5          # Seconds to collect a burst of hotplug events
+PROBE_TIMEOUT = 5
+# All start-up probes together must answer within this many seconds
+STARTUP_DEADLINE = 5
+# Tool output is parsed in the C locale
+TOOL_ENV = dict(os.environ, LC_ALL='C')
+
+AudioSource = namedtuple('AudioSource', 'name description channels sample_rate monitor')
+VideoDevice = namedtuple('VideoDevice', 'name description nodes')
+
+def run_tool(cmd):
+    """Returns the stdout of a device tool, or '' if it is missing or fails"""
     try:
-        result = subprocess.run(['v4l2-ctl', '--list-devices'], 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE, 
-                              text=True)
-        devices = result.stdout.split('\n')
-        video_devices = [devices[i-1].strip() 
-                        for i in range(1, len(devices)) 
-                        if '/dev/video' in devices[i]]
-        return video_devices
-    except Exception as e:
-        print(f"Error retrieving video devices: {e}")
-        return []
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, env=TOOL_ENV, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Error running {cmd[0]}: {e}")
+        return ''
+    return result.stdout if result.returncode == 0 else ''
+
+def parse_pactl_sources(text):
+    """Parses `pactl list sources` into AudioSource records"""
+    sources = []
+    fields = None
+    for line in text.splitlines() + ['Source #end']:
+        if line.startswith('Source #'):
+            if fields and 'Name' in fields:
+                spec = re.search(r'(\d+)ch (\d+)Hz', fields.get('Sample Specification', ''))
+                sources.append(AudioSource(
+                    name=fields['Name'],
+                    description=fields.get('Description', fields['Name']),
+                    channels=int(spec.group(1)) if spec else 0,
+                    sample_rate=int(spec.group(2)) if spec else 0,
+                    monitor=fields.get('Monitor of Sink', 'n/a') != 'n/a' or fields['Name'].endswith('.monitor'),
+                ))
+            fields = {}
+        elif fields is not None and line.startswith('\t') and not line.startswith('\t\t') and ':' in line:
+            key, value = line.strip().split(':', 1)
+            fields[key] = value.strip()
+    return sources
+
+def parse_v4l2_devices(text):
+    """Parses `v4l2-ctl --list-devices` into VideoDevice records (name = first /dev/video node)"""
+    devices = []
+    description, nodes = None, []
+    for line in text.splitlines() + ['']:
+        if line.startswith(('\t', ' ')):
+            nodes.append(line.strip())
+            continue
+        video_nodes = [node for node in nodes if node.startswith('/dev/video')]
+        if description and video_nodes:
+            devices.append(VideoDevice(name=video_nodes[0], description=description, nodes=video_nodes))
+        description, nodes = line.strip().rstrip(':') or None, []
+    return devices
+
+def parse_display_size(text):
+    """Returns (width, height) from `xdpyinfo` output, or None"""
+    match = re.search(r'dimensions:\s+(\d+)x(\d+) pixels', text)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def probe_display_size(display=None):
+    cmd = ['xdpyinfo'] + (['-display', display] if display else [])
+    return parse_display_size(run_tool(cmd))
+
+def probe_audio_sources():
+    return parse_pactl_sources(run_tool(['pactl', 'list', 'sources']))
+
+def probe_video_devices():
+    return parse_v4l2_devices(run_tool(['v4l2-ctl', '--list-devices']))
+
+class DeviceRegistry:
+    """Cached audio sources and video devices, refreshed on hotplug and server events"""
+
+    PROBES = {'audio': probe_audio_sources, 'video': probe_video_devices}
+    # Watchers print one line per event; only device additions and removals matter
+    WATCHERS = {
+        'audio': (['pactl', 'subscribe'], re.compile(r"Event '(new|remove)' on (source|server)")),
+        'video': (['udevadm', 'monitor', '--udev', '--subsystem-match=video4linux'],
+                  re.compile(r'^UDEV\s.*\s(add|remove)\s')),
+    }
+
+    def __init__(self, ttl=DEVICE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.cache = {}              # kind -> (probed at, records)
+        self.probing = set()         # Kinds being probed right now
+        self.listeners = []
+        self.watchers = []
+        self.stopped = False
+
+    def start(self, probe=True):
+        """Starts the hotplug watchers and, unless the caller probes via refresh(), the first probe"""
+        if probe:
+            threading.Thread(target=self._initial_probe, daemon=True).start()
+        for kind, (cmd, pattern) in self.WATCHERS.items():
+            threading.Thread(target=self._watch, args=(kind, cmd, pattern), daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        for process in self.watchers:
+            process.terminate()
 
-def get_audio_sources():
-    """Retrieves list of available audio sources"""
+    def add_listener(self, callback):
+        """callback(kind) is called from a background thread after every refresh"""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def audio_sources(self):
+        return self.get('audio')
+
+    def video_devices(self):
+        return self.get('video')
+
+    def get(self, kind):
+        """Returns the cached records at once, [] before the first probe answered
+
+        A missing or expired entry is re-probed on a worker thread; the
+        listeners are called when the new records are in.
+        """
+        with self.lock:
+            entry = self.cache.get(kind)
+            expired = entry is None or time.monotonic() - entry[0] >= self.ttl
+            start = expired and kind not in self.probing
+            if start:
+                self.probing.add(kind)
+        if start:
+            threading.Thread(target=self.refresh, args=(kind,), daemon=True).start()
+        return entry[1] if entry else []
+
+    def refresh(self, kind):
+        """Probes `kind` now (blocking the caller), updates the cache and calls the listeners"""
+        with self.lock:
+            self.probing.add(kind)
+        try:
+            records = self.PROBES[kind]()
+        finally:
+            with self.lock:
+                self.probing.discard(kind)
+        with self.lock:
+            self.cache[kind] = (time.monotonic(), records)
+        for callback in list(self.listeners):
+            callback(kind)
+        return records
+
+    def _initial_probe(self):
+        for kind in self.PROBES:
+            self.refresh(kind)
+
+    def _watch(self, kind, cmd, pattern):
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, text=True, env=TOOL_ENV)
+        except OSError:
+            # Without the tool the cache is only renewed by its TTL
+            return
+        self.watchers.append(process)
+        changed, closed = threading.Event(), threading.Event()
+        threading.Thread(target=self._refresh_on_change, args=(kind, changed, closed), daemon=True).start()
+        with process.stdout:
+            for line in process.stdout:
+                if pattern.search(line):
+                    changed.set()
+        closed.set()
+        changed.set()
+
+    def _refresh_on_change(self, kind, changed, closed):
+        while changed.wait() and not closed.is_set() and not self.stopped:
+            # One refresh for a burst of events (a USB device brings several nodes)
+            time.sleep(HOTPLUG_SETTLE)
+            changed.clear()
+            self.refresh(kind)
+
+def run_probes(probes, report, deadline=STARTUP_DEADLINE):
+    """Runs every probe at once and calls report(name, result, error) as each one answers
+
+    Probes still running at the deadline are reported with the builtin
+    TimeoutError (before Python 3.11 not the class as_completed raises) and
+    left to finish in the background. Returns {name: result} of the answered ones.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix='probe')
+    futures = {executor.submit(probe): name for name, probe in probes.items()}
+    results = {}
     try:
-        result = subprocess.run("pacmd list-sources | awk '/index:/ {print $0}; /name:/ {print $0}; /device\\.description/ {print $0}'", 
-                              shell=True, 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE, 
-                              text=True)
-        sources = result.stdout.split('\n')
-        audio_sources = [sources[i+1].strip().split("<")[1].strip(">").strip() 
-                        for i in range(len(sources)) 
-                        if "device.description" in sources[i]]
-        return [source for source in audio_sources if "monitor" in source] or audio_sources
-    except Exception as e:
-        print(f"Error retrieving audio sources: {e}")
-        return []
+        for future in as_completed(futures, timeout=deadline):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                report(name, None, e)
+            else:
+                report(name, results[name], None)
+    except concurrent.futures.TimeoutError:
+        for future, name in futures.items():
+            if not future.done():
+                report(name, None, TimeoutError(f"{name}: no answer within {deadline} s"))
+    executor.shutdown(wait=False)
+    return results
+
+def probe_ffmpeg():
+    """Checks FFmpeg without any GUI; returns (ok, error message)
 
-def check_ffmpeg_installed():
-    """Verifies if FFmpeg is installed and working"""
+    Uses the capability cache, so a warm start runs no ffmpeg process.
+    """
+    from ffmpeg_caps import load_capabilities
     try:
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE, 
-                              text=True, 
-                              timeout=5)
-        if result.returncode != 0:
-            sg.popup_error("FFmpeg is not installed or not in the PATH.", keep_on_top=True)
-            return False
-        return True
+        capabilities = load_capabilities()
     except Exception as e:
-        sg.popup_error(f"Error verifying FFmpeg: {e}", keep_on_top=True)
-        return False
-
-def show_webcam(config, stop_event):
-    """Shows webcam preview using FFplay"""
-    video_device = config['SETTINGS']['video_device']
-    if not video_device:
-        sg.popup_error("No video device found. Go to Settings to select the video device.", keep_on_top=True)
-        return
-
-    cmd = ['ffplay', '-f', 'video4linux2', '-i', video_device]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    while not stop_event.is_set():
-        import time
-        time.sleep(0.1)
-    
-    process.terminate()
-    process.wait()
\ No newline at end of file
+        return False, f"Error verifying FFmpeg: {e}"
+    if not capabilities:
+        return False, "FFmpeg is not installed or not in the PATH."
+    if not capabilities['x11grab']:
+        return False, "This FFmpeg build has no x11grab input and cannot capture the screen."
+    return True, ""
@@ -0,0 +1,305 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from scheduler import get_scheduler
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Every recording session runs as one asyncio task on a single engine loop
+# thread: waiting for the start time, the countdown, starting ffmpeg,
+# recording (parts included), stopping and finalizing are states of one
+# state machine. Callers on the GUI thread only send commands (start/stop)
+# and never wait; the recorder reports back through its observers. Process
+# exits are awaited through a pidfd and ffmpeg's pipes are read with
+# add_reader, so a session needs no threads of its own.
+IDLE = 'idle'
+WAITING = 'waiting'
+COUNTDOWN = 'countdown'
+STARTING = 'starting'
+RECORDING = 'recording'
+STOPPING = 'stopping'
+FINALIZING = 'finalizing'
+TRANSITIONS = {
+    IDLE: (WAITING, COUNTDOWN, STARTING),
+    WAITING: (COUNTDOWN, STARTING, IDLE),
+    COUNTDOWN: (STARTING, IDLE),
+    STARTING: (RECORDING, IDLE),
+    RECORDING: (STOPPING, FINALIZING),  # FINALIZING directly when ffmpeg exits by itself
+    STOPPING: (FINALIZING,),
+    FINALIZING: (IDLE,),
+}
+STOP_TIMEOUT = 10  # Seconds ffmpeg gets to finalize after SIGTERM before it is killed
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop():
+    """The engine event loop, running in its own daemon thread from first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='recorder-engine', daemon=True).start()
+        return _loop
+
+async def wait_process(process):
+    """Awaits the exit of a subprocess.Popen without a waiting thread; returns its exit code"""
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        # No pidfd (old kernel) or already reaped
+        return await loop.run_in_executor(None, process.wait)
+    exited = loop.create_future()
+    loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+    try:
+        await exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+    return process.wait()
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+async def sleep_until(when):
+    """Waits for a wall-clock datetime; the scheduler thread follows clock changes and suspend"""
+    loop = asyncio.get_running_loop()
+    due = loop.create_future()
+    call = get_scheduler().call_at(when, loop.call_soon_threadsafe, _resolve, due, name='engine wake-up')
+    try:
+        await due
+    finally:
+        call.cancel()
+
+class RecorderEngine:
+    """State machine running the sessions of one ScreenRecorder on the engine loop"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.loop = get_loop()
+        self.state = IDLE
+        self.task = None
+        self.stop_event = None
+        self.started = None          # Future of the current session: True once recording
+        self.pending_starts = 0      # start() calls not yet picked up by the loop
+        self.lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.phase_started = time.perf_counter()
+        self.timings = []            # (phase, seconds) of the current or last session
+
+    # Commands, callable from any thread; none of them blocks
+
+    def start(self, start_time=None, end_time=None):
+        """Starts a session; returns a Future that is True once ffmpeg runs, False if it did not start"""
+        started = Future()
+        with self.lock:
+            self.pending_starts += 1
+            self.idle.clear()
+        asyncio.run_coroutine_threadsafe(self._session(start_time, end_time, started), self.loop)
+        return started
+
+    def stop(self):
+        """Stops the recording, or cancels a session still waiting for its start"""
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop)
+
+    def arm(self):
+        """Starts (or re-arms) the recorder's hot standby ffmpeg when idle; see standby.py"""
+        return asyncio.run_coroutine_threadsafe(self._arm(), self.loop)
+
+    def disarm(self):
+        return asyncio.run_coroutine_threadsafe(self._disarm(), self.loop)
+
+    def phase_ms(self):
+        """Milliseconds spent in each phase of the current or last session, so far"""
+        # The first entry is the idle time before the session
+        return {phase: round(seconds * 1000, 1) for phase, seconds in self.timings[1:]}
+
+    def wait_idle(self, timeout=None):
+        """Waits until no session runs; True if idle (post-processing: postprocess.py)"""
+        return self.idle.wait(timeout)
+
+    def shutdown(self, timeout=STOP_TIMEOUT + 5):
+        """Stops any session and waits for it to end"""
+        self.stop()
+        if not self.wait_idle(timeout):
+            print(f"Recorder engine still busy in state '{self.state}' after {timeout} s")
+            return False
+        self.disarm().result(STOP_TIMEOUT)
+        return True
+
+    # State machine
+
+    def _enter(self, state):
+        if state not in TRANSITIONS[self.state]:
+            raise RuntimeError(f"Invalid recorder transition {self.state} -> {state}")
+        now = time.perf_counter()
+        self.timings.append((self.state, now - self.phase_started))
+        self.phase_started = now
+        self.state = state
+        recorder = self.recorder
+        recorder.state = state
+        recorder.recording = state in (RECORDING, STOPPING)
+        recorder.is_waiting = state in (WAITING, COUNTDOWN, STARTING)
+        if state in (STARTING, IDLE) and recorder.holds_post_processing:
+            # Post-processing of earlier recordings gives way to the capture
+            from postprocess import get_postprocessor
+            get_postprocessor().hold(self, state == STARTING)
+        if state == RECORDING and not self.started.done():
+            self.started.set_result(True)
+        recorder.notify('state')
+
+    def _update_idle(self):
+        with self.lock:
+            if self.state == IDLE and self.task is None and not self.pending_starts:
+                self.idle.set()
+
+    async def _arm(self):
+        if self.task is None:
+            await self._arm_standby()
+
+    async def _arm_standby(self):
+        try:
+            await self.loop.run_in_executor(None, self.recorder._load_capabilities)
+            self.recorder.arm_standby(self.loop)
+        except Exception as e:
+            print(f"Error arming standby: {e}")
+
+    async def _disarm(self):
+        if self.task is None:
+            reaping = self.recorder.disarm_standby()
+            if reaping:
+                await reaping
+
+    async def _stop(self):
+        if self.state in (WAITING, COUNTDOWN):
+            self.task.cancel()
+        elif self.stop_event:
+            # Also honoured when it arrives while ffmpeg is starting
+            self.stop_event.set()
+
+    async def _session(self, start_time, end_time, started):
+        with self.lock:
+            self.pending_starts -= 1
+        if self.task is not None:
+            self.recorder._message("Recording already in progress or waiting")
+            started.set_result(False)
+            self._update_idle()
+            return
+        recorder = self.recorder
+        self.task = asyncio.current_task()
+        self.started = started
+        self.stop_event = asyncio.Event()
+        self.timings = []
+        self.phase_started = time.perf_counter()
+        try:
+            if await self._prepare(start_time):
+                returncode = await self._record(end_time)
+                self._enter(FINALIZING)
+                recorder._finish(returncode)
+                self._enter(IDLE)
+                recorder._message("Recording stopped.", 'stopped')
+                if recorder.standby_suspended:
+                    await self._arm_standby()
+        except Exception as e:
+            # Bug in a later phase: leave ffmpeg stopped and the machine idle
+            print(f"Error in recording session: {e}")
+            if recorder.process and recorder.process.poll() is None:
+                recorder.process.kill()
+            self.state = IDLE
+            recorder.state, recorder.recording, recorder.is_waiting = IDLE, False, False
+            from postprocess import get_postprocessor
+            get_postprocessor().hold(self, False)
+            recorder.notify('state')
+        finally:
+            if not started.done():
+                started.set_result(False)
+            self.task = None
+            self.stop_event = None
+            self._update_idle()
+
+    async def _prepare(self, start_time):
+        """Waiting, countdown and start of ffmpeg; False if cancelled or failed"""
+        recorder = self.recorder
+        try:
+            if start_time and start_time > datetime.now():
+                self._enter(WAITING)
+                await sleep_until(start_time)
+            if recorder.countdown_seconds > 0:
+                self._enter(COUNTDOWN)
+                began = self.loop.time()
+                for i in range(recorder.countdown_seconds, 0, -1):
+                    recorder._message(f"Recording starts in {i} seconds...", 'countdown')
+                    await asyncio.sleep(began + recorder.countdown_seconds - i + 1 - self.loop.time())
+            if self.timings:
+                # Timed start: latency is measured from the moment the start was due
+                recorder.click_time = time.time()
+            self._enter(STARTING)
+            # A cold capability cache runs ffmpeg several times: not on the loop
+            await self.loop.run_in_executor(None, recorder._load_capabilities)
+            recorder._begin_recording(self.loop)
+        except asyncio.CancelledError:
+            recorder._message("Recording start cancelled")
+            self._enter(IDLE)
+            return False
+        except Exception as e:
+            recorder._abort_start(e)
+            self._enter(IDLE)
+            return False
+        self._enter(RECORDING)
+        recorder._message("Recording started", 'started')
+        return True
+
+    async def _record(self, end_time):
+        """Runs ffmpeg (and the parts the governor asks for) until it exits; returns the exit code"""
+        recorder = self.recorder
+        timer = None
+        if recorder.duration_minutes > 0:
+            timer = self.loop.call_later(recorder.duration_minutes * 60, self.stop_event.set)
+        elif end_time:
+            timer = asyncio.create_task(self._stop_at(end_time))
+        try:
+            while True:
+                returncode = await self._run_process()
+                await recorder.progress_reader.wait_closed()
+                if not recorder.switch_requested or recorder.stop_requested:
+                    return returncode
+                # Segment boundary requested by the governor: continue in the next part
+                recorder.switch_requested = False
+                recorder.part += 1
+                try:
+                    recorder._launch(recorder.part_file(recorder.part), self.loop)
+                except Exception as e:
+                    print(f"Error starting part {recorder.part}: {e}")
+                    return returncode
+        finally:
+            if timer:
+                timer.cancel()
+
+    async def _run_process(self):
+        recorder = self.recorder
+        process = recorder.process
+        exited = asyncio.ensure_future(wait_process(process))
+        stopping = asyncio.ensure_future(self.stop_event.wait())
+        await asyncio.wait((exited, stopping), return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not exited.done():
+            print("Stopping recording...")
+            self._enter(STOPPING)
+            recorder.stop_requested = True
+            recorder._terminate()
+            try:
+                await asyncio.wait_for(asyncio.shield(exited), STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"FFmpeg did not finish within {STOP_TIMEOUT} s, killing it")
+                process.kill()
+        return await exited
+
+    async def _stop_at(self, end_time):
+        await sleep_until(end_time)
+        self.stop_event.set()
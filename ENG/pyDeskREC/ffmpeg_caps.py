@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# What the installed ffmpeg build supports. Listing it takes several ffmpeg
+# runs, so the result is cached on disk and reused while the binary (path,
+# size and mtime) is unchanged; warm starts run no ffmpeg at all.
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'pyDeskREC')
+CACHE_FILE = os.path.join(CACHE_DIR, 'ffmpeg_capabilities.json')
+CACHE_VERSION = 1
+LIST_OPTIONS = ('-encoders', '-filters', '-muxers', '-devices')
+FILTER_LINE = re.compile(r'^ [T.][S.][C.] (\S+)\s+\S+->\S+')
+
+_capabilities = {}
+
+def ffmpeg_key(path):
+    """Identifies a build by its path, size and modification time"""
+    info = os.stat(path)
+    return [os.path.realpath(path), info.st_size, info.st_mtime_ns]
+
+def run_ffmpeg(path, option):
+    result = subprocess.run([path, '-hide_banner', option], stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, timeout=10)
+    return result.stdout
+
+def parse_list(text):
+    """Parses the (flags, names) table after the ' ---' separator of -encoders/-muxers/-devices"""
+    entries = {}
+    started = False
+    for line in text.splitlines():
+        if line.strip().startswith('--'):
+            started = True
+            continue
+        fields = line.split()
+        if not started or len(fields) < 2:
+            continue
+        for name in fields[1].split(','):
+            entries[name] = fields[0]
+    return entries
+
+def parse_filters(text):
+    return sorted(match.group(1) for match in map(FILTER_LINE.match, text.splitlines()) if match)
+
+def parse_version(text):
+    """'ffmpeg version 6.1.1-3ubuntu5 ...' -> [6, 1]; [0, 0] for git builds without a release number"""
+    match = re.search(r'ffmpeg version n?(\d+)\.(\d+)', text)
+    return [int(match.group(1)), int(match.group(2))] if match else [0, 0]
+
+def probe_capabilities(path):
+    """Runs the ffmpeg listings (in parallel) and returns the capability record"""
+    with ThreadPoolExecutor(max_workers=len(LIST_OPTIONS) + 1) as executor:
+        version, encoders, filters, muxers, devices = executor.map(
+            lambda option: run_ffmpeg(path, option), ('-version',) + LIST_OPTIONS)
+    devices = parse_list(devices)
+    inputs = sorted(name for name, flags in devices.items() if 'D' in flags)
+    return {
+        'cache_version': CACHE_VERSION,
+        'key': ffmpeg_key(path),
+        'version': parse_version(version),
+        'encoders': sorted(parse_list(encoders)),
+        'filters': parse_filters(filters),
+        'muxers': sorted(name for name, flags in parse_list(muxers).items() if 'E' in flags),
+        'input_devices': inputs,
+        'x11grab': 'x11grab' in inputs,
+        'pulse': 'pulse' in inputs,
+    }
+
+def read_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_cache(capabilities):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp_file = f"{CACHE_FILE}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(capabilities, f, indent=1)
+        os.replace(temp_file, CACHE_FILE)
+    except OSError as e:
+        print(f"Error writing ffmpeg capability cache: {e}")
+
+def load_capabilities(path=None):
+    """Capabilities of the ffmpeg on PATH (or `path`), from the disk cache when the binary is unchanged
+
+    Returns None when ffmpeg is not installed.
+    """
+    path = path or shutil.which('ffmpeg')
+    if not path:
+        return None
+    key = ffmpeg_key(path)
+    if path in _capabilities and _capabilities[path]['key'] == key:
+        return _capabilities[path]
+    cached = read_cache()
+    if cached.get('cache_version') == CACHE_VERSION and cached.get('key') == key:
+        capabilities = cached
+    else:
+        capabilities = probe_capabilities(path)
+        write_cache(capabilities)
+    _capabilities[path] = capabilities
+    return capabilities
+
+def missing(capabilities, kind, *names):
+    """Names not supported by this build (nothing is missing when the build is unknown)"""
+    if not capabilities:
+        return []
+    return [name for name in names if name not in capabilities[kind]]
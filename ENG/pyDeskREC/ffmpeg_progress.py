@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import deque
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# ffmpeg is started with "-nostats -progress pipe:1": stdout then carries
+# key=value blocks terminated by "progress=continue" (or "progress=end"),
+# and stderr only carries log lines.
+PROGRESS_ARGS = ['-nostats', '-progress', 'pipe:1']
+LOG_LINES = 200
+
+def parse_number(value, suffix=''):
+    """Parses values such as '1.02x' or '2048.3kbits/s'; returns None for 'N/A'"""
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+class FFmpegStats:
+    """Live statistics of a running ffmpeg, updated once per progress block"""
+
+    FIELDS = ('frame', 'fps', 'speed', 'bitrate_kbps', 'total_size', 'out_time',
+              'dup_frames', 'drop_frames', 'progress', 'updated_at')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = None
+        self.bitrate_kbps = None
+        self.total_size = 0
+        self.out_time = 0.0
+        self.dup_frames = 0
+        self.drop_frames = 0
+        self.progress = ''
+        self.updated_at = None
+
+    def update(self, block):
+        """Applies one complete progress block (dict of raw strings)"""
+        with self.lock:
+            if 'frame' in block:
+                self.frame = int(parse_number(block['frame']) or 0)
+            if 'fps' in block:
+                self.fps = parse_number(block['fps']) or 0.0
+            if 'speed' in block:
+                self.speed = parse_number(block['speed'], 'x')
+            if 'bitrate' in block:
+                self.bitrate_kbps = parse_number(block['bitrate'], 'kbits/s')
+            if 'total_size' in block:
+                self.total_size = int(parse_number(block['total_size']) or 0)
+            if 'out_time_us' in block:
+                microseconds = parse_number(block['out_time_us'])
+                if microseconds is not None:
+                    self.out_time = microseconds / 1000000
+            if 'dup_frames' in block:
+                self.dup_frames = int(parse_number(block['dup_frames']) or 0)
+            if 'drop_frames' in block:
+                self.drop_frames = int(parse_number(block['drop_frames']) or 0)
+            self.progress = block.get('progress', '')
+            self.updated_at = time.time()
+
+    def snapshot(self):
+        """Returns a consistent copy of the statistics as a dict"""
+        with self.lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+    def summary(self):
+        """One-line human readable status"""
+        stats = self.snapshot()
+        speed = f"{stats['speed']:.2f}x" if stats['speed'] is not None else "N/A"
+        bitrate = f"{stats['bitrate_kbps']:.0f} kbit/s" if stats['bitrate_kbps'] is not None else "N/A"
+        return (f"{stats['out_time']:.0f} s  frame {stats['frame']}  {stats['fps']:.1f} fps  "
+                f"speed {speed}  {bitrate}  {stats['total_size'] / 1048576:.1f} MB  "
+                f"dup {stats['dup_frames']} drop {stats['drop_frames']}")
+
+class ProgressReader:
+    """Drains ffmpeg's stdout (progress) and stderr (log) incrementally"""
+
+    def __init__(self, process, stats=None, log_lines=LOG_LINES, on_progress=None):
+        self.process = process
+        self.stats = stats if stats is not None else FFmpegStats()
+        # Called from the reading thread (or event loop) after every progress block
+        self.on_progress = on_progress
+        # Only the most recent log lines are kept, however long the session
+        self.log = deque(maxlen=log_lines)
+        self.block = {}
+        self.threads = []
+        self.closed = []
+
+    def start(self, loop=None):
+        """Reads in two threads, or with add_reader on `loop` (then await wait_closed())"""
+        for handle_line, stream in ((self._progress_line, self.process.stdout),
+                                    (self._log_line, self.process.stderr)):
+            if stream is None:
+                continue
+            if loop:
+                self.closed.append(self._watch(loop, stream, handle_line))
+                continue
+            thread = threading.Thread(target=self._read, args=(stream, handle_line), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    async def wait_closed(self):
+        """Waits until ffmpeg closed both pipes (event loop mode)"""
+        for closed in self.closed:
+            await closed
+
+    def _read(self, stream, handle_line):
+        for line in stream:
+            handle_line(line)
+
+    def _watch(self, loop, stream, handle_line):
+        """Feeds complete lines from a pipe to handle_line as data arrives; returns a future for EOF"""
+        fd = stream.fileno()
+        os.set_blocking(fd, False)
+        closed = loop.create_future()
+        pending = [b'']
+
+        def on_readable():
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                return
+            lines = (pending[0] + data).split(b'\n')
+            pending[0] = lines.pop() if data else b''
+            for line in lines:
+                handle_line(line.decode(errors='replace'))
+            if not data:
+                loop.remove_reader(fd)
+                closed.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        return closed
+
+    def _progress_line(self, line):
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return
+        self.block[key] = value
+        if key == 'progress':
+            self.stats.update(self.block)
+            self.block = {}
+            if self.on_progress:
+                self.on_progress()
+
+    def _log_line(self, line):
+        line = line.rstrip()
+        if line:
+            self.log.append(line)
+
+    def tail(self, lines=20):
+        """Returns the last log lines as a single string"""
+        return "\n".join(list(self.log)[-lines:])
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# If libx264 cannot keep up, x11grab frames pile up in the input queue until
+# they are dropped. The governor measures the encoder speed between progress
+# blocks and, under sustained overload, restarts the recording in a new part
+# (a segment boundary) one step down the ladder; with enough headroom it
+# steps back up the same way. A real-time capture never encodes faster
+# than 1.0x, so headroom is a speed at real time with no dropped frames.
+# A step up that is undone at once doubles the wait before the next one.
+CHECK_INTERVAL = 1.0
+WARMUP_SECONDS = 5           # Speed right after a (re)start is not meaningful
+OVERLOAD_SPEED = 0.95
+OVERLOAD_SAMPLES = 5         # Consecutive slow samples before stepping down
+HEADROOM_SPEED = 0.99
+HEADROOM_SAMPLES = 60        # Consecutive real-time samples without drops before stepping up
+HEADROOM_BACKOFF_MAX = 16    # Largest multiple of HEADROOM_SAMPLES after failed step-ups
+STOP_TIMEOUT = 5             # Seconds stop() waits for the watching thread
+
+def build_ladder(fps, preset, scale=1.0):
+    """Returns the levels from the configured settings (0) to the cheapest"""
+    ladder = [{'fps': fps, 'preset': preset, 'scale': scale}]
+    steps = [('preset', 'ultrafast'), ('fps', max(1, round(fps * 2 / 3))), ('scale', 0.75),
+             ('fps', max(1, round(fps / 2))), ('scale', 0.5)]
+    for key, value in steps:
+        level = dict(ladder[-1])
+        if level[key] == value or (key != 'preset' and value > level[key]):
+            continue
+        level[key] = value
+        ladder.append(level)
+    return ladder
+
+class EncoderGovernor:
+    """Adapts fps, preset and scale of a running ScreenRecorder to the encoder speed"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.original = (recorder.fps, recorder.preset, recorder.scale)
+        base_preset = recorder.preset or ('veryfast' if recorder.video_format == 'mkv' else 'ultrafast')
+        self.ladder = build_ladder(recorder.fps, base_preset, recorder.scale)
+        self.level = 0
+        self.slow_samples = 0
+        self.fast_samples = 0
+        self.headroom_samples = HEADROOM_SAMPLES
+        self.samples_since_step_up = None
+        self.decisions = []
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.log_file = f"{os.path.splitext(recorder.first_output)[0]}.governor.log"
+
+    def start(self):
+        self.log(f"started at level 0 {self.ladder[0]} ({len(self.ladder)} levels)")
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops watching and gives the next recording the configured settings again"""
+        self.stop_event.set()
+        # A level change in progress finishes first, so it cannot overwrite the restored settings
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(STOP_TIMEOUT)
+        self.recorder.fps, self.recorder.preset, self.recorder.scale = self.original
+        if self.level:
+            self.log(f"recording ended at level {self.level}")
+
+    def log(self, message):
+        """Every decision is printed and appended to <recording>.governor.log"""
+        line = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {message}"
+        self.decisions.append(line)
+        print(f"Governor: {message}")
+        try:
+            with open(self.log_file, 'a') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Error writing governor log: {e}")
+
+    def _run(self):
+        previous = None
+        part = self.recorder.part
+        part_started = time.time()
+        while not self.stop_event.wait(CHECK_INTERVAL):
+            if self.recorder.part != part:
+                part, part_started, previous = self.recorder.part, time.time(), None
+            stats = self.recorder.stats.snapshot()
+            if stats['updated_at'] is None or time.time() - part_started < WARMUP_SECONDS:
+                continue
+            sample = (stats['updated_at'], stats['out_time'], stats['drop_frames'])
+            if previous and sample[0] > previous[0]:
+                # Media seconds produced per wall second, and frames dropped, since the last sample
+                self.observe((sample[1] - previous[1]) / (sample[0] - previous[0]), sample[2] - previous[2])
+            previous = sample
+
+    def observe(self, speed, dropped=0):
+        """Feeds one speed sample (and the frames dropped meanwhile) and changes level when sustained"""
+        if self.samples_since_step_up is not None:
+            self.samples_since_step_up += 1
+        if speed < OVERLOAD_SPEED:
+            self.slow_samples += 1
+            self.fast_samples = 0
+        elif speed >= HEADROOM_SPEED and not dropped:
+            self.fast_samples += 1
+            self.slow_samples = 0
+        else:
+            self.slow_samples = self.fast_samples = 0
+
+        if self.slow_samples >= OVERLOAD_SAMPLES and self.level < len(self.ladder) - 1:
+            if self.samples_since_step_up is not None and self.samples_since_step_up < HEADROOM_SAMPLES:
+                # The last step up did not hold: wait longer before the next one
+                self.headroom_samples = min(self.headroom_samples * 2, HEADROOM_SAMPLES * HEADROOM_BACKOFF_MAX)
+            self.samples_since_step_up = None
+            self.change_level(self.level + 1, f"speed {speed:.2f}x below {OVERLOAD_SPEED} for {self.slow_samples} s")
+        elif self.fast_samples >= self.headroom_samples and self.level > 0:
+            self.samples_since_step_up = 0
+            self.change_level(self.level - 1, f"speed {speed:.2f}x without dropped frames for {self.fast_samples} s")
+        elif self.slow_samples == OVERLOAD_SAMPLES:
+            self.log(f"speed {speed:.2f}x but already at the lowest level")
+
+    def change_level(self, level, reason):
+        settings = self.ladder[level]
+        direction = "down" if level > self.level else "up"
+        self.log(f"step {direction} to level {level} {settings}: {reason}")
+        self.level = level
+        self.slow_samples = self.fast_samples = 0
+        self.recorder.fps = settings['fps']
+        self.recorder.preset = settings['preset']
+        self.recorder.scale = settings['scale']
+        self.recorder.switch_segment()
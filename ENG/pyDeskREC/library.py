@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from ffmpeg_caps import CACHE_DIR
+from postprocess import probe_command, sidecar
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Index of the recordings in the output folder, kept in SQLite. A rescan
+# lists the folder once and compares every file's size and mtime with the
+# index, so only new or changed files are probed (by parallel ffprobe
+# processes, or from the .probe.json the post-processing already wrote).
+# A rescan of an unchanged library does no probing and no writes.
+LIBRARY_DB = os.path.join(CACHE_DIR, 'library.sqlite')
+VIDEO_EXTENSIONS = ('.mp4', '.mkv')
+PROBE_TIMEOUT = 30
+SORT_COLUMNS = ('name', 'created', 'duration', 'width', 'video_codec', 'size')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    created REAL,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    video_codec TEXT,
+    audio_codec TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_folder ON recordings (folder);
+CREATE INDEX IF NOT EXISTS recordings_created ON recordings (created);
+"""
+
+def is_recording(name):
+    # Skip the temporary files of a running faststart remux
+    return name.endswith(VIDEO_EXTENSIONS) and '.faststart.' not in name
+
+def name_time(name):
+    """Creation time from recording_YYYY-MM-DD_HH-MM-SS..., or None"""
+    try:
+        return datetime.strptime(name[10:29], '%Y-%m-%d_%H-%M-%S').timestamp() if name.startswith('recording_') else None
+    except ValueError:
+        return None
+
+def probe_recording(path):
+    """ffprobe metadata of a file, from its .probe.json when that is newer than the file"""
+    probe_file = sidecar(path, 'probe.json')
+    try:
+        if os.stat(probe_file).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            with open(probe_file) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    result = subprocess.run(probe_command(path), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, timeout=PROBE_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ffprobe failed")
+    return json.loads(result.stdout)
+
+def metadata(probe):
+    """The indexed columns from ffprobe -show_format -show_streams output"""
+    streams = probe.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+    created = None
+    creation_time = probe.get('format', {}).get('tags', {}).get('creation_time')
+    if creation_time:
+        try:
+            created = datetime.fromisoformat(creation_time.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+    duration = probe.get('format', {}).get('duration')
+    return {
+        'created': created,
+        'duration': float(duration) if duration not in (None, 'N/A') else None,
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'video_codec': video.get('codec_name'),
+        'audio_codec': audio.get('codec_name'),
+    }
+
+class LibraryIndex:
+    """The recordings index; every call opens its own connection, so any thread may use it"""
+
+    def __init__(self, db_file=LIBRARY_DB):
+        self.db_file = db_file
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        connection = sqlite3.connect(self.db_file, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def scan(self, folder, workers=None, probe=probe_recording):
+        """Brings the index of `folder` up to date; returns (probed, removed, unchanged, seconds)"""
+        started = time.perf_counter()
+        folder = os.path.abspath(os.path.expanduser(folder))
+        files = {}
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if is_recording(entry.name) and entry.is_file():
+                        info = entry.stat()
+                        files[entry.path] = (entry.name, info.st_size, info.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+
+        with self.connect() as connection:
+            indexed = {row['path']: (row['size'], row['mtime_ns']) for row in
+                       connection.execute('SELECT path, size, mtime_ns FROM recordings WHERE folder = ?', (folder,))}
+            removed = [path for path in indexed if path not in files]
+            changed = [path for path, (name, size, mtime_ns) in files.items() if indexed.get(path) != (size, mtime_ns)]
+
+            rows = []
+            if changed:
+                with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2) as executor:
+                    for path, result in zip(changed, executor.map(lambda path: self._probe(path, probe), changed)):
+                        name, size, mtime_ns = files[path]
+                        row = {'path': path, 'folder': folder, 'name': name, 'size': size, 'mtime_ns': mtime_ns}
+                        row.update(result)
+                        # The name holds the start of the recording; the container tag or mtime otherwise
+                        row['created'] = name_time(name) or row['created'] or mtime_ns / 1e9
+                        rows.append(row)
+            connection.executemany('DELETE FROM recordings WHERE path = ?', [(path,) for path in removed])
+            connection.executemany(
+                'INSERT OR REPLACE INTO recordings (path, folder, name, size, mtime_ns, created, duration, width, '
+                'height, video_codec, audio_codec, error) VALUES (:path, :folder, :name, :size, :mtime_ns, '
+                ':created, :duration, :width, :height, :video_codec, :audio_codec, :error)', rows)
+        connection.close()
+        return len(changed), len(removed), len(files) - len(changed), time.perf_counter() - started
+
+    @staticmethod
+    def _probe(path, probe):
+        # A file ffprobe cannot read is indexed too (with its error) and only probed again when it changes
+        try:
+            result = metadata(probe(path))
+            result['error'] = None
+        except (OSError, ValueError, RuntimeError, subprocess.SubprocessError) as e:
+            result = dict.fromkeys(('created', 'duration', 'width', 'height', 'video_codec', 'audio_codec'))
+            result['error'] = str(e)
+        return result
+
+    def search(self, folder, text='', sort='created', descending=True):
+        """Recordings of `folder` whose name contains `text`, sorted by one of SORT_COLUMNS"""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_COLUMNS)}")
+        folder = os.path.abspath(os.path.expanduser(folder))
+        order = 'DESC' if descending else 'ASC'
+        connection = self.connect()
+        try:
+            return [dict(row) for row in connection.execute(
+                f"SELECT * FROM recordings WHERE folder = ? AND name LIKE ? ESCAPE '\\' "
+                f"ORDER BY {sort} {order}, name {order}",
+                (folder, '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'))]
+        finally:
+            connection.close()
+
+def format_row(row):
+    """(name, created, duration, resolution, codec, size) strings for the GUI and the command line"""
+    duration = row['duration']
+    return (
+        row['name'],
+        datetime.fromtimestamp(row['created']).strftime('%Y-%m-%d %H:%M') if row['created'] else '',
+        f"{int(duration // 3600)}:{int(duration % 3600 // 60):02d}:{int(duration % 60):02d}" if duration else '',
+        f"{row['width']}x{row['height']}" if row['width'] else '',
+        '/'.join(codec for codec in (row['video_codec'], row['audio_codec']) if codec) or (row['error'] or '')[:30],
+        f"{row['size'] / 1048576:.1f} MB",
+    )
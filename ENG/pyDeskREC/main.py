@@ -2,61 +2,216 @@ import PySimpleGUI as sg
 import threading
 import queue
 from config_manager import load_config, save_config
-from devices import check_ffmpeg_installed, show_webcam, get_audio_sources, get_video_devices
-from screen_recorder import ScreenRecorder
+from devices import DeviceRegistry, probe_display_size, probe_ffmpeg, run_probes
 
 ## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
 
-def update_record_button(window, recorder):
+class WidgetUpdater:
+    """Updates window elements only when a value actually changed, and counts the updates"""
+
+    def __init__(self, window):
+        self.window = window
+        self.state = {}
+        self.updates = 0
+
+    def update(self, key, **kwargs):
+        changed = {name: value for name, value in kwargs.items()
+                   if (key, name) not in self.state or self.state[(key, name)] != value}
+        if not changed:
+            return
+        self.state.update(((key, name), value) for name, value in changed.items())
+        self.window[key].update(**changed)
+        self.updates += 1
+
+def update_record_button(ui, recorder):
     if recorder.recording:
-        window['Start Recording'].update(button_color=('white', 'green'))
+        ui.update('Start Recording', button_color=('white', 'green'))
     elif recorder.is_waiting:
-        window['Start Recording'].update(button_color=('black', 'yellow'), text="Waiting")
+        ui.update('Start Recording', button_color=('black', 'yellow'), text="Waiting")
     else:
-        window['Start Recording'].update(button_color=sg.theme_button_color(), text="Start Recording")
+        ui.update('Start Recording', button_color=sg.theme_button_color(), text="Start Recording")
 
-def open_settings(config):
+def device_choices(device_registry):
+    """Combo values from the registry: system audio (monitors first), microphones, webcams"""
+    sources = device_registry.audio_sources()
+    monitors = [s.name for s in sources if s.monitor] + [s.name for s in sources if not s.monitor]
+    microphones = ['default'] + [s.name for s in sources if not s.monitor]
+    webcams = [d.name for d in device_registry.video_devices()]
+    return monitors, microphones, webcams
+
+def open_settings(config, device_registry):
+    from screen_recorder import parse_renditions
+    monitors, microphones, webcams = device_choices(device_registry)
     layout = [
         [sg.Text("Settings")],
-        [sg.Text("Audio Device:"), sg.InputText(config['SETTINGS']['audio_device'], key='-AUDIO_DEVICE-'), 
+        [sg.Text("Audio Device:"), sg.Combo(monitors, default_value=config.audio_device,
+                                            size=(45, 1), key='-AUDIO_DEVICE-'),
          sg.Button('Copy Audio Command')],
-        [sg.Text("Video Device:"), sg.InputText(config['SETTINGS']['video_device'], key='-VIDEO_DEVICE-'), 
+        [sg.Text("Microphone Device:"), sg.Combo(microphones, default_value=config.microphone_device,
+                                                 size=(45, 1), key='-MIC_DEVICE-')],
+        [sg.Text("System + Microphone:"), sg.Combo(['mix', 'separate'],
+                                                   default_value=config.audio_mix,
+                                                   key='-AUDIO_MIX-', readonly=True),
+         sg.Text("System Gain:"), sg.InputText(config.format('system_audio_gain'), size=(6, 1), key='-SYSTEM_GAIN-'),
+         sg.Text("Mic Gain:"), sg.InputText(config.format('microphone_gain'), size=(6, 1), key='-MIC_GAIN-')],
+        [sg.Text("Video Device:"), sg.Combo(webcams, default_value=config.video_device,
+                                            size=(45, 1), key='-VIDEO_DEVICE-'),
          sg.Button('Copy Video Command')],
-        [sg.Text("FPS:"), sg.InputText(config['SETTINGS']['fps'], key='-FPS-')],
+        [sg.Text("Webcam:"), sg.Combo(['window', 'overlay', 'track'],
+                                      default_value=config.webcam_mode,
+                                      key='-WEBCAM_MODE-', readonly=True),
+         sg.Combo(['top-left', 'top-right', 'bottom-left', 'bottom-right'],
+                  default_value=config.webcam_corner,
+                  key='-WEBCAM_CORNER-', readonly=True),
+         sg.Text("Width:"), sg.InputText(config.format('webcam_width'), size=(6, 1), key='-WEBCAM_WIDTH-')],
+        [sg.Text("FPS:"), sg.InputText(config.format('fps'), key='-FPS-')],
+        [sg.Text("Frame Rate:"), sg.Combo(['constant', 'variable'],
+                                          default_value=config.frame_rate_mode,
+                                          key='-FRAME_RATE_MODE-', readonly=True,
+                                          tooltip="variable: drop duplicate frames of static screens"),
+         sg.Text("Thresholds hi/lo/frac:"),
+         sg.InputText(config.format('vfr_hi'), size=(6, 1), key='-VFR_HI-'),
+         sg.InputText(config.format('vfr_lo'), size=(6, 1), key='-VFR_LO-'),
+         sg.InputText(config.format('vfr_frac'), size=(6, 1), key='-VFR_FRAC-')],
+        [sg.Text("Preset:"), sg.Combo(['', 'ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium'],
+                                      default_value=config.preset, key='-PRESET-', readonly=True,
+                                      tooltip="Empty: format default. Measured by 'python3 -m pyDeskREC calibrate'"),
+         sg.Text("Scale:"), sg.InputText(config.format('scale'), size=(6, 1), key='-SCALE-'),
+         sg.Text("Threads (0 = auto):"), sg.InputText(config.format('threads'), size=(6, 1), key='-THREADS-')],
+        [sg.Checkbox("Lower fps/preset/scale when the encoder falls behind",
+                     default=config.governor, key='-GOVERNOR-')],
+        [sg.Checkbox("Keep FFmpeg armed for an instant start (uses CPU while idle)",
+                     default=config.standby, key='-STANDBY-')],
+        [sg.Checkbox("Thumbnails, contact sheet and metadata after recording (in the background)",
+                     default=config.post_processing, key='-POST_PROCESSING-')],
         [sg.Text("Video Format:"), sg.Combo(['mp4', 'mkv'], 
-                                           default_value=config['SETTINGS']['video_format'],
+                                           default_value=config.video_format,
                                            key='-VIDEO_FORMAT-',
                                            readonly=True)],
-        [sg.Text("Output Folder:"), sg.InputText(config['SETTINGS']['output_folder'], key='-OUTPUT_FOLDER-'), 
+        [sg.Text("MP4 Mode:"), sg.Combo(['fragmented', 'faststart'],
+                                        default_value=config.mp4_mode,
+                                        key='-MP4_MODE-',
+                                        readonly=True)],
+        [sg.Text("Segment Length (s, 0 = single file):"),
+         sg.InputText(config.format('segment_seconds'), size=(8, 1), key='-SEGMENT_SECONDS-'),
+         sg.Text("Replay Buffer (s):"),
+         sg.InputText(config.format('replay_seconds'), size=(8, 1), key='-REPLAY_SECONDS-')],
+        [sg.Text("Extra Renditions:"), sg.InputText(config.renditions, key='-RENDITIONS-',
+                                                    tooltip="e.g. 1280x720:libx264:2M; 854x480:libx264:800k")],
+        [sg.Text("Output Folder:"), sg.InputText(config.output_folder, key='-OUTPUT_FOLDER-'), 
          sg.FolderBrowse()],
-        [sg.Text("Display:"), sg.InputText(config['SETTINGS']['display'], key='-DISPLAY-'), 
+        [sg.Text("Display:"), sg.InputText(config.display, key='-DISPLAY-'), 
          sg.Button('Copy Display Command')],
+        [sg.Text("Metrics Port (0 = off):"), sg.InputText(config.format('metrics_port'), size=(8, 1), key='-METRICS_PORT-'),
+         sg.Text("Stats File:"), sg.InputText(config.stats_file, key='-STATS_FILE-')],
         [sg.Button('Save'), sg.Button('Cancel')]
     ]
-    window = sg.Window('Settings', layout, keep_on_top=True)
-    
+    window = sg.Window('Settings', layout, keep_on_top=True, finalize=True)
+
+    # Plugged or removed devices show up while the window is open
+    def on_devices_changed(kind):
+        window.write_event_value('-DEVICES-', kind)
+    device_registry.add_listener(on_devices_changed)
+
     while True:
         event, values = window.read()
         if event in (sg.WIN_CLOSED, 'Cancel'):
             break
+        elif event == '-DEVICES-':
+            monitors, microphones, webcams = device_choices(device_registry)
+            window['-AUDIO_DEVICE-'].update(value=values['-AUDIO_DEVICE-'], values=monitors)
+            window['-MIC_DEVICE-'].update(value=values['-MIC_DEVICE-'], values=microphones)
+            window['-VIDEO_DEVICE-'].update(value=values['-VIDEO_DEVICE-'], values=webcams)
         elif event == 'Save':
-            config['SETTINGS']['audio_device'] = values['-AUDIO_DEVICE-']
-            config['SETTINGS']['video_device'] = values['-VIDEO_DEVICE-']
-            config['SETTINGS']['fps'] = values['-FPS-']
-            config['SETTINGS']['output_folder'] = values['-OUTPUT_FOLDER-']
-            config['SETTINGS']['video_format'] = values['-VIDEO_FORMAT-']
-            config['SETTINGS']['display'] = values['-DISPLAY-']
+            try:
+                parse_renditions(values['-RENDITIONS-'])
+                config.update(
+                    audio_device=values['-AUDIO_DEVICE-'],
+                    video_device=values['-VIDEO_DEVICE-'],
+                    microphone_device=values['-MIC_DEVICE-'],
+                    webcam_mode=values['-WEBCAM_MODE-'],
+                    webcam_corner=values['-WEBCAM_CORNER-'],
+                    webcam_width=values['-WEBCAM_WIDTH-'],
+                    audio_mix=values['-AUDIO_MIX-'],
+                    system_audio_gain=values['-SYSTEM_GAIN-'],
+                    microphone_gain=values['-MIC_GAIN-'],
+                    fps=values['-FPS-'],
+                    frame_rate_mode=values['-FRAME_RATE_MODE-'],
+                    vfr_hi=values['-VFR_HI-'],
+                    vfr_lo=values['-VFR_LO-'],
+                    vfr_frac=values['-VFR_FRAC-'],
+                    governor=values['-GOVERNOR-'],
+                    preset=values['-PRESET-'],
+                    scale=values['-SCALE-'],
+                    threads=values['-THREADS-'],
+                    output_folder=values['-OUTPUT_FOLDER-'],
+                    video_format=values['-VIDEO_FORMAT-'],
+                    mp4_mode=values['-MP4_MODE-'],
+                    segment_seconds=values['-SEGMENT_SECONDS-'],
+                    renditions=values['-RENDITIONS-'],
+                    replay_seconds=values['-REPLAY_SECONDS-'],
+                    display=values['-DISPLAY-'],
+                    metrics_port=values['-METRICS_PORT-'],
+                    stats_file=values['-STATS_FILE-'],
+                    standby=values['-STANDBY-'],
+                    post_processing=values['-POST_PROCESSING-'])
+            except ValueError as e:
+                sg.popup_error(str(e), keep_on_top=True)
+                continue
             save_config(config)
             break
         elif event == 'Copy Audio Command':
-            sg.clipboard_set("pacmd list-sources | awk '/index:/ {print $0}; /name:/ {print $0}; /device\\.description/ {print $0}'")
+            sg.clipboard_set("pactl list short sources")
         elif event == 'Copy Video Command':
             sg.clipboard_set("v4l2-ctl --list-devices")
         elif event == 'Copy Display Command':
             sg.clipboard_set("echo $DISPLAY.0")
-    
+
+    device_registry.remove_listener(on_devices_changed)
     window.close()
 
+def apply_recording_settings(recorder, config, values):
+    """Copies the main window and saved settings to the recorder; ValueError on invalid numbers"""
+    from screen_recorder import parse_renditions
+    recorder.fps = int(values['-FPS-']) if values['-FPS-'].strip() else 30
+    recorder.record_system_audio = values['-AUDIO_SYSTEM-']
+    recorder.record_microphone = values['-AUDIO_MIC-']
+    # In 'overlay'/'track' mode the webcam is an input of the recording itself
+    recorder.webcam_mode = config.webcam_mode
+    recorder.webcam_corner = config.webcam_corner
+    recorder.webcam_width = config.webcam_width
+    recorder.renditions = parse_renditions(config.renditions)
+    recorder.frame_rate_mode = config.frame_rate_mode
+    recorder.vfr_hi = config.vfr_hi
+    recorder.vfr_lo = config.vfr_lo
+    recorder.vfr_frac = config.vfr_frac
+    recorder.governor_enabled = config.governor
+    recorder.preset = config.preset or None
+    recorder.scale = config.scale
+    recorder.threads = config.threads
+    recorder.record_webcam = values['-WEBCAM-'] and recorder.webcam_mode != 'window'
+    recorder.standby = config.standby
+    recorder.post_processing = config.post_processing
+    recorder.mp4_mode = config.mp4_mode
+    recorder.segment_seconds = config.segment_seconds
+    recorder.audio_mix = config.audio_mix
+    recorder.system_audio_gain = config.system_audio_gain
+    recorder.microphone_gain = config.microphone_gain
+    recorder.microphone_device = config.microphone_device
+
+def update_standby(recorder, config, values):
+    """Arms the hot standby with the current settings, or disarms it when switched off"""
+    if recorder.state != 'idle':
+        return
+    try:
+        apply_recording_settings(recorder, config, values)
+    except ValueError:
+        return
+    if recorder.standby:
+        recorder.engine.arm()
+    else:
+        recorder.engine.disarm()
+
 def open_info():
     layout = [
         [sg.Text("pyDeskREC")],
@@ -73,47 +228,226 @@ def open_info():
             break
     window.close()
 
-def main():
-    # Initialization
-    config, area, display = load_config()
-    error_queue = queue.Queue()
-    
-    # Initial configuration check
-    if not check_ffmpeg_installed():
-        exit(1)
-    
-    if not config['SETTINGS']['audio_device'] or not config['SETTINGS']['video_device'] or not config['SETTINGS']['display']:
-        sg.popup("Configuration needed: Audio Device, Video Device, Display", 
-                title="Configuration Needed", keep_on_top=True)
-    
+def open_schedule(scheduler):
+    """Lists, adds and removes saved one-shot and recurring recordings"""
+    from scheduler import parse_when
+    def rows():
+        return [f"{recording.describe()}  next: {when.strftime('%Y-%m-%d %H:%M') if when else '-'}"
+                for recording, when in scheduler.list_recordings()]
+
     layout = [
-        [sg.Text('FPS:'), sg.InputText(default_text=config['SETTINGS']['fps'], size=(10, 1), key='-FPS-')],
-        [sg.Text('Duration (in minutes):'), sg.InputText(size=(10, 1), key='-DURATION-'), 
+        [sg.Listbox(rows(), size=(70, 8), key='-JOBS-')],
+        [sg.Text('Start (HH:MM or YYYY-MM-DD HH:MM):'), sg.InputText(size=(18, 1), key='-AT-')],
+        [sg.Text('or repeat (cron: minute hour day month weekday):'), sg.InputText(size=(18, 1), key='-CRON-')],
+        [sg.Text('Duration (in minutes):'), sg.InputText(size=(10, 1), key='-JOB_DURATION-')],
+        [sg.Button('Add'), sg.Button('Remove Selected'), sg.Button('Close')]
+    ]
+    window = sg.Window('Scheduled Recordings', layout, keep_on_top=True)
+
+    while True:
+        event, values = window.read()
+        if event in (sg.WIN_CLOSED, 'Close'):
+            break
+        if event == 'Add':
+            try:
+                at = parse_when(values['-AT-']) if values['-AT-'].strip() else None
+                duration = float(values['-JOB_DURATION-']) if values['-JOB_DURATION-'].strip() else 0
+                scheduler.add_recording(at, values['-CRON-'].strip() or None, duration)
+            except ValueError as e:
+                sg.popup_error(f"Invalid schedule: {e}", keep_on_top=True)
+                continue
+            window['-JOBS-'].update(rows())
+        if event == 'Remove Selected' and values['-JOBS-']:
+            scheduler.remove_recording(int(values['-JOBS-'][0].split()[0].lstrip('#')))
+            window['-JOBS-'].update(rows())
+    window.close()
+
+def open_library(config):
+    """Browses the recordings of the output folder from the library index (library.py)"""
+    from library import SORT_COLUMNS, LibraryIndex, format_row
+    library = LibraryIndex()
+    folder = config.output_folder
+    sort, descending = 'created', True
+
+    layout = [
+        [sg.Text('Search:'), sg.InputText(size=(40, 1), key='-SEARCH-', enable_events=True),
+         sg.Text('', size=(45, 1), key='-SCAN_STATUS-')],
+        [sg.Table([], headings=['Name', 'Created', 'Duration', 'Resolution', 'Codec', 'Size'],
+                  col_widths=[36, 16, 9, 10, 14, 10], auto_size_columns=False, num_rows=16,
+                  select_mode=sg.TABLE_SELECT_MODE_BROWSE, enable_click_events=True, key='-LIBRARY-')],
+        [sg.Button('Play'), sg.Button('Open Folder'), sg.Button('Rescan'), sg.Button('Close')]
+    ]
+    window = sg.Window('Library', layout, keep_on_top=True, finalize=True)
+
+    def scan():
+        try:
+            window.write_event_value('-SCANNED-', library.scan(folder))
+        except Exception as e:
+            window.write_event_value('-SCANNED-', e)
+
+    # Show the index at once; new and changed files come in with the rescan
+    rows = library.search(folder, '', sort, descending)
+    window['-LIBRARY-'].update(values=[format_row(row) for row in rows])
+    window['-SCAN_STATUS-'].update('Scanning...')
+    threading.Thread(target=scan, daemon=True).start()
+
+    while True:
+        event, values = window.read()
+        if event in (sg.WIN_CLOSED, 'Close'):
+            break
+        if isinstance(event, tuple) and event[:2] == ('-LIBRARY-', '+CLICKED+'):
+            row, column = event[2]
+            if row != -1 or column is None:
+                continue
+            # Heading click: sort by that column, again to reverse
+            descending = not descending if SORT_COLUMNS[column] == sort else column != 0
+            sort = SORT_COLUMNS[column]
+        elif event == '-SCANNED-':
+            result = values['-SCANNED-']
+            if isinstance(result, Exception):
+                window['-SCAN_STATUS-'].update(f"Scan failed: {result}")
+                continue
+            probed, removed, unchanged, seconds = result
+            window['-SCAN_STATUS-'].update(f"{probed} new/changed, {removed} removed, {unchanged} unchanged "
+                                           f"({seconds * 1000:.0f} ms)")
+        elif event == 'Rescan':
+            window['-SCAN_STATUS-'].update('Scanning...')
+            threading.Thread(target=scan, daemon=True).start()
+            continue
+        elif event in ('Play', 'Open Folder'):
+            import subprocess
+            selected = values['-LIBRARY-']
+            if event == 'Open Folder':
+                subprocess.Popen(['xdg-open', folder])
+            elif selected:
+                subprocess.Popen(['xdg-open', rows[selected[0]]['path']])
+            continue
+        elif event != '-SEARCH-':
+            continue
+        rows = library.search(folder, values['-SEARCH-'], sort, descending)
+        window['-LIBRARY-'].update(values=[format_row(row) for row in rows])
+    window.close()
+
+def probe_in_background(window, device_registry, display):
+    """Runs all external-tool probes at once off the GUI thread; each result is a -PROBE- event"""
+    probes = {
+        'ffmpeg': probe_ffmpeg,
+        'audio': lambda: device_registry.refresh('audio'),
+        'video': lambda: device_registry.refresh('video'),
+        'display': lambda: probe_display_size(display),
+    }
+    run_probes(probes, lambda name, result, error: window.write_event_value('-PROBE-', (name, result, error)))
+
+def create_main_window(config):
+    """The main window; benchmarks.py times the start-up up to this point"""
+    layout = [
+        [sg.Text('FPS:'), sg.InputText(default_text=config.format('fps'), size=(10, 1), key='-FPS-')],
+        [sg.Text('Duration (in minutes):'), sg.InputText(size=(10, 1), key='-DURATION-', enable_events=True), 
          sg.Text('Start Time (HH:MM):'), sg.InputText(size=(10, 1), key='-START_TIME-'),
-         sg.Text('End Time (HH:MM):'), sg.InputText(size=(10, 1), key='-END_TIME-')],
+         sg.Text('End Time (HH:MM):'), sg.InputText(size=(10, 1), key='-END_TIME-', enable_events=True)],
         [sg.Text('Countdown (in seconds):'), sg.InputText(size=(10, 1), key='-COUNTDOWN-')],
         [sg.Button('Select Area'), sg.Button('Select Folder'), 
          sg.FolderBrowse(target='-FOLDER-', key='-FOLDER_BROWSE-'), 
-         sg.InputText(default_text=config['SETTINGS']['output_folder'], key='-FOLDER-')],
+         sg.InputText(default_text=config.output_folder, key='-FOLDER-')],
         [sg.Checkbox('Record System Audio', default=True, key='-AUDIO_SYSTEM-'), 
          sg.Checkbox('Record Microphone', default=False, key='-AUDIO_MIC-')],
-        [sg.Checkbox('Webcam', default=False, key='-WEBCAM-')],
+        [sg.Checkbox('Webcam', default=False, key='-WEBCAM-', enable_events=True),
+         sg.Checkbox('Replay Buffer', default=False, key='-REPLAY-', enable_events=True), sg.Button('Save Replay')],
+        [sg.Image(key='-WEBCAM_PREVIEW-', visible=False)],
         [sg.Button('Start Recording'), sg.Button('Stop Recording & Reset Area')],
-        [sg.Button('Settings'), sg.Button('Info')]
+        [sg.Text('', size=(80, 1), key='-STATUS-')],
+        [sg.Button('Settings'), sg.Button('Schedule'), sg.Button('Library'), sg.Button('Info')]
     ]
+    return sg.Window('pyDeskREC', layout, finalize=True)
+
+def save_replay(window, replay_buffer):
+    """Saves the replay buffer on a worker thread; the path or the error comes back as -REPLAY_SAVED-"""
+    try:
+        window.write_event_value('-REPLAY_SAVED-', replay_buffer.save())
+    except Exception as e:
+        window.write_event_value('-REPLAY_SAVED-', e)
+
+def main():
+    # Initialization
+    config, area, display = load_config()
+    error_queue = queue.Queue()
+    window = create_main_window(config)
+
+    # The recording stack is imported once the window is shown
+    from metrics import publisher_from_config
+    from postprocess import get_postprocessor
+    from replay_buffer import ReplayBuffer
+    from scheduler import get_scheduler
+    from screen_recorder import ScreenRecorder
+    from webcam import WebcamHub
+
+    # Slow checks run after the window is shown
+    device_registry = DeviceRegistry().start(probe=False)
+    threading.Thread(target=probe_in_background, args=(window, device_registry, display), daemon=True).start()
+
+    if not config.audio_device or not config.video_device or not config.display:
+        sg.popup("Configuration needed: Audio Device, Video Device, Display", 
+                title="Configuration Needed", keep_on_top=True)
 
-    # Create main window and initialization
-    window = sg.Window('pyDeskREC', layout)
     recorder = ScreenRecorder(config, error_queue)
-    webcam_thread = None
-    webcam_stop_event = threading.Event()
+    replay_buffer = ReplayBuffer(config, error_queue)
+    try:
+        metrics_publisher = publisher_from_config(config).start()
+        metrics_publisher.add(recorder)
+        metrics_publisher.add(replay_buffer)
+    except OSError as e:
+        metrics_publisher = None
+        sg.popup_error(f"Metrics endpoint not available: {e}", keep_on_top=True)
+    # One webcam reader shared by the preview and the recording
+    webcam_hub = WebcamHub()
+    recorder.webcam_hub = webcam_hub
+
+    # Nothing is polled: recorder, replay buffer and webcam push events into
+    # the window, so an idle window does not wake up at all
+    ui = WidgetUpdater(window)
+
+    def on_recorder_event(source, kind):
+        if kind == 'message':
+            window.write_event_value('-MESSAGE-', source.message)
+        else:
+            window.write_event_value('-RECORDER-', kind)
+
+    def on_replay_event(source, kind):
+        if kind == 'error':
+            window.write_event_value('-RECORDER-', kind)
+        elif kind == 'state':
+            window.write_event_value('-REPLAY_STATE-', source.state)
+
+    # At most one preview frame waits in the event queue
+    preview_pending = threading.Event()
+
+    def on_webcam_frame():
+        if not preview_pending.is_set():
+            preview_pending.set()
+            window.write_event_value('-WEBCAM_FRAME-', None)
+
+    # Saved recordings start from the scheduler thread, with the current settings
+    def on_scheduled_recording(recording, remaining):
+        if recorder.state != 'idle':
+            print(f"Skipping scheduled recording {recording.describe()}: already recording")
+            return
+        recorder.duration_minutes = remaining or recording.duration_minutes
+        recorder.countdown_seconds = 0
+        recorder.start_recording()
+
+    recorder.add_observer(on_recorder_event)
+    replay_buffer.add_observer(on_replay_event)
+    webcam_hub.on_frame = on_webcam_frame
+    scheduler = get_scheduler()
+    scheduler.on_recording = on_scheduled_recording
+    scheduler.load()
 
     # Main Loop
     while True:
-        event, values = window.read(timeout=20)
+        event, values = window.read()
 
         if event == sg.WIN_CLOSED:
-            if recorder.recording:
+            if recorder.state != 'idle':
                 if sg.popup_yes_no("Recording is in progress. Do you really want to exit?", 
                                 title="Confirm Exit") == "Yes":
                     recorder.stop_recording()
@@ -121,22 +455,31 @@ def main():
             else:
                 break
 
-        # Handle duration/end time
-        if values['-DURATION-'].strip():
-            window['-END_TIME-'].update(disabled=True)
-        else:
-            window['-END_TIME-'].update(disabled=False)
+        if event == '-PROBE-':
+            name, result, error = values['-PROBE-']
+            if isinstance(error, TimeoutError):
+                ui.update('-STATUS-', value=str(error))
+            elif name == 'ffmpeg' and (error or not result[0]):
+                sg.popup_error(str(error) if error else result[1], keep_on_top=True)
+                break
+            elif name == 'ffmpeg' and config.standby:
+                update_standby(recorder, config, values)
+            elif error:
+                print(f"Start-up probe {name} failed: {error}")
+            elif name == 'display' and result:
+                recorder.screen_size = replay_buffer.screen_size = result
 
-        if values['-END_TIME-'].strip():
-            window['-DURATION-'].update(disabled=True)
-        else:
-            window['-DURATION-'].update(disabled=False)
+        # Duration and end time exclude each other
+        if event in ('-DURATION-', '-END_TIME-'):
+            ui.update('-END_TIME-', disabled=bool(values['-DURATION-'].strip()))
+            ui.update('-DURATION-', disabled=bool(values['-END_TIME-'].strip()))
 
         if event == 'Select Area':
                 try:
                     recorder.choose_area()
                     # Immediately update GUI
                     window.refresh()
+                    update_standby(recorder, config, values)
                 except Exception as e:
                     print(f"Error selecting area: {e}")
                     sg.popup_error(f"Error selecting area: {e}")
@@ -155,16 +498,13 @@ def main():
                 if countdown > 3600:
                     sg.popup_error("Countdown cannot exceed 3600 seconds (1 hour).", keep_on_top=True)
                     continue
-                fps = int(values['-FPS-']) if values['-FPS-'].strip() else 30
+                apply_recording_settings(recorder, config, values)
             except ValueError:
                 sg.popup_error("Invalid numeric values", keep_on_top=True)
                 continue
 
-            recorder.fps = fps
             recorder.duration_minutes = duration
             recorder.countdown_seconds = countdown
-            recorder.record_system_audio = values['-AUDIO_SYSTEM-']
-            recorder.record_microphone = values['-AUDIO_MIC-']
 
             recorder.start_recording(start_time, end_time)
 
@@ -172,27 +512,85 @@ def main():
             recorder.stop_recording()
 
         if event == 'Settings':
-            open_settings(config)
+            open_settings(config, device_registry)
+            update_standby(recorder, config, values)
+            # A running ring keeps its size; the next start of the buffer uses the new one
+            if replay_buffer.state != 'idle' and replay_buffer.replay_seconds != config.replay_seconds:
+                ui.update('-STATUS-', value="The new replay length applies when the replay buffer is restarted")
+
+        if event == 'Schedule':
+            open_schedule(scheduler)
+
+        if event == 'Library':
+            open_library(config)
 
         if event == 'Info':
             open_info()
 
-        if values['-WEBCAM-'] and not webcam_thread:
-            if not config['SETTINGS']['video_device']:
+        if event == '-WEBCAM-':
+            if values['-WEBCAM-'] and not config.video_device:
                 sg.popup_error("Configure a video device in settings first.", keep_on_top=True)
                 window['-WEBCAM-'].update(False)
-                continue
-            webcam_stop_event.clear()
-            webcam_thread = threading.Thread(target=show_webcam, args=(config, webcam_stop_event), daemon=True)
-            webcam_thread.start()
-        elif not values['-WEBCAM-'] and webcam_thread:
-            webcam_stop_event.set()
-            webcam_thread.join()
-            webcam_thread = None
+            elif values['-WEBCAM-']:
+                webcam_hub.start_preview(config.video_device)
+            else:
+                webcam_hub.stop_preview()
+
+        if event == '-WEBCAM_FRAME-':
+            preview_pending.clear()
+            frame_number, frame = webcam_hub.latest()
+            if frame:
+                ui.update('-WEBCAM_PREVIEW-', data=frame, visible=True)
+            else:
+                ui.update('-WEBCAM_PREVIEW-', visible=False)
+
+        if event == '-REPLAY-':
+            if values['-REPLAY-'] and replay_buffer.state == 'idle':
+                replay_buffer.record_system_audio = values['-AUDIO_SYSTEM-']
+                replay_buffer.record_microphone = values['-AUDIO_MIC-']
+                replay_buffer.start_buffer()
+            elif not values['-REPLAY-'] and replay_buffer.state != 'idle':
+                replay_buffer.stop_buffer()
+
+        # The checkbox follows the buffer, which also ends when ffmpeg fails
+        if event == '-REPLAY_STATE-':
+            ui.update('-REPLAY-', value=values['-REPLAY_STATE-'] != 'idle')
+
+        # Engine messages never block: status line, plus a self-closing note for milestones
+        if event == '-MESSAGE-':
+            kind, text = values['-MESSAGE-']
+            ui.update('-STATUS-', value=text)
+            if kind == 'started':
+                sg.popup_quick_message(text, background_color='green', text_color='white')
+            elif kind in ('countdown', 'stopped'):
+                sg.popup_quick_message(text, auto_close_duration=1, keep_on_top=True)
+
+        if event == 'Save Replay':
+            if not replay_buffer.recording:
+                sg.popup_error("Enable the replay buffer first.", keep_on_top=True)
+            else:
+                # The concat runs off the GUI thread; one save at a time
+                ui.update('Save Replay', disabled=True)
+                ui.update('-STATUS-', value="Saving replay...")
+                threading.Thread(target=save_replay, args=(window, replay_buffer), daemon=True).start()
+
+        if event == '-REPLAY_SAVED-':
+            ui.update('Save Replay', disabled=False)
+            result = values['-REPLAY_SAVED-']
+            if isinstance(result, Exception):
+                ui.update('-STATUS-', value='')
+                sg.popup_error(f"Error saving replay: {result}", keep_on_top=True)
+            else:
+                ui.update('-STATUS-', value=f"Replay saved to {result}")
+                sg.popup_quick_message("Replay saved", background_color='green', text_color='white')
+
+        if event in ('-RECORDER-', 'Start Recording', 'Stop Recording & Reset Area'):
+            update_record_button(ui, recorder)
 
-        update_record_button(window, recorder)
+        if event == '-RECORDER-' and values['-RECORDER-'] == 'stats':
+            ui.update('-STATUS-', value=recorder.stats.summary() if recorder.stats.updated_at else '')
 
-        if not error_queue.empty():
+        while not error_queue.empty():
             error_message = error_queue.get()
             sg.popup_scrolled(f"ffmpeg error: {error_message}", 
                             title="ffmpeg error", 
@@ -200,12 +598,19 @@ def main():
                             no_titlebar=False, 
                             keep_on_top=True)
 
-    # Final cleanup
-    if webcam_thread:
-        webcam_stop_event.set()
-        webcam_thread.join()
-    if recorder.process:
-        recorder.stop_recording()
+    # Final cleanup; background threads must not post to the closed window
+    recorder.remove_observer(on_recorder_event)
+    replay_buffer.remove_observer(on_replay_event)
+    webcam_hub.on_frame = None
+    scheduler.on_recording = None
+    webcam_hub.stop_preview()
+    # Deterministic shutdown: both sessions stopped and finalized before the window closes
+    recorder.engine.shutdown()
+    replay_buffer.engine.shutdown()
+    get_postprocessor().shutdown()
+    if metrics_publisher:
+        metrics_publisher.stop()
+    device_registry.stop()
     window.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import json
+import os
+import time
+from datetime import datetime
+from config_manager import format_value
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Every recording gets a compact JSON sidecar, <recording>.json, describing
+# how it was made. The file is rewritten atomically (temporary file, then
+# rename) at the start, at the first frame, every MANIFEST_INTERVAL seconds
+# while recording, at the stop request and at the end, so a crash leaves
+# the data up to its last write and never a half-written file.
+MANIFEST_INTERVAL = 5.0
+# Recorder attributes stored as the settings snapshot (effective values, CLI overrides included)
+SNAPSHOT_FIELDS = ('display', 'area', 'fps', 'frame_rate_mode', 'preset', 'scale', 'threads',
+                   'video_format', 'mp4_mode', 'segment_seconds', 'record_system_audio',
+                   'manual_audio_source', 'system_audio_gain', 'record_microphone', 'microphone_device',
+                   'microphone_gain', 'audio_mix', 'record_webcam', 'webcam_mode', 'manual_video_device',
+                   'governor_enabled', 'standby', 'duration_minutes', 'countdown_seconds')
+
+def manifest_file(output_file):
+    return f"{os.path.splitext(output_file)[0]}.json"
+
+def wall_time(seconds):
+    """ISO 8601 local time with milliseconds and UTC offset, or None"""
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds).astimezone().isoformat(timespec='milliseconds')
+
+def settings_snapshot(recorder):
+    snapshot = {name: format_value(getattr(recorder, name)) for name in SNAPSHOT_FIELDS}
+    snapshot['renditions'] = recorder.config.renditions
+    return snapshot
+
+class RecordingManifest:
+    """The sidecar of one recording; updated from the engine loop as the recording runs"""
+
+    def __init__(self, recorder, output_file):
+        self.recorder = recorder
+        self.path = manifest_file(output_file)
+        self.written_at = 0.0
+        self.stop_requested_at = None  # perf_counter() of the stop request
+        self.data = {
+            'output': output_file,
+            'created': wall_time(time.time()),
+            'start_mode': None,
+            'settings': settings_snapshot(recorder),
+            'commands': [],
+            'click': wall_time(recorder.click_time),
+            'first_frame': None,
+            'start_latency_ms': None,
+            'stop_requested': None,
+            'finalize_ms': None,
+            'phases_ms': None,
+            'parts': [],
+            'frames': None,
+            'duplicated_frames': None,
+            'dropped_frames': None,
+            'average_speed': None,
+            'peak_rss_bytes': None,
+            'exit_code': None,
+            'complete': False,
+        }
+
+    def add_process(self, cmd, output_file):
+        """A new ffmpeg of this recording: its command, and a new part when it writes a new file"""
+        self.data['commands'].append(cmd)
+        if not self.data['parts'] or self.data['parts'][-1]['file'] != output_file:
+            self.data['parts'].append({'file': output_file, 'frames': 0, 'duplicated_frames': 0,
+                                       'dropped_frames': 0, 'out_time': 0.0, 'speed': None})
+        self.write()
+
+    def first_frame(self, captured_at, latency, mode):
+        self.data['start_mode'] = mode
+        self.data['first_frame'] = wall_time(captured_at)
+        self.data['start_latency_ms'] = round(latency * 1000, 1)
+        self.write()
+
+    def progress(self, stats, processes):
+        """Per progress block: samples RSS and writes at most every MANIFEST_INTERVAL seconds"""
+        from metrics import read_proc_usage
+        rss = sum(read_proc_usage(process.pid)[1] or 0 for process in processes
+                  if process and process.poll() is None)
+        if rss > (self.data['peak_rss_bytes'] or 0):
+            self.data['peak_rss_bytes'] = rss
+        self._update_part(stats)
+        if time.monotonic() - self.written_at >= MANIFEST_INTERVAL:
+            self.write()
+
+    def stop_requested(self):
+        self.stop_requested_at = time.perf_counter()
+        self.data['stop_requested'] = wall_time(time.time())
+        self.write()
+
+    def finish(self, stats, returncode, error=None):
+        """After the last ffmpeg exited: totals, finalize time and exit code"""
+        if self.stop_requested_at is not None:
+            self.data['finalize_ms'] = round((time.perf_counter() - self.stop_requested_at) * 1000, 1)
+        self._update_part(stats)
+        parts = self.data['parts']
+        for key in ('frames', 'duplicated_frames', 'dropped_frames'):
+            self.data[key] = sum(part[key] for part in parts)
+        # ffmpeg's speed is out_time / wall time of the part: weight it by out_time
+        encode_seconds = sum(part['out_time'] / part['speed'] for part in parts if part['speed'])
+        if encode_seconds:
+            self.data['average_speed'] = round(sum(part['out_time'] for part in parts if part['speed'])
+                                               / encode_seconds, 3)
+        # Finalizing is still running: its time is finalize_ms
+        self.data['phases_ms'] = self.recorder.engine.phase_ms()
+        self.data['exit_code'] = returncode
+        if error:
+            self.data['error'] = error
+        self.data['frame_report'] = self.recorder.frame_report
+        self.data['complete'] = True
+        self.write()
+
+    def _update_part(self, stats):
+        if not self.data['parts']:
+            return
+        snapshot = stats.snapshot()
+        self.data['parts'][-1].update(frames=snapshot['frame'], duplicated_frames=snapshot['dup_frames'],
+                                      dropped_frames=snapshot['drop_frames'],
+                                      out_time=round(snapshot['out_time'], 3), speed=snapshot['speed'])
+
+    def write(self):
+        self.written_at = time.monotonic()
+        temp_file = self.path + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(self.data, f, separators=(',', ':'))
+            os.replace(temp_file, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing recording manifest: {e}")
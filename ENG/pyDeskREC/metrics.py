@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Metrics are computed by one background thread once per interval and cached;
+# HTTP requests and the stats file only ever see the cached copy, so the
+# recording path is never touched by a scrape.
+PUBLISH_INTERVAL = 1.0
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+def read_proc_usage(pid):
+    """Returns (cpu seconds, rss bytes) of a process from /proc, or (None, None)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces: fields start after the last ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        rss_bytes = None
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss_bytes = int(line.split()[1]) * 1024
+                    break
+        return cpu_seconds, rss_bytes
+    except (OSError, IndexError, ValueError):
+        return None, None
+
+class MetricsPublisher:
+    """Publishes the live stats of active recorders as JSON/Prometheus text"""
+
+    def __init__(self, port=0, stats_file='', interval=PUBLISH_INTERVAL):
+        self.port = port
+        self.stats_file = stats_file
+        self.interval = interval
+        self.recorders = []
+        self.lock = threading.Lock()
+        self.cpu_samples = {}
+        self.snapshot = {'recordings': [], 'updated_at': None}
+        self.prometheus_text = ''
+        self.stop_event = threading.Event()
+        self.server = None
+        self.thread = None
+
+    @property
+    def enabled(self):
+        return bool(self.port or self.stats_file)
+
+    def add(self, recorder):
+        with self.lock:
+            if recorder not in self.recorders:
+                self.recorders.append(recorder)
+
+    def remove(self, recorder):
+        with self.lock:
+            if recorder in self.recorders:
+                self.recorders.remove(recorder)
+
+    def start(self):
+        if not self.enabled:
+            return self
+        if self.port:
+            self.server = ThreadingHTTPServer(('127.0.0.1', self.port), self._make_handler())
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            print(f"Metrics on http://127.0.0.1:{self.server.server_address[1]}/metrics")
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Error publishing metrics: {e}")
+
+    def collect(self, recorder):
+        """Builds the metrics of one recorder"""
+        stats = recorder.stats.snapshot()
+        process = recorder.process
+        now = time.time()
+        elapsed = now - recorder.start_time if recorder.start_time else 0.0
+        phases = recorder.engine.phase_ms()
+
+        cpu_percent, rss_bytes = None, None
+        if process and process.poll() is None:
+            cpu_seconds, rss_bytes = read_proc_usage(process.pid)
+            previous = self.cpu_samples.get(process.pid)
+            if cpu_seconds is not None:
+                if previous:
+                    wall = now - previous[1]
+                    if wall > 0:
+                        cpu_percent = (cpu_seconds - previous[0]) / wall * 100
+                self.cpu_samples[process.pid] = (cpu_seconds, now)
+
+        return {
+            'output': recorder.current_output,
+            'recording': recorder.recording,
+            'pid': process.pid if process else None,
+            'elapsed_seconds': round(elapsed, 3),
+            'fps_requested': recorder.fps,
+            'fps_achieved': stats['fps'],
+            'speed': stats['speed'],
+            'frames': stats['frame'],
+            'dropped_frames': stats['drop_frames'],
+            'duplicated_frames': stats['dup_frames'],
+            'bytes_written': stats['total_size'],
+            'bitrate_kbps': stats['bitrate_kbps'],
+            'cpu_percent': round(cpu_percent, 1) if cpu_percent is not None else None,
+            'rss_bytes': rss_bytes,
+            'start_latency_seconds': (round(recorder.start_latency, 3)
+                                      if recorder.start_latency is not None else None),
+            'starting_seconds': round(phases['starting'] / 1000, 4) if 'starting' in phases else None,
+        }
+
+    def publish(self):
+        """Refreshes the cached snapshot, Prometheus text and stats file"""
+        with self.lock:
+            recorders = list(self.recorders)
+        recordings = [self.collect(recorder) for recorder in recorders
+                      if recorder.recording or recorder.process]
+        live_pids = {recording['pid'] for recording in recordings}
+        for pid in list(self.cpu_samples):
+            if pid not in live_pids:
+                del self.cpu_samples[pid]
+        snapshot = {'recordings': recordings, 'updated_at': time.time()}
+        self.snapshot = snapshot
+        self.prometheus_text = self.format_prometheus(recordings)
+        if self.stats_file:
+            temp_file = f"{self.stats_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(snapshot, f, indent=1)
+            os.replace(temp_file, self.stats_file)
+
+    @staticmethod
+    def format_prometheus(recordings):
+        metrics = [
+            ('pydeskrec_recording', 'recording', 'gauge', "1 while ffmpeg is capturing"),
+            ('pydeskrec_elapsed_seconds', 'elapsed_seconds', 'gauge', "Time since the recording started"),
+            ('pydeskrec_fps_requested', 'fps_requested', 'gauge', "Requested capture frame rate"),
+            ('pydeskrec_fps_achieved', 'fps_achieved', 'gauge', "Frame rate reported by ffmpeg"),
+            ('pydeskrec_encoder_speed', 'speed', 'gauge', "Encoding speed factor (1.0 = real time)"),
+            ('pydeskrec_frames_total', 'frames', 'counter', "Frames written"),
+            ('pydeskrec_dropped_frames_total', 'dropped_frames', 'counter', "Frames dropped by ffmpeg"),
+            ('pydeskrec_duplicated_frames_total', 'duplicated_frames', 'counter', "Frames duplicated by ffmpeg"),
+            ('pydeskrec_bytes_written_total', 'bytes_written', 'counter', "Bytes written to the output"),
+            ('pydeskrec_ffmpeg_cpu_percent', 'cpu_percent', 'gauge', "ffmpeg CPU usage"),
+            ('pydeskrec_ffmpeg_rss_bytes', 'rss_bytes', 'gauge', "ffmpeg resident memory"),
+            ('pydeskrec_start_latency_seconds', 'start_latency_seconds', 'gauge',
+             "Start click to first captured frame (negative: pre-roll)"),
+            ('pydeskrec_starting_seconds', 'starting_seconds', 'gauge',
+             "Time in the starting phase (capabilities, ffmpeg launch)"),
+        ]
+        lines = []
+        for name, key, kind, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for recording in recordings:
+                value = recording[key]
+                if value is None:
+                    continue
+                output = os.path.basename(recording['output'] or '').replace('"', '')
+                lines.append(f'{name}{{output="{output}"}} {float(value):g}')
+        return "\n".join(lines) + "\n"
+
+    def _make_handler(self):
+        publisher = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = publisher.prometheus_text.encode()
+                    content_type = 'text/plain; version=0.0.4'
+                elif self.path in ('/', '/stats.json'):
+                    body = json.dumps(publisher.snapshot).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def publisher_from_config(config, port=None, stats_file=None):
+    """Creates the publisher described by the metrics_port/stats_file settings, or the given overrides"""
+    return MetricsPublisher(config.metrics_port if port is None else port,
+                            os.path.expanduser(config.stats_file if stats_file is None else stats_file))
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import engine
+from ffmpeg_caps import load_capabilities, missing
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# After a recording the finished files go through a post-processing stage:
+# faststart remux (MP4 "faststart" mode), an ffprobe metadata extract, a few
+# thumbnails and a contact sheet. Every step is an ffmpeg/ffprobe process,
+# so the pool is a bound on how many of them run at once, each started under
+# nice and the idle I/O class. The jobs are driven from the engine loop, and
+# while any recorder captures they are stopped (SIGSTOP) and nothing new is
+# started, so they never compete with a live capture. The replay buffer does
+# not hold them: it may run all day and the jobs would never finish.
+POSTPROCESS_WORKERS = 2         # ffmpeg/ffprobe processes running at once
+POSTPROCESS_QUEUE = 32          # Recordings waiting; more are skipped
+POSTPROCESS_NICE = 19
+THUMBNAILS = 3
+THUMBNAIL_WIDTH = 320
+CONTACT_SHEET = (4, 4)          # Columns x rows of thumbnails
+SHEET_FILTERS = ('fps', 'scale', 'split', 'tile', 'select')
+
+def low_priority_prefix():
+    """nice/ionice wrapper for the post-processing commands (whatever of them is installed)"""
+    prefix = []
+    if shutil.which('nice'):
+        prefix += ['nice', '-n', str(POSTPROCESS_NICE)]
+    if shutil.which('ionice'):
+        prefix += ['ionice', '-c', '3']
+    return prefix
+
+def sidecar(path, suffix):
+    """<recording>.<suffix>, next to the recording like its .json manifest and .governor.log"""
+    return f"{os.path.splitext(path)[0]}.{suffix}"
+
+def faststart_command(path):
+    """Stream copy with the moov atom in front; returns (command, temporary file)"""
+    root, extension = os.path.splitext(path)
+    temp_file = f"{root}.faststart{extension}"
+    return (['ffmpeg', '-y', '-v', 'error', '-i', path, '-map', '0', '-c', 'copy',
+             '-movflags', '+faststart', temp_file], temp_file)
+
+def probe_command(path):
+    return ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+
+def contact_sheet_command(path, duration):
+    """Contact sheet and thumbnails from one pass over the keyframes, instead of one seek per tile
+
+    fps= spreads columns*rows frames evenly over the recording; split sends them to
+    the tile filter and to a select of THUMBNAILS of them. The thumbnails keep the timestamps
+    of the selected frames (passthrough), or the muxer would duplicate frames to fill the gaps.
+    """
+    columns, rows = CONTACT_SHEET
+    count = columns * rows
+    picks = [int((i + 0.5) * count / THUMBNAILS) for i in range(THUMBNAILS)]
+    select = '+'.join(f"eq(n\\,{n})" for n in picks)
+    graph = (f"[0:v]fps={count}/{duration:.3f},scale={THUMBNAIL_WIDTH}:-2,split[tiles][thumbs];"
+             f"[tiles]tile={columns}x{rows}[sheet];[thumbs]select={select}[picked]")
+    return ['ffmpeg', '-y', '-v', 'error', '-skip_frame', 'nokey', '-i', path, '-filter_complex', graph,
+            '-map', '[sheet]', '-frames:v', '1', sidecar(path, 'contact.jpg'),
+            '-map', '[picked]', '-fps_mode', 'passthrough', sidecar(path, 'thumb%d.jpg')]
+
+class PostProcessor:
+    """Runs post-processing jobs on the engine loop, at most POSTPROCESS_WORKERS processes at once"""
+
+    def __init__(self, workers=POSTPROCESS_WORKERS):
+        self.loop = engine.get_loop()
+        self.slots = asyncio.Semaphore(workers)
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+        self.holders = set()    # Recorder engines capturing right now
+        self.running = set()    # Job processes
+        self.tasks = set()
+        self.queued = 0         # Recordings submitted and not finished
+        self.prefix = low_priority_prefix()
+        self.lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+
+    # Commands, callable from any thread
+
+    def submit(self, paths, faststart=False, extras=True):
+        """Queues the files of one finished recording; False when the queue is full"""
+        with self.lock:
+            if self.queued >= POSTPROCESS_QUEUE:
+                print(f"Post-processing queue full, skipping {paths[0]}")
+                return False
+            self.queued += 1
+            self.idle.clear()
+        self.loop.call_soon_threadsafe(self._start, paths, faststart, extras)
+        return True
+
+    def wait(self, timeout=None):
+        """Waits until every queued job is done; True if idle"""
+        return self.idle.wait(timeout)
+
+    def shutdown(self, timeout=5):
+        """Cancels the queued and running jobs (temporary files are removed)"""
+        future = asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop)
+        future.result(timeout)
+
+    # Engine loop
+
+    def hold(self, holder, capturing):
+        """A recorder started or stopped capturing: pause or resume the jobs accordingly"""
+        if capturing:
+            self.holders.add(holder)
+        else:
+            self.holders.discard(holder)
+        paused = bool(self.holders)
+        if paused == (not self.resumed.is_set()):
+            return
+        if paused:
+            self.resumed.clear()
+        else:
+            self.resumed.set()
+        for process in self.running:
+            self._signal(process, signal.SIGSTOP if paused else signal.SIGCONT)
+        if self.running:
+            print(f"Post-processing {'paused' if paused else 'resumed'}")
+
+    def _start(self, paths, faststart, extras):
+        task = self.loop.create_task(self._recording(paths, faststart, extras))
+        self.tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self.tasks.discard(task)
+        with self.lock:
+            self.queued -= 1
+            if not self.queued:
+                self.idle.set()
+
+    async def _cancel_all(self):
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def _recording(self, paths, faststart, extras):
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                if faststart and path.endswith('.mp4'):
+                    await self._faststart(path)
+                if extras:
+                    await self._extras(path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Post-processing of {path} failed: {e}")
+
+    async def _faststart(self, path):
+        cmd, temp_file = faststart_command(path)
+        try:
+            returncode, error = await self._run(cmd)
+        except asyncio.CancelledError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        if returncode != 0:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            print(f"Faststart remux failed, keeping the fragmented file: {error}")
+            return
+        os.replace(temp_file, path)
+        print(f"Faststart remux of {path} done")
+
+    async def _extras(self, path):
+        probe_file = sidecar(path, 'probe.json')
+        returncode, error = await self._run(probe_command(path), stdout_file=probe_file)
+        if returncode != 0:
+            raise RuntimeError(f"ffprobe: {error}")
+        with open(probe_file) as f:
+            duration = float(json.load(f).get('format', {}).get('duration') or 0)
+        capabilities = await self.loop.run_in_executor(None, load_capabilities)
+        unsupported = missing(capabilities, 'filters', *SHEET_FILTERS) + missing(capabilities, 'encoders', 'mjpeg')
+        if duration <= 0 or unsupported:
+            print(f"No contact sheet for {path}: " + (f"ffmpeg lacks {', '.join(unsupported)}"
+                                                       if unsupported else "unknown duration"))
+            return
+        returncode, error = await self._run(contact_sheet_command(path, duration))
+        if returncode != 0:
+            raise RuntimeError(f"contact sheet: {error}")
+        print(f"Thumbnails and contact sheet of {path} done")
+
+    async def _run(self, cmd, stdout_file=None):
+        """Runs one job process in a free slot, after any active capture; returns (exit code, stderr tail)"""
+        async with self.slots:
+            await self.resumed.wait()
+            stdout = open(stdout_file, 'w') if stdout_file else subprocess.DEVNULL
+            try:
+                # stderr is read after the exit: -v error keeps it far below the pipe size
+                process = subprocess.Popen(self.prefix + cmd, stdin=subprocess.DEVNULL, stdout=stdout,
+                                           stderr=subprocess.PIPE, start_new_session=True)
+            finally:
+                if stdout_file:
+                    stdout.close()
+            self.running.add(process)
+            try:
+                # A capture may have started while the process was launched
+                if not self.resumed.is_set():
+                    self._signal(process, signal.SIGSTOP)
+                returncode = await engine.wait_process(process)
+            except asyncio.CancelledError:
+                self._signal(process, signal.SIGCONT)
+                self._signal(process, signal.SIGTERM)
+                await self.loop.run_in_executor(None, process.wait)
+                raise
+            finally:
+                self.running.discard(process)
+                error = process.stderr.read().decode(errors='replace').strip()
+                process.stderr.close()
+            return returncode, error.splitlines()[-1] if error else ''
+
+    @staticmethod
+    def _signal(process, signum):
+        # The whole session: nice/ionice exec the job, but a shell wrapper would not
+        try:
+            os.killpg(process.pid, signum)
+        except ProcessLookupError:
+            pass
+
+_postprocessor = None
+_postprocessor_lock = threading.Lock()
+
+def get_postprocessor():
+    """The process-wide post-processing stage, shared by all recorders"""
+    global _postprocessor
+    with _postprocessor_lock:
+        if _postprocessor is None:
+            _postprocessor = PostProcessor()
+        return _postprocessor
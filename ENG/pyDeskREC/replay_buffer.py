@@ -0,0 +1,102 @@
+import math
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from screen_recorder import ScreenRecorder
+from segments import concat_copy, segment_args
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Dashcam mode: ffmpeg captures continuously into a fixed ring of short
+# MPEG-TS chunks (segment_wrap), so memory/disk use stays constant however
+# long it runs. Saving concatenates the newest chunks with stream copy.
+CHUNK_SECONDS = 2
+TMPFS_DIR = '/dev/shm'
+
+class ReplayBuffer(ScreenRecorder):
+    def __init__(self, config, error_queue, interactive=True):
+        super().__init__(config, error_queue, interactive)
+        self.replay_seconds = config.replay_seconds
+        # Only the ring is written; proxies can be made from saved replays
+        self.renditions = []
+        self.governor_enabled = False
+        self.standby = False  # The ring is the standby already
+        # Always on in dashcam use: holding post-processing would hold it for good
+        self.holds_post_processing = False
+        self.buffer_dir = None
+
+    @property
+    def ring_size(self):
+        # One extra chunk for the one being written and one for the chunk boundary
+        return math.ceil(self.replay_seconds / CHUNK_SECONDS) + 2
+
+    def _output_args(self, output_file):
+        """Writes a wrapping ring of MPEG-TS chunks instead of a recording file"""
+        return segment_args(output_file, CHUNK_SECONDS, 'ts', wrap=self.ring_size, with_list=False)
+
+    def start_buffer(self):
+        """Starts capturing into the ring on tmpfs; returns the engine's start Future"""
+        if self.state != 'idle':
+            return self.engine.start()  # Rejected by the engine with a message
+        # The ring is sized from the settings as they are now
+        self.replay_seconds = self.config.replay_seconds
+        parent = TMPFS_DIR if os.path.isdir(TMPFS_DIR) else None
+        self.buffer_dir = tempfile.mkdtemp(prefix='pyDeskREC-replay-', dir=parent)
+        self.output_file = os.path.join(self.buffer_dir, 'replay.ts')
+        self.duration_minutes = 0
+        self.countdown_seconds = 0
+        return self.start_recording()
+
+    def stop_buffer(self, wait=False):
+        """Stops capturing; the ring is freed once ffmpeg has exited"""
+        self.stop_recording(wait)
+
+    def _finish(self, returncode):
+        super()._finish(returncode)
+        self._free_buffer()
+
+    def _post_process(self):
+        # The ring is deleted; saved replays are stream copies of it
+        pass
+
+    def _abort_start(self, error):
+        super()._abort_start(error)
+        self._free_buffer()
+
+    def _free_buffer(self):
+        if self.buffer_dir:
+            shutil.rmtree(self.buffer_dir, ignore_errors=True)
+            self.buffer_dir = None
+        self.output_file = None
+
+    def reset_area(self):
+        """Stopping the buffer keeps the selected area"""
+        pass
+
+    def buffered_chunks(self, seconds=None):
+        """Returns the newest chunks covering the last `seconds`, oldest first"""
+        if not self.buffer_dir:
+            return []
+        seconds = seconds or self.replay_seconds
+        chunks = [entry for entry in os.scandir(self.buffer_dir)
+                  if entry.name.endswith('.ts') and entry.stat().st_size > 0]
+        chunks.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        # The newest chunk is still being written and holds less than CHUNK_SECONDS
+        count = math.ceil(seconds / CHUNK_SECONDS) + 1
+        return [entry.path for entry in chunks[-count:]]
+
+    def save(self, seconds=None):
+        """Saves the last `seconds` to the output folder without re-encoding; returns the path"""
+        chunks = self.buffered_chunks(seconds)
+        if not chunks:
+            raise RuntimeError("The replay buffer is empty")
+        os.makedirs(self.output_folder, exist_ok=True)
+        extension = '.mkv' if self.video_format == 'mkv' else '.mp4'
+        destination = os.path.join(self.output_folder,
+                                   f"replay_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{extension}")
+        started = time.perf_counter()
+        concat_copy(chunks, destination)
+        print(f"Replay saved to {destination} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return destination
@@ -0,0 +1,360 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# One thread runs every timed action (scheduled starts, automatic stops and
+# the saved one-shot/recurring recordings) from a heap ordered by
+# time.monotonic(). It sleeps until shortly before the earliest entry and
+# then waits out the last milliseconds precisely. The offset between wall
+# clock and monotonic clock is re-checked at least every MAX_WAIT seconds,
+# so a suspend or a clock change re-plans the heap.
+SCHEDULE_FILE = os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'),
+                             'pyDeskREC', 'schedule.json')
+MAX_WAIT = 30.0
+SPIN_SECONDS = 0.002         # Final stretch waited by yielding instead of the condition
+CLOCK_DRIFT = 0.05           # Wall/monotonic offset change that triggers re-planning
+CRON_FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+def parse_cron_field(text, minimum, maximum):
+    """'*', '5', '1-5', '*/15', '0-30/10' and comma lists -> sorted list of values"""
+    values = set()
+    for part in text.split(','):
+        spec, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if spec == '*':
+            start, end = minimum, maximum
+        elif '-' in spec:
+            start, end = (int(v) for v in spec.split('-'))
+        else:
+            start = end = int(spec)
+        if start < minimum or end > maximum or start > end or step < 1:
+            raise ValueError(f"'{part}' is outside {minimum}-{maximum}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+def parse_cron(expression):
+    """Parses 'minute hour day month weekday' (weekday 0 = Sunday, 7 also accepted)"""
+    parts = expression.split()
+    if len(parts) != 5:
+        raise ValueError("A cron expression has 5 fields: minute hour day month weekday")
+    fields = {}
+    for text, (name, minimum, maximum) in zip(parts, CRON_FIELDS):
+        try:
+            fields[name] = parse_cron_field(text, minimum, maximum)
+        except ValueError as e:
+            raise ValueError(f"Invalid cron {name} field: {e}")
+    fields['weekday'] = sorted({day % 7 for day in fields['weekday']})
+    # As in cron: if both day and weekday are restricted, either one matches
+    fields['day_any'] = parts[2] == '*'
+    fields['weekday_any'] = parts[4] == '*'
+    return fields
+
+def next_cron_time(fields, after):
+    """First minute strictly after `after` matching the parsed cron fields"""
+    start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    day = start.date()
+    for _ in range(366 * 5):
+        weekday = (day.weekday() + 1) % 7  # cron counts from Sunday
+        day_match = day.day in fields['day']
+        weekday_match = weekday in fields['weekday']
+        if fields['day_any'] or fields['weekday_any']:
+            matches = day_match and weekday_match
+        else:
+            matches = day_match or weekday_match
+        if day.month in fields['month'] and matches:
+            for hour in fields['hour']:
+                for minute in fields['minute']:
+                    candidate = datetime(day.year, day.month, day.day, hour, minute)
+                    if candidate >= start:
+                        return candidate
+        day += timedelta(days=1)
+    raise ValueError("The cron expression never matches")
+
+class ScheduledRecording:
+    """A saved recording: once at `at`, or recurring on `cron`, for duration_minutes"""
+
+    def __init__(self, job_id, at=None, cron=None, duration_minutes=0):
+        if bool(at) == bool(cron):
+            raise ValueError("A scheduled recording needs either a start time or a cron expression")
+        if cron:
+            parse_cron(cron)
+        self.job_id = job_id
+        self.at = at
+        self.cron = cron
+        self.duration_minutes = duration_minutes
+
+    def next_start(self, after):
+        if self.cron:
+            return next_cron_time(parse_cron(self.cron), after)
+        return self.at if self.at > after else None
+
+    def describe(self):
+        when = f"cron '{self.cron}'" if self.cron else self.at.strftime('%Y-%m-%d %H:%M')
+        length = f"{self.duration_minutes:g} min" if self.duration_minutes else "until stopped"
+        return f"#{self.job_id} {when}, {length}"
+
+    def to_dict(self):
+        return {'id': self.job_id, 'at': self.at.isoformat() if self.at else None,
+                'cron': self.cron, 'duration_minutes': self.duration_minutes}
+
+    @classmethod
+    def from_dict(cls, data):
+        at = datetime.fromisoformat(data['at']) if data.get('at') else None
+        return cls(data['id'], at, data.get('cron'), data.get('duration_minutes', 0))
+
+class ScheduledCall:
+    """Handle of one pending call; cancel() removes it"""
+
+    def __init__(self, scheduler, when, callback, args, name):
+        self.scheduler = scheduler
+        self.when = when          # Wall-clock datetime, for listing and re-planning
+        self.callback = callback
+        self.args = args
+        self.name = name
+        self.cancelled = False
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+class Scheduler:
+    """Single thread running timed calls and saved recordings in due order"""
+
+    def __init__(self, schedule_file=SCHEDULE_FILE):
+        self.schedule_file = schedule_file
+        self.condition = threading.Condition()
+        self.heap = []
+        self.sequence = itertools.count()
+        self.offset = time.time() - time.monotonic()
+        self.recordings = {}
+        self.occurrences = {}       # recording id -> ScheduledCall of its next start
+        self.expiries = {}          # one-shot recording id -> ScheduledCall dropping it at its end
+        self.on_recording = None    # callback(ScheduledRecording, remaining minutes or None)
+        self.lateness = deque(maxlen=1000)  # Seconds between due time and call, for bench-scheduler
+        self.file_mtime = None      # Of the schedule file as last read or written
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self.thread.start()
+        return self
+
+    def call_at(self, when, callback, *args, name=''):
+        """Calls callback(*args) on the scheduler thread at wall-clock datetime `when`"""
+        call = ScheduledCall(self, when, callback, args, name or getattr(callback, '__name__', 'call'))
+        with self.condition:
+            heapq.heappush(self.heap, (self._due(when), next(self.sequence), call))
+            self.condition.notify()
+        return call
+
+    def call_later(self, seconds, callback, *args, name=''):
+        return self.call_at(datetime.now() + timedelta(seconds=seconds), callback, *args, name=name)
+
+    def cancel(self, call):
+        with self.condition:
+            call.cancelled = True
+            self.condition.notify()
+
+    def pending(self):
+        """Pending calls in due order"""
+        with self.condition:
+            return [call for _, _, call in sorted(self.heap) if not call.cancelled]
+
+    def _due(self, when):
+        return when.timestamp() - self.offset
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self._replan_if_clock_changed()
+                self._reload_if_changed()
+                while self.heap and self.heap[0][2].cancelled:
+                    heapq.heappop(self.heap)
+                if not self.heap:
+                    self.condition.wait(MAX_WAIT)
+                    continue
+                due = self.heap[0][0]
+                remaining = due - time.monotonic()
+                if remaining > SPIN_SECONDS:
+                    self.condition.wait(min(remaining - SPIN_SECONDS, MAX_WAIT))
+                    continue
+                _, _, call = heapq.heappop(self.heap)
+            # Last milliseconds outside the lock, without the condition's wake-up latency
+            while time.monotonic() < due:
+                time.sleep(0)
+            self.lateness.append(time.monotonic() - due)
+            try:
+                call.callback(*call.args)
+            except Exception as e:
+                print(f"Error in scheduled {call.name}: {e}")
+
+    def _replan_if_clock_changed(self):
+        offset = time.time() - time.monotonic()
+        if abs(offset - self.offset) < CLOCK_DRIFT:
+            return
+        print(f"Clock changed by {offset - self.offset:+.3f} s, re-planning scheduled calls")
+        self.offset = offset
+        self.heap = [(self._due(call.when), seq, call) for _, seq, call in self.heap]
+        heapq.heapify(self.heap)
+
+    def _reload_if_changed(self):
+        """Picks up recordings added or removed by another pyDeskREC process"""
+        if self.file_mtime is None or self._stat_mtime() == self.file_mtime:
+            return
+        for call in self.occurrences.values():
+            call.cancelled = True
+        self.recordings, self.occurrences = {}, {}
+        self._load()
+
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.schedule_file).st_mtime_ns
+        except OSError:
+            return 0
+
+    # Saved recordings
+
+    def add_recording(self, at=None, cron=None, duration_minutes=0):
+        """Adds and saves a one-shot (at) or recurring (cron) recording; returns it"""
+        with self.condition:
+            job_id = max(self.recordings, default=0) + 1
+            recording = ScheduledRecording(job_id, at, cron, duration_minutes)
+            if not recording.next_start(datetime.now()):
+                raise ValueError("The start time is in the past")
+            self.recordings[job_id] = recording
+        self._plan(recording, datetime.now())
+        self.save()
+        return recording
+
+    def remove_recording(self, job_id):
+        with self.condition:
+            recording = self.recordings.pop(job_id, None)
+            calls = (self.occurrences.pop(job_id, None), self.expiries.pop(job_id, None))
+        for call in calls:
+            if call:
+                call.cancel()
+        self.save()
+        return recording
+
+    def list_recordings(self):
+        """(recording, next start) pairs in start order"""
+        with self.condition:
+            pairs = [(recording, self.occurrences[job_id].when if job_id in self.occurrences else None)
+                     for job_id, recording in self.recordings.items()]
+        return sorted(pairs, key=lambda pair: pair[1] or datetime.max)
+
+    def _plan(self, recording, after):
+        start = recording.next_start(after)
+        if start:
+            self.occurrences[recording.job_id] = self.call_at(start, self._fire, recording.job_id,
+                                                              name=f"recording #{recording.job_id}")
+
+    def _fire(self, job_id, remaining=None):
+        recording = self.recordings.get(job_id)
+        if not recording:
+            return
+        if recording.cron:
+            self._plan(recording, datetime.now())
+        else:
+            # A one-shot recording stays saved until its end, so a crash meanwhile recovers it
+            end = recording.at + timedelta(minutes=recording.duration_minutes)
+            with self.condition:
+                self.occurrences.pop(job_id, None)
+                if recording.duration_minutes and end > datetime.now():
+                    self.expiries[job_id] = self.call_at(end, self._expire, job_id,
+                                                         name=f"end of recording #{job_id}")
+            if job_id not in self.expiries:
+                self._expire(job_id)
+        if self.on_recording:
+            self.on_recording(recording, remaining)
+
+    def _expire(self, job_id):
+        """Drops a one-shot recording that has started and reached its end"""
+        with self.condition:
+            self.expiries.pop(job_id, None)
+            recording = self.recordings.get(job_id)
+            if not recording or recording.cron:
+                return
+            del self.recordings[job_id]
+        self.save()
+
+    def load(self):
+        """Recovers saved recordings; a one-shot recording that should be running starts for the rest"""
+        with self.condition:
+            self._load()
+        return self
+
+    def _load(self):
+        self.file_mtime = self._stat_mtime()
+        try:
+            with open(self.schedule_file) as f:
+                saved = [ScheduledRecording.from_dict(item) for item in json.load(f)]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading {self.schedule_file}: {e}")
+            return
+        now = datetime.now()
+        changed = False
+        for recording in saved:
+            self.recordings[recording.job_id] = recording
+            if recording.cron or recording.at > now:
+                self._plan(recording, now)
+                continue
+            if recording.job_id in self.expiries:
+                # Started by this process and still running: nothing to recover
+                continue
+            end = recording.at + timedelta(minutes=recording.duration_minutes)
+            if recording.duration_minutes and end > now:
+                remaining = (end - now).total_seconds() / 60
+                print(f"Recovering scheduled recording {recording.describe()}: {remaining:.1f} min left")
+                self.occurrences[recording.job_id] = self.call_at(now, self._fire, recording.job_id, remaining)
+            else:
+                print(f"Dropping missed scheduled recording {recording.describe()}")
+                del self.recordings[recording.job_id]
+                changed = True
+        if changed:
+            self.save()
+
+    def save(self):
+        """Writes the saved recordings atomically"""
+        with self.condition:
+            data = [recording.to_dict() for recording in self.recordings.values()]
+            try:
+                os.makedirs(os.path.dirname(self.schedule_file), exist_ok=True)
+                temp_file = f"{self.schedule_file}.tmp"
+                with open(temp_file, 'w') as f:
+                    json.dump(data, f, indent=1)
+                os.replace(temp_file, self.schedule_file)
+                self.file_mtime = self._stat_mtime()
+            except OSError as e:
+                print(f"Error saving the schedule: {e}")
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """The process-wide scheduler, started on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler().start()
+        return _scheduler
+
+def parse_when(text):
+    """'HH:MM' (next occurrence) or 'YYYY-MM-DD HH:MM' -> datetime"""
+    from config_manager import validate_time
+    text = text.strip()
+    when = validate_time(text)
+    if when:
+        return when
+    try:
+        return datetime.strptime(text, "%Y-%m-%d %H:%M")
+    except ValueError:
+        raise ValueError(f"Invalid start '{text}', expected HH:MM or YYYY-MM-DD HH:MM")
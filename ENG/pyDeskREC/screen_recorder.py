@@ -1,186 +1,291 @@
 import os
 import time
 import subprocess
-import threading
 from datetime import datetime
-import tkinter as tk
-import PySimpleGUI as sg
-import pyautogui
+from engine import STOP_TIMEOUT, RecorderEngine
 from config_manager import save_config
+from ffmpeg_caps import load_capabilities, missing
+from ffmpeg_progress import PROGRESS_ARGS, FFmpegStats, ProgressReader
+from manifest import RecordingManifest
+from postprocess import get_postprocessor
+from segments import segment_args, segment_files
+from standby import MPEGTS_ARGS, STANDBY_GOP_SECONDS, StandbyCapture
+from webcam import PREVIEW_FILTER, preview_output_args
 
 ## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
 
+# GUI modules (tkinter, PySimpleGUI) are imported lazily so the
+# headless command line can record without them being installed.
+
+# Fragmented MP4: an empty moov up front and a moof fragment at every
+# keyframe, so stopping never rewrites the file and a crash keeps all
+# fragments written so far.
+FRAGMENTED_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+# Keyframe (and therefore fragment) interval in seconds
+FRAGMENT_SECONDS = 2
+# Queue per pulse input so a busy encoder does not make audio underrun
+PULSE_QUEUE_SIZE = '1024'
+WEBCAM_QUEUE_SIZE = '512'
+# Distance in pixels between the webcam overlay and the edges of the capture
+WEBCAM_MARGIN = 16
+# H.264 encoders to use, in order, when the build has no libx264
+FALLBACK_ENCODERS = {'libopenh264': ['-b:v', '4M'], 'mpeg4': ['-q:v', '4']}
+
+def parse_renditions(text):
+    """Parses 'WIDTHxHEIGHT[:codec[:bitrate]]; ...' into (width, height, codec, bitrate) tuples"""
+    renditions = []
+    for item in text.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split(':')
+        try:
+            width, height = (int(value) for value in parts[0].lower().split('x'))
+        except ValueError:
+            raise ValueError(f"Invalid rendition size '{parts[0]}', expected e.g. 1280x720")
+        codec = parts[1] if len(parts) > 1 and parts[1] else 'libx264'
+        bitrate = parts[2] if len(parts) > 2 else ''
+        renditions.append((width, height, codec, bitrate))
+    return renditions
+
+def rendition_file(output_file, rendition):
+    """recording_X.mp4 -> recording_X.720p.mp4 (never mistaken for a segment recording_X_NNN.mp4)"""
+    root, extension = os.path.splitext(output_file)
+    return f"{root}.{rendition[1]}p{extension}"
+
 class ScreenRecorder:
-    def __init__(self, config, error_queue):
+    def __init__(self, config, error_queue, interactive=True):
         self.config = config
-        self.output_folder = config['SETTINGS']['output_folder']
-        self.fps = int(config['SETTINGS']['fps'])
+        self.interactive = interactive
+        self.output_folder = config.output_folder
+        self.fps = config.fps
         self.duration_minutes = 0
         self.countdown_seconds = 0
         self.record_system_audio = True
         self.record_microphone = False
         self.recording = False
         self.is_waiting = False
+        self.state = 'idle'  # Engine state (engine.py); recording/is_waiting are derived from it
+        self.message = None  # (kind, text) of the last 'message' notification
         self.start_time = None
         self.end_time = None
         self.area = None
-        self.display = config['SETTINGS']['display']
+        self.display = config.display
+        self.screen_size = None  # (width, height) from the start-up probe, if known
+        self.capabilities = None  # What the installed ffmpeg supports (ffmpeg_caps)
         self.process = None
-        self.record_thread = None
+        self.output_file = None
         self.error_queue = error_queue
-        self.manual_audio_source = config['SETTINGS']['audio_device']
-        self.manual_video_device = config['SETTINGS']['video_device']
-        self.video_format = config['SETTINGS']['video_format']
+        self.manual_audio_source = config.audio_device
+        self.manual_video_device = config.video_device
+        self.video_format = config.video_format
+        self.mp4_mode = config.mp4_mode
+        self.segment_seconds = config.segment_seconds
+        self.microphone_device = config.microphone_device
+        self.renditions = parse_renditions(config.renditions)
+        self.frame_rate_mode = config.frame_rate_mode
+        self.vfr_hi = config.vfr_hi
+        self.vfr_lo = config.vfr_lo
+        self.vfr_frac = config.vfr_frac
+        self.frame_report = None
+        # Encoder settings from `calibrate`, which the governor may lower while recording
+        self.preset = config.preset or None  # None = format default
+        self.scale = config.scale
+        self.threads = config.threads  # 0 = let libx264 decide
+        self.governor_enabled = config.governor
+        self.governor = None
+        self.switch_requested = False
+        self.part = 1
+        self.first_output = None
+        self.record_webcam = False
+        self.webcam_hub = None
+        self.webcam_preview_fd = None
+        self.webcam_mode = config.webcam_mode
+        self.webcam_corner = config.webcam_corner
+        self.webcam_width = config.webcam_width
+        self.audio_mix = config.audio_mix
+        self.system_audio_gain = config.system_audio_gain
+        self.microphone_gain = config.microphone_gain
+        self.current_output = None
+        self.stats = FFmpegStats()
+        self.progress_reader = None
+        self.stop_requested = False
+        self.observers = []
+        # Hot standby (standby.py) and click-to-first-frame instrumentation
+        self.standby = config.standby
+        self.standby_capture = None
+        self.standby_suspended = False
+        self.click_time = None
+        self.first_frame_time = None
+        self.start_latency = None
+        self.start_mode = None
+        self.manifest = None  # Sidecar of the current or last recording (manifest.py)
+        self.post_processing = config.post_processing
+        self.holds_post_processing = True  # Post-processing pauses while this recorder captures
+        self.engine = RecorderEngine(self)
+
+    def add_observer(self, callback):
+        """callback(recorder, kind) is called on 'state' changes, new 'stats', 'message's and queued 'error's
+
+        Callbacks run on the engine or reader threads and must only hand the event on.
+        """
+        self.observers.append(callback)
+
+    def remove_observer(self, callback):
+        if callback in self.observers:
+            self.observers.remove(callback)
+
+    def notify(self, kind):
+        for callback in list(self.observers):
+            try:
+                callback(self, kind)
+            except Exception as e:
+                print(f"Error notifying observer: {e}")
+
+    def _report_error(self, message):
+        self.error_queue.put(message)
+        self.notify('error')
+
+    def _message(self, text, kind='info'):
+        """Status for the user ('countdown', 'started', 'stopped' or 'info'); the GUI decides how to show it"""
+        print(text)
+        self.message = (kind, text)
+        self.notify('message')
 
     def choose_area(self):
-        """Handles screen area selection"""
+        """Handles screen area selection (on the calling GUI thread, which keeps serving its windows)"""
+        import tkinter as tk
         print("Select the screen area to record.")
-        
-        # Create a variable to manage completion
-        selection_done = threading.Event()
         selected_area = [None]  # List to store the selected area
-        
-        def selection_thread():
-            root = tk.Tk()
-            root.overrideredirect(1)
-            root.wait_visibility(root)
-            try:
-                root.wm_attributes("-alpha", 0.5)
-            except tk.TclError:
-                print("Transparency not supported.")
-            root.attributes('-topmost', True)
-            root.geometry(f"{root.winfo_screenwidth()}x{root.winfo_screenheight()}+0+0")
-
-            canvas = tk.Canvas(root, cursor="crosshair", bg="black")
-            canvas.pack(fill=tk.BOTH, expand=True)
-
-            start_x, start_y = None, None
-            rect = None
-
-            def on_press(event):
-                nonlocal start_x, start_y, rect
-                start_x, start_y = event.x, event.y
-                if rect:
-                    canvas.delete(rect)
-                rect = canvas.create_rectangle(start_x, start_y, start_x, start_y, outline="red", width=2)
-
-            def on_drag(event):
-                if rect:
-                    canvas.coords(rect, start_x, start_y, event.x, event.y)
-
-            def on_release(event):
-                nonlocal start_x, start_y
-                end_x, end_y = event.x, event.y
-                
-                # Calculate the area
-                area = (
-                    min(start_x, end_x), min(start_y, end_y),
-                    abs(start_x - end_x), abs(start_y - end_y)
-                )
-                
-                selected_area[0] = area
-                root.quit()
-                root.destroy()
-                selection_done.set()
-
-            def on_escape(event):
-                root.quit()
-                root.destroy()
-                selection_done.set()
-
-            canvas.bind("<ButtonPress-1>", on_press)
-            canvas.bind("<B1-Motion>", on_drag)
-            canvas.bind("<ButtonRelease-1>", on_release)
-            root.bind("<Escape>", on_escape)
 
-            try:
-                root.mainloop()
-            except:
-                if root:
-                    root.destroy()
-                selection_done.set()
+        root = tk.Tk()
+        root.overrideredirect(1)
+        root.wait_visibility(root)
+        try:
+            root.wm_attributes("-alpha", 0.5)
+        except tk.TclError:
+            print("Transparency not supported.")
+        root.attributes('-topmost', True)
+        root.geometry(f"{root.winfo_screenwidth()}x{root.winfo_screenheight()}+0+0")
+
+        canvas = tk.Canvas(root, cursor="crosshair", bg="black")
+        canvas.pack(fill=tk.BOTH, expand=True)
+
+        start_x, start_y = None, None
+        rect = None
+
+        def on_press(event):
+            nonlocal start_x, start_y, rect
+            start_x, start_y = event.x, event.y
+            if rect:
+                canvas.delete(rect)
+            rect = canvas.create_rectangle(start_x, start_y, start_x, start_y, outline="red", width=2)
+
+        def on_drag(event):
+            if rect:
+                canvas.coords(rect, start_x, start_y, event.x, event.y)
+
+        def on_release(event):
+            end_x, end_y = event.x, event.y
+            
+            # Calculate the area
+            area = (
+                min(start_x, end_x), min(start_y, end_y),
+                abs(start_x - end_x), abs(start_y - end_y)
+            )
+            
+            selected_area[0] = area
+            root.quit()
 
-        # Start the selection thread
-        select_thread = threading.Thread(target=selection_thread)
-        select_thread.daemon = True
-        select_thread.start()
+        def on_escape(event):
+            root.quit()
 
-        # Wait for the selection to complete (with timeout)
-        selection_done.wait(timeout=60)  # 60-second timeout
+        canvas.bind("<ButtonPress-1>", on_press)
+        canvas.bind("<B1-Motion>", on_drag)
+        canvas.bind("<ButtonRelease-1>", on_release)
+        root.bind("<Escape>", on_escape)
+
+        # Nested Tk loop: the other windows of this thread keep being served
+        try:
+            root.mainloop()
+        finally:
+            root.destroy()
 
         # Handle the selection result
         if selected_area[0]:
             self.area = selected_area[0]
             print(f"Selected area: {self.area}")
-            area_string = ','.join(map(str, self.area))
-            self.config['SETTINGS']['area'] = area_string
+            self.config.area = tuple(self.area)
             save_config(self.config)
         else:
             print("No area selected or selection canceled. Using full screen.")
-            screen_size = pyautogui.size()
-            self.area = (0, 0, screen_size.width, screen_size.height)
-            self.config['SETTINGS']['area'] = ''
+            self.area = self.get_full_screen_area()
+            self.config.area = None
             save_config(self.config)
 
         return True
 
     def setup_ffmpeg_command(self, output_file):
         try:
-            cmd = [
-                'ffmpeg',
-                '-f', 'x11grab',
-                '-r', str(self.fps),
-                '-thread_queue_size', '4096'
-            ]
-
-            if self.area:
-                if all(isinstance(val, int) for val in self.area):
-                    offset_x, offset_y, width, height = self.area
-                else:
-                    screen_size = pyautogui.size()
-                    offset_x, offset_y, width, height = 0, 0, screen_size.width, screen_size.height
-                    print(f"Invalid area, using full screen: {offset_x}, {offset_y}, {width}, {height}")
-
-                if width <= 0 or height <= 0:
-                    raise ValueError("Selected area is invalid (width or height <= 0)")
-        
-                cmd.extend(['-video_size', f"{width}x{height}", '-i', f"{self.display}+{offset_x},{offset_y}"])
+            self.capabilities = self._load_capabilities()
+            if missing(self.capabilities, 'input_devices', 'x11grab'):
+                raise RuntimeError("This FFmpeg build has no x11grab input and cannot capture the screen; "
+                                   "install an FFmpeg built with libxcb (e.g. the distribution package)")
+            cmd = ['ffmpeg'] + PROGRESS_ARGS + self._capture_input_args()
+
+            # The webcam is a second input of the same process (one encode), stamped
+            # with the wall clock like x11grab and pulse so overlay stays in sync
+            webcam_mode = self._webcam_mode()
+            if webcam_mode:
+                cmd.extend(['-f', 'v4l2', '-thread_queue_size', WEBCAM_QUEUE_SIZE,
+                            '-use_wallclock_as_timestamps', '1', '-i', self.manual_video_device])
+
+            # Every pulse source is its own input with its own queue
+            audio_sources, audio_format = self._available_audio_sources()
+            for source, gain, title in audio_sources:
+                cmd.extend(['-f', audio_format, '-thread_queue_size', PULSE_QUEUE_SIZE, '-i', source])
+
+            graph, video, extra_video, audio = self._filter_graph(audio_sources, webcam_mode)
+            if self.renditions:
+                videos, audios = self._split_for_outputs(graph, video, audio, self.renditions)
             else:
-                cmd.extend(['-i', f"{self.display}"])
-
-            if self.record_system_audio:
-                if self.manual_audio_source:
-                    cmd.extend(['-f', 'pulse', '-i', self.manual_audio_source])
-                else:
-                    cmd.extend(['-f', 'pulse', '-i', 'default'])
-
-            if self.record_microphone:
-                cmd.extend(['-f', 'pulse', '-i', 'default'])
+                videos, audios = [video], [audio]
+            if graph:
+                cmd.extend(['-filter_complex', ';'.join(graph)])
+            cmd.extend(self._map_args(videos[0], extra_video, audios[0]))
+            cmd.extend(self._frame_rate_args())
 
+            encoder = self._video_encoder()
             if self.video_format == 'mkv':
+                cmd.extend(['-c:v', encoder] + self._encoder_args(encoder, 'veryfast', ['-crf', '23']))
                 cmd.extend([
-                    '-c:v', 'libx264',
-                    '-preset', 'veryfast',
-                    '-crf', '23',
                     '-maxrate', '1M',
                     '-bufsize', '2M',
                     '-pix_fmt', 'yuv420p',
-                    '-g', '50',
+                    '-g', str(self._keyframe_interval(50, output_file)),
                     '-c:a', 'aac',
                     '-b:a', '128k',
                     '-ac', '2',
                     '-ar', '44100'
                 ])
-            else:  # mp4
+            else:  # mp4, always written fragmented; faststart is a remux after stop
+                cmd.extend(['-c:v', encoder] + self._encoder_args(encoder, 'ultrafast'))
                 cmd.extend([
-                    '-c:v', 'libx264',
-                    '-preset', 'ultrafast',
-                    '-movflags', '+faststart',
+                    '-g', str(self._keyframe_interval(self.fps * FRAGMENT_SECONDS, output_file)),
                     '-c:a', 'aac',
                     '-strict', 'experimental'
                 ])
-
-            cmd.append(output_file)
+            if self.threads:
+                cmd.extend(['-threads', str(self.threads)])
+
+            cmd.extend(self._output_args(output_file))
+            # Extra renditions share the capture, color conversion and timestamps
+            for index, rendition in enumerate(self.renditions, start=1):
+                cmd.extend(self._map_args(videos[index], [], audios[index]))
+                cmd.extend(self._rendition_args(output_file, rendition))
+            if webcam_mode and self.webcam_preview_fd is not None:
+                # Second output of the same process feeding the GUI preview
+                cmd.extend(preview_output_args(self.webcam_preview_fd))
             print(f"Generated FFmpeg command: {' '.join(cmd)}")
             return cmd
 
@@ -188,126 +293,503 @@ class ScreenRecorder:
             print(f"Error setting up FFmpeg: {e}")
             raise
 
-    def start_recording(self, start_time=None, end_time=None):
-        print(f"Current area: {self.area}")
-        if self.is_waiting or self.recording:
-            print("Recording already in progress or waiting")
-            return
-
+    def _capture_input_args(self):
+        """Input arguments of the screen capture"""
+        args = ['-f', 'x11grab', '-r', str(self.fps), '-thread_queue_size', '4096']
         if not self.area:
-            area_string = self.config['SETTINGS']['area']
-            if area_string:
-                self.area = tuple(map(int, area_string.split(',')))
-            else:
-                screen_size = pyautogui.size()
-                self.area = (0, 0, screen_size.width, screen_size.height)
-    
-        print(f"Selected area for recording: {self.area}")
+            return args + ['-i', f"{self.display}"]
 
-        try:
-            if self.countdown_seconds > 0:
-                self.countdown(self.countdown_seconds)
-            
-            if start_time:
-                self.is_waiting = True
-                delay = (start_time - datetime.now()).total_seconds()
-                if delay > 0:
-                    threading.Timer(delay, self._start_recording_now, args=(end_time,)).start()
-                    return
+        if all(isinstance(val, int) for val in self.area):
+            offset_x, offset_y, width, height = self.area
+        else:
+            offset_x, offset_y, width, height = self.get_full_screen_area()
+            print(f"Invalid area, using full screen: {offset_x}, {offset_y}, {width}, {height}")
 
-            self._start_recording_now(end_time)
+        if width <= 0 or height <= 0:
+            raise ValueError("Selected area is invalid (width or height <= 0)")
 
-        except Exception as e:
-            self.recording = False
-            self.is_waiting = False
-            error_msg = f"Error starting recording: {str(e)}"
-            print(error_msg)
-            self.error_queue.put(error_msg)
-            sg.popup_error(error_msg, keep_on_top=True)
-
-    def _start_recording_now(self, end_time):
+        return args + ['-video_size', f"{width}x{height}", '-i', f"{self.display}+{offset_x},{offset_y}"]
+
+    @staticmethod
+    def _load_capabilities():
         try:
-            if not os.path.exists(self.output_folder):
-                os.makedirs(self.output_folder)
-        
+            return load_capabilities()
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Could not determine FFmpeg capabilities: {e}")
+            return None
+
+    def _video_encoder(self):
+        """libx264, or the first fallback encoder this build has"""
+        if not missing(self.capabilities, 'encoders', 'libx264'):
+            return 'libx264'
+        for encoder in FALLBACK_ENCODERS:
+            if not missing(self.capabilities, 'encoders', encoder):
+                print(f"This FFmpeg build has no libx264, encoding with {encoder}")
+                return encoder
+        raise RuntimeError("This FFmpeg build has no H.264 or MPEG-4 encoder")
+
+    def _encoder_args(self, encoder, default_preset, x264_args=()):
+        """Preset and rate control: libx264 options, or the fallback encoder's own"""
+        if encoder != 'libx264':
+            return list(FALLBACK_ENCODERS[encoder])
+        return ['-preset', self.preset or default_preset] + list(x264_args)
+
+    def _available_audio_sources(self):
+        """Audio sources and input format: pulse, else ALSA 'default', else no audio"""
+        sources = self._audio_sources()
+        if not sources or not missing(self.capabilities, 'input_devices', 'pulse'):
+            return sources, 'pulse'
+        if not missing(self.capabilities, 'input_devices', 'alsa'):
+            print("This FFmpeg build has no pulse input, recording the ALSA default device only")
+            source, gain, title = sources[0]
+            return [('default', gain, title)], 'alsa'
+        print("This FFmpeg build has neither pulse nor alsa input, recording without audio")
+        return [], 'pulse'
+
+    def _variable_frame_rate(self):
+        """True when VFR is configured and the build has the mpdecimate filter"""
+        return self.frame_rate_mode == 'variable' and not missing(self.capabilities, 'filters', 'mpdecimate')
+
+    def _audio_sources(self):
+        """Returns the (pulse source, gain, track title) of every enabled audio input"""
+        sources = []
+        if self.record_system_audio:
+            sources.append((self.manual_audio_source or 'default', self.system_audio_gain, 'System audio'))
+        if self.record_microphone:
+            sources.append((self.microphone_device or 'default', self.microphone_gain, 'Microphone'))
+        return sources
+
+    def _webcam_mode(self):
+        """Returns 'overlay', 'track' or None for the webcam input of the recording"""
+        if not self.record_webcam or not self.manual_video_device:
+            return None
+        if missing(self.capabilities, 'input_devices', 'v4l2'):
+            print("This FFmpeg build has no v4l2 input, recording without the webcam")
+            return None
+        if self.webcam_mode == 'track' and self.video_format == 'mkv':
+            return 'track'
+        if self.webcam_mode == 'track':
+            print("A separate webcam track needs MKV, using picture-in-picture instead")
+        if missing(self.capabilities, 'filters', 'overlay'):
+            print("This FFmpeg build has no overlay filter, recording without the webcam")
+            return None
+        return 'overlay'
+
+    def _webcam_overlay_filter(self):
+        """Scales the webcam (input 1) and overlays it on the screen in the configured corner"""
+        margin = WEBCAM_MARGIN
+        x = margin if 'left' in self.webcam_corner else f"main_w-overlay_w-{margin}"
+        y = margin if 'top' in self.webcam_corner else f"main_h-overlay_h-{margin}"
+        return [f"[camin]scale={self.webcam_width}:-2[cam]",
+                f"[0:v][cam]overlay={x}:{y}:eof_action=pass[vout]"]
+
+    def _webcam_split_filter(self, label):
+        """Routes input 1 to `label`, plus a low-rate [pv] branch when the hub wants a preview"""
+        if self.webcam_preview_fd is None:
+            return [f"[1:v]null[{label}]"]
+        return [f"[1:v]split=2[{label}][pvin]", f"[pvin]{PREVIEW_FILTER}[pv]"]
+
+    def _filter_graph(self, audio_sources, webcam_mode=None):
+        """Builds the filter graph; returns (graph, video stream, extra video streams, audio streams)"""
+        graph = []
+        video = '0:v'
+        extra_video = []
+        if webcam_mode == 'overlay':
+            graph.extend(self._webcam_split_filter('camin'))
+            graph.extend(self._webcam_overlay_filter())
+            video = '[vout]'
+        elif webcam_mode == 'track':
+            graph.extend(self._webcam_split_filter('camtrack'))
+            extra_video.append(('[camtrack]', 'Webcam'))
+        first_audio = 2 if webcam_mode else 1
+
+        if self.scale < 1.0:
+            source = video if video.startswith('[') else f"[{video}]"
+            graph.append(f"{source}scale=trunc(iw*{self.scale}/2)*2:trunc(ih*{self.scale}/2)*2[vscaled]")
+            video = '[vscaled]'
+
+        if self.frame_rate_mode == 'variable' and not self._variable_frame_rate():
+            print("This FFmpeg build has no mpdecimate filter, recording at a constant frame rate")
+        if self._variable_frame_rate():
+            # After the overlay, so a moving webcam keeps its frames
+            source = video if video.startswith('[') else f"[{video}]"
+            graph.append(f"{source}mpdecimate=hi={self.vfr_hi}:lo={self.vfr_lo}:frac={self.vfr_frac}[vdec]")
+            video = '[vdec]'
+
+        audio = []
+        mix = self.audio_mix == 'mix' and len(audio_sources) > 1
+        if mix and missing(self.capabilities, 'filters', 'amix'):
+            print("This FFmpeg build has no amix filter, keeping system audio and microphone as separate tracks")
+            mix = False
+        if mix:
+            # Mixed in the same process: per-source gain, then amix without normalization
+            labels = ''
+            for index, (source, gain, title) in enumerate(audio_sources, start=first_audio):
+                graph.append(f"[{index}:a]volume={gain}[a{index}]")
+                labels += f"[a{index}]"
+            graph.append(f"{labels}amix=inputs={len(audio_sources)}:duration=longest:normalize=0[aout]")
+            audio.append(('[aout]', None))
+        else:
+            # One track per source (a single source is never mixed)
+            for index, (source, gain, title) in enumerate(audio_sources, start=first_audio):
+                if gain != 1.0:
+                    graph.append(f"[{index}:a]volume={gain}[a{index}]")
+                    audio.append((f"[a{index}]", title))
+                else:
+                    audio.append((f"{index}:a", title))
+        return graph, video, extra_video, audio
+
+    @staticmethod
+    def _split_for_outputs(graph, video, audio, renditions):
+        """Captures and converts once, then splits video/audio for every rendition output"""
+        count = len(renditions) + 1
+        source = video if video.startswith('[') else f"[{video}]"
+        labels = ''.join(f"[v{index}]" for index in range(count))
+        graph.append(f"{source}format=yuv420p,split={count}{labels}")
+        videos = ['[v0]']
+        for index, (width, height, codec, bitrate) in enumerate(renditions, start=1):
+            graph.append(f"[v{index}]scale={width}:{height}[v{index}s]")
+            videos.append(f"[v{index}s]")
+
+        # Filter outputs can only be mapped once; input streams can be mapped again
+        audios = [[] for _ in range(count)]
+        for track, (stream, title) in enumerate(audio):
+            if stream.startswith('['):
+                labels = ''.join(f"[s{track}o{index}]" for index in range(count))
+                graph.append(f"{stream}asplit={count}{labels}")
+                copies = [f"[s{track}o{index}]" for index in range(count)]
+            else:
+                copies = [stream] * count
+            for index in range(count):
+                audios[index].append((copies[index], title))
+        return videos, audios
+
+    @staticmethod
+    def _map_args(video, extra_video, audio):
+        """-map and track title arguments of one output"""
+        args = ['-map', video]
+        for index, (stream, title) in enumerate(extra_video, start=1):
+            args.extend(['-map', stream, f"-metadata:s:v:{index}", f"title={title}"])
+        for track, (stream, title) in enumerate(audio):
+            args.extend(['-map', stream])
+            if title:
+                args.extend([f"-metadata:s:a:{track}", f"title={title}"])
+        return args
+
+    def _rendition_args(self, output_file, rendition):
+        """Codec and muxer arguments of one extra rendition output"""
+        width, height, codec, bitrate = rendition
+        if missing(self.capabilities, 'encoders', codec):
+            fallback = self._video_encoder()
+            print(f"This FFmpeg build has no {codec} encoder, encoding the {height}p rendition with {fallback}")
+            codec = fallback
+        args = ['-c:v', codec]
+        if codec.startswith('libx26'):
+            args.extend(['-preset', 'veryfast'])
+        if bitrate:
+            args.extend(['-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bitrate])
+        args.extend(['-g', str(max(1, self.fps * FRAGMENT_SECONDS)), '-c:a', 'aac', '-b:a', '96k'])
+        args.extend(self._frame_rate_args())
+        # Segmented like the main output in segment mode
+        return args + self._file_args(rendition_file(output_file, rendition))
+
+    def _frame_rate_args(self):
+        """Per-output sync mode: keep the decimated frames' own timestamps in VFR mode"""
+        if not self._variable_frame_rate():
+            return []
+        # -fps_mode replaced -vsync in FFmpeg 5.1
+        if self.capabilities and [0, 0] < self.capabilities['version'] < [5, 1]:
+            return ['-vsync', 'vfr']
+        return ['-fps_mode', 'vfr']
+
+    def get_frame_report(self):
+        """Frames kept and dropped by duplicate elimination in the last recording"""
+        stats = self.stats.snapshot()
+        kept = stats['frame']
+        # Every frame x11grab delivered up to the last timestamp at the capture rate
+        captured = max(kept, round(stats['out_time'] * self.fps))
+        return {'mode': self.frame_rate_mode, 'captured': captured, 'kept': kept, 'dropped': captured - kept}
+
+    def _keyframe_interval(self, frames, output_file):
+        """GOP length in frames; short for the hot standby stream, whose keyframes bound the pre-roll"""
+        if output_file.startswith('pipe:'):
+            frames = min(frames, self.fps * STANDBY_GOP_SECONDS)
+        return max(1, frames)
+
+    def _output_args(self, output_file):
+        """Muxer arguments of the main output: a file (see _file_args) or the standby stream"""
+        if output_file.startswith('pipe:'):
+            return MPEGTS_ARGS + [output_file]
+        return self._file_args(output_file)
+
+    def _file_args(self, output_file):
+        """Muxer arguments writing output_file: a single file, or rolling segments in segment mode"""
+        if self.segment_seconds > 0:
+            format_options = f"movflags={FRAGMENTED_MOVFLAGS}" if self.video_format == 'mp4' else None
+            return segment_args(output_file, self.segment_seconds, self.video_format, format_options)
+        if self.video_format == 'mp4':
+            return ['-movflags', FRAGMENTED_MOVFLAGS, output_file]
+        return [output_file]
+
+    def start_recording(self, start_time=None, end_time=None):
+        """Hands the session to the engine and returns at once
+
+        Returns a Future that becomes True when ffmpeg runs (False if it did not start).
+        """
+        print(f"Current area: {self.area}")
+        self._resolve_area()
+        print(f"Selected area for recording: {self.area}")
+        self.click_time = time.time()
+        return self.engine.start(start_time, end_time)
+
+    def _resolve_area(self):
+        if not self.area:
+            if self.config.area:
+                self.area = self.config.area
+            elif self.interactive:
+                self.area = self.get_full_screen_area()
+            # Headless: no area means x11grab captures the whole display
+
+    def _begin_recording(self, loop=None):
+        """Starts ffmpeg for a new recording (engine STARTING phase)"""
+        if not os.path.exists(self.output_folder):
+            os.makedirs(self.output_folder)
+    
+        if self.output_file:
+            output_file = self.output_file
+        else:
             now = datetime.now()
             extension = '.mkv' if self.video_format == 'mkv' else '.mp4'
             output_file = f"{self.output_folder}/recording_{now.strftime('%Y-%m-%d_%H-%M-%S')}{extension}"
-    
-            cmd = self.setup_ffmpeg_command(output_file)
-            print(f"Executing command: {' '.join(cmd)}")
-    
-            self.recording = True
-            self.is_waiting = False
-            self.start_time = time.time()
-    
-            self.process = subprocess.Popen(cmd, 
-                                       stdout=subprocess.PIPE, 
-                                       stderr=subprocess.PIPE, 
-                                       text=True)
-        
-            if self.process.poll() is not None:
-                raise Exception("FFmpeg failed to start")
-        
-            self.record_thread = threading.Thread(target=self.wait_for_ffmpeg)
-            self.record_thread.start()
-            print(f"Recording thread started: {self.record_thread.is_alive()}")
-            sg.popup_quick_message("Recording started", background_color='green', text_color='white')
-            
-            if self.duration_minutes > 0:
-                threading.Timer(self.duration_minutes * 60, self.stop_recording).start()
-            elif end_time:
-                delay = (end_time - datetime.now()).total_seconds()
-                if delay > 0:
-                    threading.Timer(delay, self.stop_recording).start()
-
-        except Exception as e:
-            self.recording = False
-            error_msg = f"Error starting recording: {str(e)}"
-            print(error_msg)
-            self.error_queue.put(error_msg)
-            sg.popup_error(error_msg, keep_on_top=True)
 
-    def stop_recording(self):
+        self.stop_requested = False
+        self.switch_requested = False
+        self.part = 1
+        self.first_output = output_file
+        self.start_time = time.time()
+        self.first_frame_time = self.start_latency = None
+        self.frame_report = None
+        self.manifest = RecordingManifest(self, output_file)
+        if loop and self._standby_usable():
+            self._begin_take(output_file, loop)
+            return
+        if self.standby_capture and self.standby_capture.armed:
+            # This recording needs its own ffmpeg: free the capture devices and the CPU
+            print("Standby: not usable with segments, renditions, governor or webcam; disarming")
+            self.standby_capture.disarm()
+            self.standby_suspended = True
+        self.start_mode = 'cold'
+        self._launch(output_file, loop)
+
+        if self.governor_enabled:
+            from governor import EncoderGovernor
+            self.governor = EncoderGovernor(self).start()
+
+    def _standby_usable(self):
+        return (self.standby and not self.segment_seconds and not self.renditions
+                and not self.governor_enabled and not self._webcam_mode())
+
+    def _begin_take(self, output_file, loop):
+        """Hot standby start: a stream-copy ffmpeg writes the armed capture from its last keyframe"""
+        if not self.standby_capture:
+            self.standby_capture = StandbyCapture(self)
+        self.start_mode = 'standby' if self.standby_capture.ensure_armed(loop) else 'standby (arming)'
+        self.current_output = output_file
+        cmd = (['ffmpeg', '-y', '-hide_banner'] + PROGRESS_ARGS +
+               ['-f', 'mpegts', '-i', 'pipe:0', '-map', '0', '-c', 'copy'] + self._output_args(output_file))
+        print(f"Executing command: {' '.join(cmd)}")
+        self.stats = FFmpegStats()
+        read_fd, write_fd = os.pipe()
         try:
-            if self.process and self.recording:
-                print("Stopping recording...")
-                self.process.terminate()
-                self.process.wait()
-                self.recording = False
-                self.is_waiting = False
-                sg.popup("Recording stopped.", keep_on_top=True)
+            self.process = subprocess.Popen(cmd, stdin=read_fd, stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE, text=True)
+        except OSError:
+            os.close(write_fd)
+            raise
+        finally:
+            os.close(read_fd)
+        self.progress_reader = ProgressReader(self.process, self.stats,
+                                              on_progress=self._on_progress).start(loop)
+        self.manifest.add_process(self.standby_capture.command, output_file)
+        self.manifest.add_process(cmd, output_file)
+        self.standby_capture.begin_take(write_fd)
+
+    def _on_progress(self):
+        # Cold start: the first frame was captured out_time before this progress block
+        if self.first_frame_time is None and self.start_mode == 'cold':
+            stats = self.stats.snapshot()
+            if stats['frame'] and stats['out_time'] > 0:
+                self._first_frame(stats['updated_at'] - stats['out_time'], 'cold')
+        if self.manifest and self.recording:
+            capture = self.standby_capture.process if self.standby_capture and self.standby_capture.taking else None
+            self.manifest.progress(self.stats, (self.process, capture))
+        self.notify('stats')
+
+    def _first_frame(self, captured_at, mode):
+        """Records the click-to-first-frame latency (negative: the file starts before the click)"""
+        if captured_at is None or not self.click_time:
+            return
+        self.first_frame_time = captured_at
+        self.start_latency = captured_at - self.click_time
+        print(f"Click to first frame ({mode}): {self.start_latency * 1000:+.0f} ms")
+        if self.manifest:
+            self.manifest.first_frame(captured_at, self.start_latency, self.start_mode)
+
+    def _terminate(self):
+        """Ends the running ffmpeg; a standby take ends by closing its input"""
+        if self.manifest:
+            self.manifest.stop_requested()
+        if self.standby_capture and self.standby_capture.taking:
+            self.standby_capture.end_take()
+        else:
+            self.process.terminate()
 
+    def arm_standby(self, loop):
+        """Starts the hot standby ffmpeg if enabled and usable (engine loop)"""
+        self.standby_suspended = False
+        if not self._standby_usable():
+            self.disarm_standby()
+            return
+        if not self.standby_capture:
+            self.standby_capture = StandbyCapture(self)
+        # Armed with the area the next recording will use, so the take does not re-arm
+        self._resolve_area()
+        self.standby_capture.ensure_armed(loop)
+
+    def disarm_standby(self):
+        """Stops the hot standby ffmpeg; returns the task awaiting its exit, or None (engine loop)"""
+        if self.standby_capture:
+            return self.standby_capture.disarm()
+        return None
+
+    def _abort_start(self, error):
+        """Undoes a failed start and reports it"""
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+        self._release_preview_fd()
+        if self.webcam_hub and self.webcam_hub.attached:
+            self.webcam_hub.detach()
+        error_msg = f"Error starting recording: {str(error)}"
+        print(error_msg)
+        if self.manifest:
+            self.manifest.finish(self.stats, self.process.poll() if self.process else None, error_msg)
+        self._report_error(error_msg)
+
+    def _launch(self, output_file, loop=None):
+        """Builds the command for output_file and starts ffmpeg with its progress reader
+
+        With `loop` the progress reader runs on that event loop instead of in threads.
+        """
+        # One process per webcam: the hub stops its preview-only reader
+        if self._webcam_mode() and self.webcam_hub:
+            self.webcam_preview_fd = self.webcam_hub.attach()
+
+        cmd = self.setup_ffmpeg_command(output_file)
+        self.current_output = output_file
+        print(f"Executing command: {' '.join(cmd)}")
+        self.stats = FFmpegStats()
+
+        pass_fds = (self.webcam_preview_fd,) if self.webcam_preview_fd is not None else ()
+        self.process = subprocess.Popen(cmd, 
+                                   stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, 
+                                   stderr=subprocess.PIPE, 
+                                   pass_fds=pass_fds,
+                                   text=True)
+        self._release_preview_fd()
+        if self.manifest:
+            self.manifest.add_process(cmd, output_file)
+        self.progress_reader = ProgressReader(self.process, self.stats,
+                                              on_progress=self._on_progress).start(loop)
+
+        if self.process.poll() is not None:
+            raise Exception("FFmpeg failed to start")
+
+    def switch_segment(self):
+        """Closes the current file and continues in a new part with the current settings"""
+        if self.process and self.recording and not self.stop_requested:
+            self.switch_requested = True
+            self.process.terminate()
+
+    def part_file(self, part):
+        """recording_X.mp4 -> recording_X_part2.mp4 for later parts of the same recording"""
+        root, extension = os.path.splitext(self.first_output)
+        return self.first_output if part == 1 else f"{root}_part{part}{extension}"
+
+    def _release_preview_fd(self):
+        """Closes our copy of the preview pipe so the hub sees EOF when ffmpeg exits"""
+        if self.webcam_preview_fd is not None:
+            os.close(self.webcam_preview_fd)
+            self.webcam_preview_fd = None
+
+    def stop_recording(self, wait=False):
+        """Asks the engine to stop (or cancel a pending start); with wait, until it is idle
+
+        The GUI's "Stop Recording & Reset Area" also forgets the selected area;
+        a headless stop keeps the area saved in the settings.
+        """
+        self.engine.stop()
+        if wait:
+            self.engine.wait_idle(STOP_TIMEOUT)
+        if not self.interactive:
+            return
+        try:
             self.reset_area()
         except Exception as e:
             print(f"Error resetting area: {e}")
-            #sg.popup_error(f"Error resetting area: {e}")
-            print(f"Error resetting area: {e}")  # Print only, no popup
 
     def reset_area(self):
         """Resets the selection area"""
         self.area = None
-        self.config['SETTINGS']['area'] = ''
+        self.config.area = None
         save_config(self.config)
         print("Area reset")
 
     def get_full_screen_area(self):
         """Gets the full screen area"""
-        screen_size = pyautogui.size()
-        return (0, 0, screen_size.width, screen_size.height)
-
-    def countdown(self, seconds):
-        for i in range(seconds, 0, -1):
-            sg.popup_auto_close(f"Recording starts in {i} seconds...", 
-                              auto_close_duration=1, keep_on_top=True)
-            time.sleep(1)
-
-    def wait_for_ffmpeg(self):
-        stdout, stderr = self.process.communicate()
-        if stderr:
-            error_message = "\n".join(stderr.split("\n")[:20])
-            self.error_queue.put(error_message)
-            with open("ffmpeg_error.log", "w") as f:
-                f.write(stderr)
+        if self.screen_size:
+            return (0, 0) + tuple(self.screen_size)
+        # PySimpleGUI (tkinter) is already loaded by the GUI, pyautogui is not needed
+        import PySimpleGUI as sg
+        width, height = sg.Window.get_screen_size()
+        return (0, 0, width, height)
+
+    def _finish(self, returncode):
+        """After the last ffmpeg exited (engine FINALIZING phase)"""
+        if self.governor:
+            self.governor.stop()
+        if self.webcam_hub and self.webcam_hub.attached:
+            self.webcam_hub.detach()
+        # ffmpeg exits with 255 when stopped by SIGTERM
+        if returncode == 0 or (self.stop_requested and returncode in (255, -15)):
+            print(f"FFmpeg finished recording. {self.stats.summary()}")
+            if self.frame_rate_mode == 'variable':
+                self.frame_report = self.get_frame_report()
+                print(f"Variable frame rate: kept {self.frame_report['kept']} of ~{self.frame_report['captured']} "
+                      f"frames ({self.frame_report['dropped']} duplicates dropped)")
         else:
-            print("FFmpeg finished recording.")
\ No newline at end of file
+            self._report_error(self.progress_reader.tail(20))
+            with open("ffmpeg_error.log", "w") as f:
+                f.write("\n".join(self.progress_reader.log))
+        if self.manifest:
+            self.manifest.finish(self.stats, returncode)
+        self._post_process()
+
+    def _post_process(self):
+        """Queues the finished files for faststart remux, ffprobe metadata, thumbnails and contact sheet"""
+        faststart = self.mp4_mode == 'faststart'
+        if not self.first_output or not (faststart or self.post_processing):
+            return
+        outputs = []
+        for part in range(1, self.part + 1):
+            part_file = self.part_file(part)
+            outputs.append(part_file)
+            outputs.extend(rendition_file(part_file, rendition) for rendition in self.renditions)
+        paths = []
+        for output in outputs:
+            # Every closed segment is a complete file of its own
+            paths.extend(segment_files(output) if self.segment_seconds else [output])
+        if not paths:
+            return
+        # Deferred: the recording is already complete and playable
+        get_postprocessor().submit(paths, faststart, self.post_processing)
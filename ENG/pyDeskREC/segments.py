@@ -0,0 +1,86 @@
+import glob
+import os
+import re
+import subprocess
+import tempfile
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Segment mode: ffmpeg's segment muxer closes a file every N seconds, cutting
+# only on keyframes that are forced at the segment boundaries. Every closed
+# segment is a complete file, and a crash loses at most the open segment.
+
+SEGMENT_FORMATS = {'mkv': 'matroska', 'mp4': 'mp4', 'ts': 'mpegts'}
+
+def segment_pattern(output_file):
+    """recording_X.mp4 -> recording_X_%03d.mp4"""
+    root, extension = os.path.splitext(output_file)
+    return f"{root}_%03d{extension}"
+
+def segment_list_file(output_file):
+    """recording_X.mp4 -> recording_X.ffconcat"""
+    return f"{os.path.splitext(output_file)[0]}.ffconcat"
+
+def segment_files(output_file):
+    """Returns the existing segments of a recording in order"""
+    root, extension = os.path.splitext(output_file)
+    # Only an exact _NNN suffix: renditions (recording_X.720p.mp4) and parts share the prefix
+    suffix = re.compile(r'_(\d{3,})' + re.escape(extension))
+    segments = []
+    for path in glob.glob(f"{glob.escape(root)}_*{extension}"):
+        match = suffix.fullmatch(path[len(root):])
+        if match:
+            segments.append((int(match.group(1)), path))
+    return [path for index, path in sorted(segments)]
+
+def segment_args(output_file, seconds, video_format, format_options=None, wrap=0, with_list=True):
+    """Output arguments that write `output_file` as keyframe-aligned segments"""
+    args = [
+        '-force_key_frames', f"expr:gte(t,n_forced*{seconds})",
+        '-f', 'segment',
+        '-segment_time', str(seconds),
+        '-segment_format', SEGMENT_FORMATS.get(video_format, video_format),
+        '-reset_timestamps', '1',
+    ]
+    if format_options:
+        args.extend(['-segment_format_options', format_options])
+    if wrap:
+        args.extend(['-segment_wrap', str(wrap)])
+    if with_list:
+        args.extend(['-segment_list', segment_list_file(output_file), '-segment_list_type', 'ffconcat'])
+    return args + [segment_pattern(output_file)]
+
+def write_concat_list(paths, list_file, inpoint=None):
+    """Writes an ffconcat list for the concat demuxer"""
+    with open(list_file, 'w') as f:
+        f.write("ffconcat version 1.0\n")
+        for index, path in enumerate(paths):
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if index == 0 and inpoint:
+                f.write(f"inpoint {inpoint:.3f}\n")
+
+def concat_copy(paths, destination, inpoint=None):
+    """Joins segments into one file with stream copy (no re-encoding)"""
+    if not paths:
+        raise ValueError("No segments to join")
+    handle, list_file = tempfile.mkstemp(suffix='.ffconcat')
+    os.close(handle)
+    try:
+        write_concat_list(paths, list_file, inpoint)
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_file,
+               '-map', '0', '-c', 'copy']
+        if destination.endswith('.mp4'):
+            cmd.extend(['-movflags', '+faststart'])
+        cmd.append(destination)
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Joining segments failed: {result.stderr.strip()}")
+    finally:
+        os.remove(list_file)
+    return destination
+
+def join_segments(output_file, destination=None):
+    """Joins all segments of a recording; includes a last segment missing from the list after a crash"""
+    destination = destination or output_file
+    return concat_copy(segment_files(output_file), destination)
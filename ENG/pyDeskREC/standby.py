@@ -0,0 +1,268 @@
+import asyncio
+import os
+import subprocess
+import engine
+from ffmpeg_progress import FFmpegStats, ProgressReader
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# Hot standby: ffmpeg runs the whole capture pipeline (X display, pulse,
+# encoder) ahead of time and streams MPEG-TS into a pipe. The engine loop
+# reads the pipe and keeps only the packets since the last keyframe. A take
+# copies the stream from that keyframe into a stream-copy ffmpeg writing the
+# recording, so the first frame of the file is captured at (or just before)
+# the click instead of after a cold start of ffmpeg. When the recording ffmpeg
+# falls behind, what it has not taken yet is kept up to about one pre-roll;
+# beyond that the backlog is dropped and the take continues at a keyframe.
+TS_PACKET = 188
+TS_SYNC = 0x47
+VIDEO_PID = 0x100          # -mpegts_start_pid: the video is mapped first
+PMT_PID = 0x1000           # -mpegts_pmt_start_pid
+PTS_WRAP = 1 << 33
+STANDBY_GOP_SECONDS = 1    # Keyframe interval while armed; bounds the pre-roll
+STANDBY_TAIL = 0.5         # Seconds still copied after stop, for frames inside the encoder
+STANDBY_STOP_TIMEOUT = 5   # Seconds a disarmed ffmpeg gets to exit before it is killed
+OUT_BUFFER_MIN = 1 << 20   # Backlog always allowed, however small the pre-roll (static screen)
+MPEGTS_ARGS = ['-f', 'mpegts', '-mpegts_start_pid', str(VIDEO_PID), '-mpegts_pmt_start_pid', str(PMT_PID)]
+
+def parse_packet(packet):
+    """Returns (pid, random access, PTS or None) of one transport stream packet"""
+    pid = ((packet[1] & 0x1f) << 8) | packet[2]
+    unit_start = packet[1] & 0x40
+    offset = 4
+    random_access = False
+    if packet[3] & 0x20:
+        length = packet[4]
+        random_access = length > 0 and bool(packet[5] & 0x40)
+        offset = 5 + length
+    pts = None
+    if unit_start and packet[3] & 0x10 and packet[offset:offset + 3] == b'\x00\x00\x01':
+        if len(packet) >= offset + 14 and packet[offset + 7] & 0x80:
+            p = packet[offset + 9:offset + 14]
+            pts = (((p[0] >> 1) & 0x07) << 30) | (p[1] << 22) | ((p[2] >> 1) << 15) | (p[3] << 7) | (p[4] >> 1)
+    return pid, random_access, pts
+
+def standby_command_key(cmd):
+    """The command without its pipe output (the last argument), to compare settings"""
+    return cmd[:-1]
+
+class StandbyCapture:
+    """An armed capture ffmpeg whose output is copied into takes from a keyframe"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.loop = None
+        self.process = None
+        self.key = None
+        self.command = None
+        self.stats = FFmpegStats()
+        self.progress_reader = None
+        self.read_fd = None
+        self.pending = b''
+        self.tables = {}            # PAT and PMT packets, sent first in every take
+        self.preroll = []           # Packets since the last video keyframe
+        self.preroll_pts = None
+        self.first_pts = None       # First video PTS of the armed stream
+        self.out_fd = None
+        self.out_buffer = bytearray()
+        self.gop_bytes = 0          # Largest pre-roll seen; bounds out_buffer
+        self.closing = False
+        self.waiting_keyframe = False
+        self.resyncing = False      # Backlog dropped, waiting for a keyframe to continue the take
+
+    @property
+    def armed(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def taking(self):
+        return self.out_fd is not None
+
+    def ensure_armed(self, loop):
+        """Arms, or re-arms when the settings changed since arming; True if it was ready"""
+        key = standby_command_key(self.recorder.setup_ffmpeg_command('pipe:'))
+        if self.armed and key == self.key:
+            return True
+        if self.armed:
+            print("Standby: settings changed, re-arming")
+            self.disarm()
+        self.arm(loop, key)
+        return False
+
+    def arm(self, loop, key):
+        """Starts the capture ffmpeg of the command `key`, writing to a new pipe"""
+        self.loop = loop
+        self.read_fd, write_fd = os.pipe()
+        cmd = key + [f"pipe:{write_fd}"]
+        self.key = key
+        self.command = cmd
+        print(f"Standby: arming {' '.join(cmd)}")
+        try:
+            self.process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE, pass_fds=(write_fd,), text=True)
+        finally:
+            os.close(write_fd)
+        self.stats = FFmpegStats()
+        self.progress_reader = ProgressReader(self.process, self.stats).start(loop)
+        self.pending, self.tables, self.preroll = b'', {}, []
+        self.preroll_pts = self.first_pts = None
+        self.gop_bytes = 0
+        os.set_blocking(self.read_fd, False)
+        loop.add_reader(self.read_fd, self._on_readable)
+
+    def disarm(self):
+        """Stops the armed ffmpeg without blocking the loop; returns the task reaping it, or None"""
+        if self.taking:
+            self._close_take()
+        if self.read_fd is not None:
+            self.loop.remove_reader(self.read_fd)
+            os.close(self.read_fd)
+            self.read_fd = None
+        reaping = None
+        if self.armed:
+            self.process.terminate()
+            reaping = self.loop.create_task(self._reap(self.process))
+        self.process = None
+        return reaping
+
+    @staticmethod
+    async def _reap(process):
+        try:
+            await asyncio.wait_for(engine.wait_process(process), STANDBY_STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await engine.wait_process(process)
+
+    def capture_time(self, pts):
+        """Wall-clock capture time of the frame with this PTS, from the armed ffmpeg's progress"""
+        stats = self.stats.snapshot()
+        if self.first_pts is None or pts is None or not stats['updated_at']:
+            return None
+        return stats['updated_at'] - stats['out_time'] + ((pts - self.first_pts) % PTS_WRAP) / 90000
+
+    def begin_take(self, fd):
+        """Starts copying into fd: PAT/PMT and the pre-roll now, or from the next keyframe"""
+        self.out_fd = fd
+        self.resyncing = False
+        os.set_blocking(fd, False)
+        if self.preroll:
+            preroll, self.preroll = self.preroll, []
+            self._first_packet(self.preroll_pts)
+            for packet in preroll:
+                self._write(packet)
+        else:
+            self.waiting_keyframe = True
+
+    def end_take(self):
+        """Copies the frames still inside the encoder, then closes the take"""
+        if self.taking and not self.closing:
+            self.closing = True
+            self.loop.call_later(STANDBY_TAIL, self._finish_take)
+
+    def _first_packet(self, pts):
+        for pid in (0, PMT_PID):
+            if pid in self.tables:
+                self._write(self.tables[pid])
+        if self.resyncing:
+            self.resyncing = False
+        else:
+            self.recorder._first_frame(self.capture_time(pts), 'standby')
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.read_fd, 65536)
+        except BlockingIOError:
+            return
+        if not data:
+            print(f"Standby: ffmpeg exited {self.process.wait()}: {self.progress_reader.tail(3)}")
+            self.loop.remove_reader(self.read_fd)
+            os.close(self.read_fd)
+            self.read_fd = None
+            if self.taking:
+                self._close_take()
+            return
+        data = self.pending + data
+        start = 0
+        while len(data) - start >= TS_PACKET:
+            if data[start] != TS_SYNC:
+                # Lost sync: skip to the next sync byte
+                start = data.find(bytes([TS_SYNC]), start + 1)
+                if start < 0:
+                    start = len(data)
+                continue
+            self._packet(data[start:start + TS_PACKET])
+            start += TS_PACKET
+        self.pending = data[start:]
+
+    def _packet(self, packet):
+        pid, random_access, pts = parse_packet(packet)
+        if pid in (0, PMT_PID):
+            self.tables[pid] = packet
+        if pid == VIDEO_PID and pts is not None and self.first_pts is None:
+            self.first_pts = pts
+        keyframe = pid == VIDEO_PID and random_access
+        if self.taking and not self.waiting_keyframe:
+            self._write(packet)
+        elif self.taking and keyframe:
+            self.waiting_keyframe = False
+            self._first_packet(pts)
+            self._write(packet)
+        elif keyframe:
+            self.gop_bytes = max(self.gop_bytes, len(self.preroll) * TS_PACKET)
+            self.preroll, self.preroll_pts = [packet], pts
+        elif self.preroll:
+            self.preroll.append(packet)
+
+    def _write(self, data):
+        if self.out_buffer:
+            self.out_buffer += data
+            if len(self.out_buffer) > max(self.gop_bytes, OUT_BUFFER_MIN):
+                self._skip_to_keyframe()
+            return
+        try:
+            written = os.write(self.out_fd, data)
+        except BlockingIOError:
+            written = 0
+        except BrokenPipeError:
+            print("Standby: the recording ffmpeg went away")
+            self._close_take()
+            return
+        if written < len(data):
+            self.out_buffer += data[written:]
+            self.loop.add_writer(self.out_fd, self._flush)
+
+    def _skip_to_keyframe(self):
+        """The recording ffmpeg is more than a pre-roll behind: drop the backlog, continue at the next keyframe"""
+        print("Standby: the recording ffmpeg fell behind, skipping to the next keyframe")
+        # Only whole packets were queued: the remainder is the tail of a partly written one
+        del self.out_buffer[len(self.out_buffer) % TS_PACKET:]
+        self.waiting_keyframe = self.resyncing = True
+
+    def _flush(self):
+        try:
+            written = os.write(self.out_fd, self.out_buffer)
+        except BlockingIOError:
+            return
+        except BrokenPipeError:
+            self._close_take()
+            return
+        del self.out_buffer[:written]
+        if not self.out_buffer:
+            self.loop.remove_writer(self.out_fd)
+            if self.closing:
+                self._close_take()
+
+    def _finish_take(self):
+        if self.taking and not self.out_buffer:
+            self._close_take()
+
+    def _close_take(self):
+        """EOF for the recording ffmpeg, which then finalizes the file"""
+        if self.out_buffer:
+            self.loop.remove_writer(self.out_fd)
+            self.out_buffer = bytearray()
+        os.close(self.out_fd)
+        self.out_fd = None
+        self.closing = False
+        self.waiting_keyframe = False
+        self.resyncing = False
@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# The modules import each other by plain name, as when run from their folder
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+# Keep the configuration and caches of the tests out of the user's home
+_scratch = tempfile.mkdtemp(prefix='pyDeskREC-tests-')
+os.environ['XDG_CONFIG_HOME'] = os.path.join(_scratch, 'config')
+os.environ['XDG_CACHE_HOME'] = os.path.join(_scratch, 'cache')
+
+def read_data(name):
+    """A captured tool output from tests/data"""
+    with open(os.path.join(TESTS_DIR, 'data', name)) as f:
+        return f.read()
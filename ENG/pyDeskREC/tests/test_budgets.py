@@ -0,0 +1,36 @@
+import importlib.util
+import os
+import pytest
+from statistics import median
+import benchmarks
+
+# The GUI budgets need PySimpleGUI, an X display and FFmpeg (the GUI quits without it)
+needs_gui = pytest.mark.skipif(
+    not importlib.util.find_spec('PySimpleGUI') or not os.environ.get('DISPLAY'),
+    reason="needs PySimpleGUI and an X display")
+
+needs_pysimplegui = pytest.mark.skipif(not importlib.util.find_spec('PySimpleGUI'), reason="needs PySimpleGUI")
+
+def test_cli_start_loads_no_gui_modules():
+    assert benchmarks.loaded_modules(benchmarks.STARTUP_PATHS['cli']) == []
+
+@needs_pysimplegui
+def test_gui_start_defers_the_recording_modules():
+    assert benchmarks.loaded_modules(benchmarks.STARTUP_PATHS['gui'], benchmarks.RECORDING_MODULES) == []
+
+@needs_gui
+def test_first_window_within_budget():
+    timings = [benchmarks.time_first_window() for _ in range(3)]
+    assert median(timings) <= benchmarks.FIRST_WINDOW_BUDGET_MS
+
+@needs_gui
+def test_idle_gui_stays_asleep():
+    seconds = 5
+    wakeups, updates = benchmarks.measure_idle(seconds)
+    assert wakeups <= benchmarks.IDLE_WAKEUPS_PER_SECOND * seconds
+    assert updates == 0
+
+def test_scheduler_jitter_within_budget():
+    lateness = benchmarks.measure_scheduler_lateness(calls=100, spread=2.0)
+    assert len(lateness) == 100
+    assert benchmarks.percentile(lateness, 0.99) <= benchmarks.SCHEDULER_JITTER_MS
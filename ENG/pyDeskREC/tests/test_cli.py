@@ -0,0 +1,27 @@
+import config_manager
+import pytest
+from calibrate import save_calibration
+from cli import build_parser, main, make_recorder
+
+def test_metrics_options_are_not_saved_by_calibrate(tmp_path, monkeypatch):
+    config_file = str(tmp_path / 'pyDeskREC.ini')
+    monkeypatch.setattr(config_manager.config_writer, 'path', config_file)
+    args = build_parser().parse_args(['calibrate', '--metrics-port', '9100', '--stats-file', '/tmp/stats.json'])
+    recorder = make_recorder(args)
+    save_calibration(recorder.config, {'preset': 'veryfast', 'scale': 1.0, 'threads': 2})
+    config_manager.config_writer.flush()
+    saved, changed = config_manager.read_settings(config_file)
+    assert (saved.preset, saved.threads) == ('veryfast', 2)
+    assert (saved.metrics_port, saved.stats_file) == (0, '')
+
+def test_setting_options_are_validated_like_the_settings(capsys):
+    for argv, option in [(['record', '--fps', '0'], '--fps'),
+                         (['record', '--webcam-width', '8'], '--webcam-width'),
+                         (['record', '--renditions', 'big'], '--renditions'),
+                         (['replay', '--seconds', '1'], '--seconds'),
+                         (['calibrate', '--presets', 'veryfast', 'fastest'], '--presets'),
+                         (['calibrate', '--scales', '1', '2'], '--scales')]:
+        with pytest.raises(SystemExit) as exit_info:
+            main(argv)
+        assert exit_info.value.code == 2
+        assert f"argument {option}:" in capsys.readouterr().err
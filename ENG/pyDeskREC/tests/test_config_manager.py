@@ -0,0 +1,13 @@
+import config_manager
+from config_manager import ConfigWriter, Settings
+
+def test_writer_saves_the_settings_as_they_were_when_saved(tmp_path):
+    config_file = str(tmp_path / 'pyDeskREC.ini')
+    writer = ConfigWriter(config_file, delay=60)
+    config = Settings(fps=25)
+    writer.save(config)
+    # Changed later without a save, e.g. half-way through an update on another thread
+    config.fps = 60
+    writer.flush()
+    saved, changed = config_manager.read_settings(config_file)
+    assert saved.fps == 25
@@ -0,0 +1,132 @@
+import threading
+import time
+import devices
+from conftest import read_data
+from devices import (AudioSource, DeviceRegistry, VideoDevice, parse_display_size, parse_pactl_sources,
+                     parse_v4l2_devices, run_probes)
+
+def test_parse_pactl_sources():
+    sources = parse_pactl_sources(read_data('pactl_list_sources.txt'))
+    assert sources == [
+        AudioSource('alsa_output.pci-0000_00_1f.3.analog-stereo.monitor', 'Monitor of Built-in Audio Analog Stereo',
+                    2, 44100, True),
+        AudioSource('alsa_input.pci-0000_00_1f.3.analog-stereo', 'Built-in Audio Analog Stereo', 2, 48000, False),
+        AudioSource('alsa_input.usb-046d_HD_Pro_Webcam_C920-02.analog-mono', 'HD Pro Webcam C920 Analog Mono',
+                    1, 32000, False),
+    ]
+
+def test_parse_pactl_sources_empty():
+    assert parse_pactl_sources('') == []
+
+def test_parse_v4l2_devices():
+    # The media controller without a /dev/video node is no capture device
+    assert parse_v4l2_devices(read_data('v4l2_list_devices.txt')) == [
+        VideoDevice('/dev/video0', 'HD Pro Webcam C920 (usb-0000:00:14.0-1)', ['/dev/video0', '/dev/video1']),
+        VideoDevice('/dev/video2', 'Integrated_Webcam_HD: Integrate (usb-0000:00:14.0-5)',
+                    ['/dev/video2', '/dev/video3']),
+    ]
+
+def test_parse_display_size():
+    assert parse_display_size(read_data('xdpyinfo.txt')) == (2560, 1440)
+    assert parse_display_size("xdpyinfo:  unable to open display \":9\".") is None
+
+def test_run_probes_reports_answers_and_timeouts():
+    release = threading.Event()
+    reports = []
+    results = run_probes({'fast': lambda: 1, 'slow': lambda: release.wait(5)},
+                         lambda name, result, error: reports.append((name, result, error)), deadline=0.2)
+    release.set()
+    assert results == {'fast': 1}
+    assert reports[0] == ('fast', 1, None)
+    name, result, error = reports[1]
+    # The builtin class the GUI checks, not concurrent.futures.TimeoutError (different before Python 3.11)
+    assert name == 'slow' and result is None and type(error) is TimeoutError
+    assert 'no answer within' in str(error)
+
+def test_watcher_patterns_match_only_additions_and_removals():
+    audio, video = DeviceRegistry.WATCHERS['audio'][1], DeviceRegistry.WATCHERS['video'][1]
+    assert audio.search("Event 'new' on source #7")
+    assert audio.search("Event 'remove' on source #7")
+    assert not audio.search("Event 'change' on source #7")
+    assert not audio.search("Event 'new' on sink-input #42")
+    assert video.search("UDEV  [1234.5678] add      /devices/pci0000:00/usb1/1-1/video4linux/video0 (video4linux)")
+    assert not video.search("UDEV  [1234.5678] change   /devices/pci0000:00/usb1/1-1/video4linux/video0 (video4linux)")
+
+class CountingRegistry(DeviceRegistry):
+    """A registry whose probes count their calls instead of running the tools"""
+
+    def __init__(self, ttl=60):
+        super().__init__(ttl)
+        self.calls = {'audio': 0, 'video': 0}
+        self.PROBES = {kind: (lambda kind=kind: self.probe(kind)) for kind in self.calls}
+
+    def probe(self, kind):
+        self.calls[kind] += 1
+        return [f"{kind}{self.calls[kind]}"]
+
+def test_registry_serves_the_cache_within_the_ttl():
+    registry = CountingRegistry()
+    registry._initial_probe()
+    assert registry.audio_sources() == ['audio1']
+    assert registry.video_devices() == ['video1']
+    assert registry.audio_sources() == ['audio1']
+    assert registry.calls == {'audio': 1, 'video': 1}
+
+def test_hotplug_burst_causes_one_refresh(monkeypatch):
+    monkeypatch.setattr(devices, 'HOTPLUG_SETTLE', 0.1)
+    registry = CountingRegistry()
+    notified = threading.Event()
+    registry.add_listener(lambda kind: notified.set())
+    changed, closed = threading.Event(), threading.Event()
+    thread = threading.Thread(target=registry._refresh_on_change, args=('audio', changed, closed))
+    thread.start()
+    # A USB device brings several events at once
+    for _ in range(3):
+        changed.set()
+    assert notified.wait(5)
+    closed.set()
+    changed.set()
+    thread.join(5)
+    assert registry.calls == {'audio': 1, 'video': 0}
+    assert registry.cache['audio'][1] == ['audio1']
+
+class SlowRegistry(DeviceRegistry):
+    """A registry whose probe blocks until released"""
+
+    def __init__(self, ttl):
+        super().__init__(ttl)
+        self.release = threading.Event()
+        self.calls = 0
+        self.PROBES = {'audio': self.probe}
+
+    def probe(self):
+        self.calls += 1
+        self.release.wait(5)
+        return [f"source{self.calls}"]
+
+def test_registry_get_never_waits_for_a_probe():
+    registry = SlowRegistry(ttl=60)
+    refreshed = threading.Event()
+    registry.add_listener(lambda kind: refreshed.set())
+    started = time.perf_counter()
+    assert registry.get('audio') == []
+    assert registry.get('audio') == []
+    assert time.perf_counter() - started < 0.5
+    registry.release.set()
+    assert refreshed.wait(5)
+    assert registry.get('audio') == ['source1']
+    assert registry.calls == 1
+
+def test_registry_returns_the_expired_snapshot_while_refreshing():
+    registry = SlowRegistry(ttl=0)
+    registry.release.set()
+    registry.refresh('audio')
+    registry.release.clear()
+    refreshed = threading.Event()
+    registry.add_listener(lambda kind: refreshed.set())
+    started = time.perf_counter()
+    assert registry.get('audio') == ['source1']
+    assert time.perf_counter() - started < 0.5
+    registry.release.set()
+    assert refreshed.wait(5)
+    assert registry.cache['audio'][1] == ['source2']
@@ -0,0 +1,71 @@
+import threading
+import time
+from governor import HEADROOM_SAMPLES, OVERLOAD_SAMPLES, EncoderGovernor
+
+class FakeRecorder:
+    fps, preset, scale = 30, 'veryfast', 1.0
+    video_format = 'mkv'
+    part = 1
+    switches = 0
+
+    def __init__(self, tmp_path):
+        self.first_output = str(tmp_path / 'recording_x.mkv')
+
+    def switch_segment(self):
+        self.switches += 1
+
+class SlowGovernor(EncoderGovernor):
+    """Logs slowly, so stop() arrives in the middle of a level change"""
+
+    def __init__(self, recorder):
+        super().__init__(recorder)
+        self.changing = threading.Event()
+
+    def log(self, message):
+        if message.startswith('step'):
+            self.changing.set()
+            time.sleep(0.3)
+
+def test_stop_waits_for_a_level_change_before_restoring(tmp_path):
+    recorder = FakeRecorder(tmp_path)
+    governor = SlowGovernor(recorder)
+    governor.thread = threading.Thread(target=governor.change_level, args=(1, "test"))
+    governor.thread.start()
+    assert governor.changing.wait(5)
+    governor.stop()
+    governor.thread.join()
+    assert (recorder.fps, recorder.preset, recorder.scale) == (30, 'veryfast', 1.0)
+
+def feed(governor, samples, speed, dropped=0):
+    for _ in range(samples):
+        governor.observe(speed, dropped)
+
+def test_steps_down_under_load_and_back_up_at_real_time(tmp_path):
+    recorder = FakeRecorder(tmp_path)
+    governor = EncoderGovernor(recorder)
+    feed(governor, OVERLOAD_SAMPLES, 0.8)
+    assert governor.level == 1 and recorder.preset == 'ultrafast'
+    # A real-time capture recovers at about 1.0x, never above
+    feed(governor, HEADROOM_SAMPLES - 1, 1.0)
+    assert governor.level == 1
+    feed(governor, 1, 1.0)
+    assert governor.level == 0 and recorder.preset == 'veryfast'
+    assert recorder.switches == 2
+
+def test_dropped_frames_are_no_headroom(tmp_path):
+    governor = EncoderGovernor(FakeRecorder(tmp_path))
+    feed(governor, OVERLOAD_SAMPLES, 0.8)
+    feed(governor, HEADROOM_SAMPLES * 2, 1.0, dropped=3)
+    assert governor.level == 1
+
+def test_step_up_that_does_not_hold_doubles_the_wait(tmp_path):
+    governor = EncoderGovernor(FakeRecorder(tmp_path))
+    feed(governor, OVERLOAD_SAMPLES, 0.8)
+    feed(governor, HEADROOM_SAMPLES, 1.0)
+    assert governor.level == 0
+    feed(governor, OVERLOAD_SAMPLES, 0.8)
+    assert governor.level == 1
+    feed(governor, HEADROOM_SAMPLES, 1.0)
+    assert governor.level == 1
+    feed(governor, HEADROOM_SAMPLES, 1.0)
+    assert governor.level == 0
@@ -0,0 +1,40 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from scheduler import Scheduler
+
+def saved_ids(schedule_file):
+    with open(schedule_file) as f:
+        return [item['id'] for item in json.load(f)]
+
+def test_one_shot_recording_stays_saved_until_its_end(tmp_path):
+    schedule_file = str(tmp_path / 'schedule.json')
+    scheduler = Scheduler(schedule_file).start()
+    fired = threading.Event()
+    scheduler.on_recording = lambda recording, remaining: fired.set()
+    # Starts in 0.3 s and lasts 1.2 s
+    recording = scheduler.add_recording(at=datetime.now() + timedelta(seconds=0.3), duration_minutes=0.02)
+    assert fired.wait(5)
+    assert saved_ids(schedule_file) == [recording.job_id]
+
+    # A crash now: a new process recovers the rest of the recording
+    [call] = Scheduler(schedule_file).load().pending()
+    job_id, remaining = call.args
+    assert job_id == recording.job_id and 0 < remaining < 0.02
+
+    # Dropped at its end
+    deadline = time.monotonic() + 5
+    while saved_ids(schedule_file) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert saved_ids(schedule_file) == []
+    assert not scheduler.recordings and not scheduler.expiries
+
+def test_recording_without_duration_is_dropped_when_it_starts(tmp_path):
+    schedule_file = str(tmp_path / 'schedule.json')
+    scheduler = Scheduler(schedule_file).start()
+    fired = threading.Event()
+    scheduler.on_recording = lambda recording, remaining: fired.set()
+    scheduler.add_recording(at=datetime.now() + timedelta(seconds=0.2))
+    assert fired.wait(5)
+    assert saved_ids(schedule_file) == []
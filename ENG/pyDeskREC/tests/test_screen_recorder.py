@@ -0,0 +1,147 @@
+import queue
+import config_manager
+import screen_recorder
+from config_manager import Settings
+from screen_recorder import ScreenRecorder
+
+def test_headless_stop_keeps_the_saved_area(monkeypatch):
+    saved = []
+    monkeypatch.setattr(config_manager.config_writer, 'save', saved.append)
+    config = Settings(area=(10, 20, 640, 480))
+    recorder = ScreenRecorder(config, queue.Queue(), interactive=False)
+    recorder.stop_recording(wait=True)
+    recorder.engine.shutdown()
+    assert config.area == (10, 20, 640, 480)
+    assert saved == []
+
+def test_replay_buffer_sizes_its_ring_from_the_current_settings(monkeypatch):
+    from replay_buffer import CHUNK_SECONDS, ReplayBuffer
+    config = Settings(replay_seconds=30)
+    buffer = ReplayBuffer(config, queue.Queue(), interactive=False)
+    monkeypatch.setattr(buffer, 'start_recording', lambda: None)
+    config.update(replay_seconds=60)
+    buffer.start_buffer()
+    buffer._free_buffer()
+    buffer.engine.shutdown()
+    assert buffer.replay_seconds == 60
+    assert buffer.ring_size == 60 // CHUNK_SECONDS + 2
+
+def test_segmented_recordings_are_post_processed_segment_by_segment(monkeypatch, tmp_path):
+    submitted = []
+    class FakePostProcessor:
+        def submit(self, paths, faststart=False, extras=True):
+            submitted.append((paths, faststart, extras))
+    monkeypatch.setattr(screen_recorder, 'get_postprocessor', FakePostProcessor)
+    config = Settings(segment_seconds=60, mp4_mode='faststart', renditions='1280x720')
+    recorder = ScreenRecorder(config, queue.Queue(), interactive=False)
+    recorder.engine.shutdown()
+    recorder.first_output = str(tmp_path / 'recording_X.mp4')
+    names = ['recording_X_000.mp4', 'recording_X_001.mp4', 'recording_X.720p_000.mp4']
+    for name in names:
+        (tmp_path / name).touch()
+    recorder._post_process()
+    assert submitted == [([str(tmp_path / name) for name in names], True, config.post_processing)]
+
+def test_replay_buffer_does_not_hold_post_processing():
+    from replay_buffer import ReplayBuffer
+    recorder = ScreenRecorder(Settings(), queue.Queue(), interactive=False)
+    buffer = ReplayBuffer(Settings(), queue.Queue(), interactive=False)
+    recorder.engine.shutdown()
+    buffer.engine.shutdown()
+    assert recorder.holds_post_processing
+    assert not buffer.holds_post_processing
+
+def test_session_phases_go_to_the_metrics_not_the_console(capsys):
+    from metrics import MetricsPublisher
+    recorder = ScreenRecorder(Settings(), queue.Queue(), interactive=False)
+    recorder.engine.shutdown()
+    recorder.engine.timings = [('idle', 5.0), ('countdown', 3.0021), ('starting', 0.0413)]
+    assert recorder.engine.phase_ms() == {'countdown': 3002.1, 'starting': 41.3}
+    assert MetricsPublisher().collect(recorder)['starting_seconds'] == 0.0413
+    assert 'Session phases' not in capsys.readouterr().out
+
+# FFmpeg command builders (_filter_graph, _split_for_outputs, _map_args, _rendition_args)
+
+def ffmpeg_command(output_file='rec.mkv', microphone=False, webcam=False, **settings):
+    config = Settings(audio_device='monitor', microphone_device='mic', video_device='/dev/video0',
+                      display=':0', **settings)
+    recorder = ScreenRecorder(config, queue.Queue(), interactive=False)
+    recorder.engine.shutdown()
+    recorder._load_capabilities = lambda: None  # Unknown build: every filter and encoder is assumed
+    recorder.record_microphone = microphone
+    recorder.record_webcam = webcam
+    return recorder.setup_ffmpeg_command(output_file)
+
+def filter_graph(cmd):
+    return cmd[cmd.index('-filter_complex') + 1].split(';') if '-filter_complex' in cmd else []
+
+def output_maps(cmd, *outputs):
+    """The -map values of every output, in the order of the outputs"""
+    maps, start = [], 0
+    for output in outputs:
+        end = cmd.index(output, start)
+        maps.append([cmd[i + 1] for i in range(start, end) if cmd[i] == '-map'])
+        start = end + 1
+    assert start == len(cmd)
+    return maps
+
+def test_single_source_needs_no_filter_graph():
+    cmd = ffmpeg_command(video_format='mkv')
+    assert filter_graph(cmd) == []
+    assert output_maps(cmd, 'rec.mkv') == [['0:v', '1:a']]
+    assert cmd[cmd.index('-metadata:s:a:0') + 1] == 'title=System audio'
+
+def test_mix_applies_the_gains_and_maps_one_track():
+    cmd = ffmpeg_command(video_format='mkv', microphone=True, system_audio_gain=0.5, microphone_gain=2.0)
+    assert filter_graph(cmd) == ['[1:a]volume=0.5[a1]', '[2:a]volume=2.0[a2]',
+                                 '[a1][a2]amix=inputs=2:duration=longest:normalize=0[aout]']
+    assert output_maps(cmd, 'rec.mkv') == [['0:v', '[aout]']]
+    assert '-metadata:s:a:0' not in cmd
+
+def test_separate_tracks_keep_their_titles():
+    cmd = ffmpeg_command(video_format='mkv', microphone=True, audio_mix='separate', microphone_gain=2.0)
+    assert filter_graph(cmd) == ['[2:a]volume=2.0[a2]']
+    assert output_maps(cmd, 'rec.mkv') == [['0:v', '1:a', '[a2]']]
+    assert cmd[cmd.index('-metadata:s:a:0') + 1] == 'title=System audio'
+    assert cmd[cmd.index('-metadata:s:a:1') + 1] == 'title=Microphone'
+
+def test_webcam_overlay_then_mpdecimate():
+    cmd = ffmpeg_command(video_format='mkv', webcam=True, webcam_mode='overlay', webcam_corner='top-left',
+                         webcam_width=240, frame_rate_mode='variable', vfr_hi=512, vfr_lo=256, vfr_frac=0.5)
+    assert filter_graph(cmd) == ['[1:v]null[camin]', '[camin]scale=240:-2[cam]',
+                                 '[0:v][cam]overlay=16:16:eof_action=pass[vout]',
+                                 '[vout]mpdecimate=hi=512:lo=256:frac=0.5[vdec]']
+    # The webcam is input 1, so the audio moves to input 2
+    assert output_maps(cmd, 'rec.mkv') == [['[vdec]', '2:a']]
+    assert cmd[cmd.index('-fps_mode') + 1] == 'vfr'
+
+def test_webcam_track_is_a_second_titled_video_stream():
+    cmd = ffmpeg_command(video_format='mkv', webcam=True, webcam_mode='track')
+    assert filter_graph(cmd) == ['[1:v]null[camtrack]']
+    assert output_maps(cmd, 'rec.mkv') == [['0:v', '[camtrack]', '2:a']]
+    assert cmd[cmd.index('-metadata:s:v:1') + 1] == 'title=Webcam'
+
+def test_segments_write_a_numbered_pattern():
+    cmd = ffmpeg_command(video_format='mkv', segment_seconds=60)
+    assert output_maps(cmd, 'rec_%03d.mkv') == [['0:v', '1:a']]
+    assert cmd[cmd.index('-segment_time') + 1] == '60'
+
+def test_mix_with_renditions_splits_the_mixed_track():
+    cmd = ffmpeg_command(video_format='mkv', microphone=True, renditions='1280x720')
+    assert filter_graph(cmd)[-3:] == ['[0:v]format=yuv420p,split=2[v0][v1]', '[v1]scale=1280:720[v1s]',
+                                      '[aout]asplit=2[s0o0][s0o1]']
+    assert output_maps(cmd, 'rec.mkv', 'rec.720p.mkv') == [['[v0]', '[s0o0]'], ['[v1s]', '[s0o1]']]
+    rendition = cmd[cmd.index('rec.mkv') + 1:]
+    assert rendition[rendition.index('-c:v') + 1] == 'libx264'
+    assert rendition[rendition.index('-b:a') + 1] == '96k'
+
+def test_segments_with_renditions_segment_every_output():
+    cmd = ffmpeg_command(video_format='mkv', microphone=True, audio_mix='separate', segment_seconds=60,
+                         renditions='1280x720:libx264:2M')
+    # Input streams are mapped again; filter outputs would need asplit
+    assert output_maps(cmd, 'rec_%03d.mkv', 'rec.720p_%03d.mkv') == [['[v0]', '1:a', '2:a'],
+                                                                      ['[v1s]', '1:a', '2:a']]
+    assert cmd.count('-segment_time') == 2
+    rendition = cmd[cmd.index('rec_%03d.mkv') + 1:]
+    assert rendition[rendition.index('-maxrate') + 1] == '2M'
+    assert rendition[rendition.index('-metadata:s:a:1') + 1] == 'title=Microphone'
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import standby
+from standby import PMT_PID, TS_PACKET, VIDEO_PID, StandbyCapture
+
+def ts_packet(pid, keyframe=False):
+    """A transport stream packet of `pid` without PES header; keyframes carry the random access flag"""
+    header = bytes([0x47, pid >> 8, pid & 0xff, 0x30])
+    adaptation = bytes([1, 0x40 if keyframe else 0])
+    return header + adaptation + bytes(TS_PACKET - len(header) - len(adaptation))
+
+class FakeRecorder:
+    def __init__(self):
+        self.first_frames = 0
+
+    def _first_frame(self, captured_at, mode):
+        self.first_frames += 1
+
+class FakeLoop:
+    def add_writer(self, fd, callback):
+        pass
+
+    def remove_writer(self, fd):
+        pass
+
+def test_a_stalled_take_keeps_one_preroll_and_continues_at_a_keyframe(monkeypatch):
+    monkeypatch.setattr(standby, 'OUT_BUFFER_MIN', 64 * TS_PACKET)
+    recorder = FakeRecorder()
+    capture = StandbyCapture(recorder)
+    capture.loop = FakeLoop()
+    capture._packet(ts_packet(PMT_PID))
+    for gop in range(2):
+        capture._packet(ts_packet(VIDEO_PID, keyframe=True))
+        for i in range(99):
+            capture._packet(ts_packet(VIDEO_PID))
+    read_fd, write_fd = os.pipe()
+    try:
+        # Nobody reads the pipe: the recording ffmpeg has stalled
+        capture.begin_take(write_fd)
+        for i in range(5000):
+            capture._packet(ts_packet(VIDEO_PID))
+            assert len(capture.out_buffer) <= 100 * TS_PACKET
+        assert capture.waiting_keyframe and capture.resyncing
+        capture._packet(ts_packet(VIDEO_PID, keyframe=True))
+        assert not capture.waiting_keyframe and not capture.resyncing
+        assert recorder.first_frames == 1
+    finally:
+        os.close(read_fd)
+        capture.out_fd = None
+        os.close(write_fd)
+
+def test_disarm_does_not_block_the_loop(monkeypatch):
+    monkeypatch.setattr(standby, 'STANDBY_STOP_TIMEOUT', 0.5)
+    # An ffmpeg that ignores SIGTERM
+    process = subprocess.Popen([sys.executable, '-c', 'import signal, time; '
+                                'signal.signal(signal.SIGTERM, signal.SIG_IGN); print(flush=True); time.sleep(30)'],
+                               stdout=subprocess.PIPE)
+    process.stdout.readline()
+    process.stdout.close()
+    capture = StandbyCapture(FakeRecorder())
+
+    async def disarm():
+        capture.loop = asyncio.get_running_loop()
+        capture.process = process
+        started = time.perf_counter()
+        reaping = capture.disarm()
+        returned = time.perf_counter() - started
+        await reaping
+        return returned
+
+    assert asyncio.run(disarm()) < 0.1
+    assert process.returncode == -9
+    assert capture.process is None
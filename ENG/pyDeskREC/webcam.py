@@ -0,0 +1,135 @@
+import os
+import subprocess
+import threading
+
+## V 1.0.0 by MoonDragon  - https://github.com/MoonDragon-MD/pyDeskREC
+
+# The webcam is opened by exactly one ffmpeg at a time. While idle that is a
+# small preview-only process; while a recording uses the webcam, the hub stops
+# it and the recording ffmpeg writes the preview as an extra output instead.
+# Only PREVIEW_FPS frames per second are scaled and PNG-encoded for the preview.
+PREVIEW_FPS = 10
+PREVIEW_WIDTH = 240
+PREVIEW_FILTER = f"fps={PREVIEW_FPS},scale={PREVIEW_WIDTH}:-2:flags=fast_bilinear"
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def preview_output_args(fd, label='[pv]'):
+    """Output arguments for the PNG preview stream written to file descriptor fd"""
+    return ['-map', label, '-c:v', 'png', '-f', 'image2pipe', f"pipe:{fd}"]
+
+def read_exactly(stream, size):
+    data = stream.read(size)
+    return data if data is not None and len(data) == size else None
+
+def iter_png_frames(stream):
+    """Splits an image2pipe PNG stream into complete PNG images"""
+    while True:
+        signature = read_exactly(stream, 8)
+        if signature != PNG_SIGNATURE:
+            return
+        parts = [signature]
+        while True:
+            header = read_exactly(stream, 8)
+            if header is None:
+                return
+            length = int.from_bytes(header[:4], 'big')
+            body = read_exactly(stream, length + 4)  # chunk data + CRC
+            if body is None:
+                return
+            parts.append(header)
+            parts.append(body)
+            if header[4:8] == b'IEND':
+                break
+        yield b''.join(parts)
+
+class WebcamHub:
+    """Single reader of a v4l2 webcam shared by the preview and the recorder"""
+
+    def __init__(self, device=''):
+        self.device = device
+        self.preview_enabled = False
+        self.attached = False
+        self.process = None
+        self.reader_thread = None
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_number = 0
+        # Called from the reader thread whenever latest() changed
+        self.on_frame = None
+
+    def latest(self):
+        """Returns (frame number, PNG bytes) of the most recent preview frame"""
+        with self.lock:
+            return self.frame_number, self.frame
+
+    def start_preview(self, device=None):
+        if device:
+            self.device = device
+        self.preview_enabled = True
+        if not self.attached and not self.process:
+            self._spawn_preview()
+
+    def stop_preview(self):
+        self.preview_enabled = False
+        self._stop_process()
+        with self.lock:
+            self.frame = None
+            self.frame_number += 1
+        self._frame_changed()
+
+    def attach(self):
+        """Hands the webcam to a recording; returns the fd for its preview output, or None"""
+        self._stop_process()
+        self.attached = True
+        if not self.preview_enabled:
+            return None
+        read_fd, write_fd = os.pipe()
+        self._start_reader(os.fdopen(read_fd, 'rb'))
+        return write_fd
+
+    def detach(self):
+        """Called when the recording released the webcam"""
+        self.attached = False
+        if self.reader_thread:
+            self.reader_thread.join(timeout=2)
+            self.reader_thread = None
+        if self.preview_enabled:
+            self._spawn_preview()
+
+    def _spawn_preview(self):
+        cmd = ['ffmpeg', '-nostats', '-loglevel', 'error', '-f', 'v4l2', '-i', self.device,
+               '-an', '-vf', PREVIEW_FILTER, '-c:v', 'png', '-f', 'image2pipe', 'pipe:1']
+        try:
+            # Nothing else is piped, so nothing can fill up and block ffmpeg
+            self.process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Error starting webcam preview: {e}")
+            self.process = None
+            return
+        self._start_reader(self.process.stdout)
+
+    def _start_reader(self, stream):
+        self.reader_thread = threading.Thread(target=self._read_frames, args=(stream,), daemon=True)
+        self.reader_thread.start()
+
+    def _read_frames(self, stream):
+        with stream:
+            for png in iter_png_frames(stream):
+                with self.lock:
+                    self.frame = png
+                    self.frame_number += 1
+                self._frame_changed()
+
+    def _frame_changed(self):
+        if self.on_frame:
+            self.on_frame()
+
+    def _stop_process(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+        if self.reader_thread and not self.attached:
+            self.reader_thread.join(timeout=2)
+            self.reader_thread = None